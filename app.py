@@ -3,12 +3,25 @@ import os
 # import webbrowser  # Não necessário no Render
 # import threading   # Não necessário no Render, o Render gerencia o processo
 import time
-import traceback
-from flask import Flask, render_template, request, jsonify
+import threading
+import functools
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context, g, url_for
+from flask.json.provider import DefaultJSONProvider
 
 # Importar módulos utilitários
-from utils.wallet_derivation import derive_addresses
-from utils.blockchain_api import get_blockchain_data
+from utils.wallet_derivation import (
+    derive_addresses, create_derivation_cache, resolve_private_key, parse_range_input, plan_chains, WalletRecord
+)
+from utils.scan_engine import (
+    lookup_wallets, scan_gap_limit, iter_scan, iter_scan_chain_ranges, is_used_address, ScanProgress,
+    DEFAULT_GAP_LIMIT
+)
+from utils.scan_session import get_session_store, ScanSession, SessionBusyError
+from utils.blockchain_api import LOOKUP_MODE_FULL, LOOKUP_MODES, validate_rate_limits
+from utils.providers import backends_status
+from utils.metrics import render_metrics, start_request_timings, record_time, HTTP_REQUEST_SECONDS
+from utils.logging_config import configure_logging, get_logger
+from utils.jobs import get_job_manager, JobQueueFullError, FINISHED_STATES, JOB_DONE, JOB_ERROR
 
 # --- Configurações da Aplicação ---
 # DEBUG_MODE = True # O Render deve estar em modo de produção
@@ -17,7 +30,39 @@ from utils.blockchain_api import get_blockchain_data
 # Flask escutará em '0.0.0.0' para ser acessível externamente.
 
 # --- Inicialização do Flask ---
+class FenixJSONProvider(DefaultJSONProvider):
+    """Serializa também as carteiras derivadas (WalletRecord) como objetos JSON."""
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, WalletRecord):
+            return o.to_dict()
+        return DefaultJSONProvider.default(o)
+
+
 app = Flask(__name__)
+app.json = FenixJSONProvider(app)
+
+# Nível e formato dos logs: FENIX_LOG_LEVEL (padrão INFO), FENIX_LOG_FORMAT (text/json)
+configure_logging()
+logger = get_logger("app")
+
+# --- Métricas por Requisição ---
+@app.before_request
+def _start_request_metrics():
+    # Resumo de tempos (semente, derivação, APIs, cache) devolvido nas respostas de varredura
+    g.request_timings = start_request_timings()
+
+
+@app.after_request
+def _record_request_metrics(response):
+    # Respostas em streaming registram o tempo total ao final do stream (ver _stream_scan_events)
+    if not response.is_streamed:
+        record_time(
+            HTTP_REQUEST_SECONDS, time.perf_counter() - g.request_timings.started_at,
+            route=request.url_rule.rule if request.url_rule else "404", status=response.status_code
+        )
+    return response
 
 # --- Rotas da Aplicação ---
 
@@ -28,115 +73,610 @@ def index():
     """
     return render_template('index.html')
 
+# Modos de varredura aceitos em 'scan_mode' (ver iter_scan)
+SCAN_MODES = ('range', 'gap_limit')
+
+
+def _read_scan_params(data):
+    """
+    Lê e valida os parâmetros de varredura enviados pelo frontend.
+    Compartilhado pela rota JSON e pela rota de streaming.
+    """
+    if not data:
+        raise ValueError("Dados JSON inválidos ou vazios.")
+
+    params = {
+        "seed_phrase": data.get('seed_phrase'),
+        "passphrase": data.get('passphrase', ''),
+        "selected_networks": data.get('selected_networks', []),
+        "account_indices_str": data.get('account_indices', '0'),
+        "address_indices_str": data.get('address_indices', '0-10'),
+        "bitcoin_address_types": data.get('bitcoin_address_types', []),
+        "api_keys": data.get('api_keys', {}),
+        "change_types": data.get('change_types', []),
+        # Ex.: {"etherscan": {"rate": 10, "burst": 10}} para chaves pagas; só vale com a chave do provedor em api_keys
+        "rate_limits": data.get('rate_limits', {}),
+        # Gera endereços pela xpub e só calcula chaves privadas dos endereços com saldo/histórico
+        "lazy_private_keys": bool(data.get('lazy_private_keys', False)),
+        # 'range' (padrão): intervalo fixo de índices; 'gap_limit': varre até N endereços seguidos sem uso
+        "scan_mode": data.get('scan_mode', 'range'),
+        "gap_limit": data.get('gap_limit', DEFAULT_GAP_LIMIT),
+        # Só no modo gap_limit: depois das contas pedidas, segue para as próximas enquanto houver uso
+        "account_discovery": bool(data.get('account_discovery', False)),
+        # Cache local de consultas (rede, endereço); False força consultar todos os endereços de novo
+        "use_cache": bool(data.get('use_cache', True)),
+        # Pré-filtro offline (utils.prescreen, se houver índices): False consulta todos os endereços na API
+        "use_prescreen": bool(data.get('use_prescreen', True)),
+        # Opt-in: True guarda a semente BIP39 em memória por alguns minutos (utils.seed_cache), para que
+        # novas varreduras da mesma seed pulem o PBKDF2; False (padrão) não guarda e apaga a entrada existente
+        "cache_seed": bool(data.get('cache_seed', False)),
+        # 'full' (padrão) ou 'probe': sonda barata de uso antes das consultas de token (ver LOOKUP_MODES)
+        "lookup_mode": data.get('lookup_mode', LOOKUP_MODE_FULL),
+        # Opt-in: lista completa de endereços derivados (com chaves privadas, fora do modo lazy) na
+        # resposta, no streaming ou no job, para "Exportar Todos"; wallets_offset/wallets_limit devolvem
+        # só uma página dela. O total de endereços varridos vem sempre (all_derived_wallets_total/progresso)
+        "include_all_wallets": bool(data.get('include_all_wallets', False)),
+        "wallets_offset": data.get('wallets_offset', 0),
+        "wallets_limit": data.get('wallets_limit'),
+    }
+
+    if not params["seed_phrase"]:
+        raise ValueError("Seed phrase é obrigatória.")
+
+    if params["scan_mode"] not in SCAN_MODES:
+        raise ValueError(f"scan_mode deve ser um de: {', '.join(SCAN_MODES)}.")
+
+    if params["scan_mode"] == 'gap_limit':
+        try:
+            params["gap_limit"] = int(params["gap_limit"])
+        except (TypeError, ValueError):
+            raise ValueError("gap_limit deve ser um número inteiro.")
+
+    if params["lookup_mode"] not in LOOKUP_MODES:
+        raise ValueError(f"lookup_mode deve ser um de: {', '.join(LOOKUP_MODES)}.")
+
+    params["rate_limits"] = validate_rate_limits(params["rate_limits"])
+
+    try:
+        params["wallets_offset"] = max(0, int(params["wallets_offset"]))
+        if params["wallets_limit"] is not None:
+            params["wallets_limit"] = max(0, int(params["wallets_limit"]))
+    except (TypeError, ValueError):
+        raise ValueError("wallets_offset e wallets_limit devem ser números inteiros.")
+
+    # A seed (nem parte dela) não vai para os logs
+    logger.info(
+        "Varredura solicitada",
+        extra={
+            "passphrase": bool(params["passphrase"]),
+            "networks": params["selected_networks"],
+            "accounts": params["account_indices_str"],
+            "indices": params["address_indices_str"],
+            "btc_types": params["bitcoin_address_types"],
+            "change_types": params["change_types"],
+            "lazy_private_keys": params["lazy_private_keys"],
+            "scan_mode": params["scan_mode"],
+            "lookup_mode": params["lookup_mode"],
+        }
+    )
+
+    return params
+
+
+def build_result_item(wallet_info, blockchain_data, derivation_cache):
+    """
+    Monta o item de resultado de um endereço com saldo ou histórico.
+    Retorna None para endereços vazios ou com erro fatal da API.
+    """
+    address = wallet_info['address']
+    network = wallet_info['network']
+
+    if blockchain_data and blockchain_data.get("error_fatal"):
+        logger.warning(
+            "Endereço %s na rede %s não adicionado devido a erro fatal da API: %s",
+            address, network, blockchain_data['error_fatal']
+        )
+        return None
+    if not blockchain_data:
+        return None
+
+    has_transactions = blockchain_data.get('has_transactions', False)
+    has_real_balance = blockchain_data.get('has_real_balance', False)
+    if not (has_real_balance or has_transactions):
+        return None
+
+    result_item = {
+        "address": address,
+        "network": network,
+        "balance_crypto": blockchain_data.get('balance_crypto', 0),
+        "balance_usd": blockchain_data.get('balance_usd', 0),
+        "has_transactions": has_transactions,
+        "has_real_balance": has_real_balance,
+        "derivation_path": wallet_info['derivation_path'],
+        "address_type": wallet_info.get('address_type', 'N/A'),
+        # No modo lazy_private_keys a chave só é derivada aqui, para os endereços encontrados
+        "private_key": resolve_private_key(derivation_cache, wallet_info),
+        "explorer_link": blockchain_data.get('explorer_link', '#')
+    }
+    if network == "BTC":
+        result_item["balance_satoshi"] = blockchain_data.get('balance_satoshi', 0)
+    return result_item
+
+
+def _add_all_wallets(response, params, wallets):
+    """Inclui na resposta a lista (ou a página pedida) de carteiras derivadas, se solicitada."""
+    if params["include_all_wallets"]:
+        offset = params["wallets_offset"]
+        limit = params["wallets_limit"]
+        end = offset + limit if limit is not None else None
+        response["all_derived_wallets"] = wallets[offset:end]
+        response["all_derived_wallets_offset"] = offset
+
+
 @app.route('/derive_and_check', methods=['POST'])
 def derive_and_check():
     """
     Rota para receber os dados da seed, derivar endereços e consultar APIs.
     """
     try:
-        data = request.get_json()
+        params = _read_scan_params(request.get_json())
 
-        if not data:
-            return jsonify({"error": "Dados JSON inválidos ou vazios."}), 400
-
-        seed_phrase = data.get('seed_phrase')
-        passphrase = data.get('passphrase', '')
-
-        selected_networks = data.get('selected_networks', [])
-        account_indices_str = data.get('account_indices', '0')
-        address_indices_str = data.get('address_indices', '0-10')
-        bitcoin_address_types = data.get('bitcoin_address_types', [])
-        api_keys = data.get('api_keys', {})
-        change_types = data.get('change_types', [])
-
-        if not seed_phrase:
-            return jsonify({"error": "Seed phrase é obrigatória."}), 400
-
-        print(f"Recebida seed: {seed_phrase[:10]}...")
-        print(f"Passphrase usada: {'Sim' if passphrase else 'Não'}")
-        print(f"Redes selecionadas: {selected_networks}")
-        print(f"Contas: {account_indices_str}")
-        print(f"Índices: {address_indices_str}")
-        print(f"Tipos BTC: {bitcoin_address_types}")
-        print(f"Tipos de Cadeia (Change): {change_types}")
-
-        derived_wallets_full_list = derive_addresses(
-            seed_phrase,
-            passphrase,
-            selected_networks,
-            account_indices_str,
-            address_indices_str,
-            bitcoin_address_types,
-            change_types
+        derivation_cache = create_derivation_cache(
+            params["seed_phrase"], params["passphrase"], use_seed_cache=params["cache_seed"]
         )
-        print(f"Total de endereços derivados (lista completa): {len(derived_wallets_full_list)}")
+
+        if params["scan_mode"] == 'gap_limit':
+            # Derivação e consultas intercaladas, cadeia a cadeia, até o gap limit
+            scanned = scan_gap_limit(
+                derivation_cache,
+                params["selected_networks"],
+                params["bitcoin_address_types"],
+                params["change_types"],
+                params["api_keys"],
+                gap_limit=params["gap_limit"],
+                account_indices=parse_range_input(params["account_indices_str"]),
+                account_discovery=params["account_discovery"],
+                lazy_private_keys=params["lazy_private_keys"],
+                rate_limits=params["rate_limits"],
+                use_cache=params["use_cache"],
+                lookup_mode=params["lookup_mode"],
+                use_prescreen=params["use_prescreen"]
+            )
+            derived_wallets_full_list = [wallet_info for wallet_info, _ in scanned]
+            lookup_results = [blockchain_data for _, blockchain_data in scanned]
+            logger.info("Total de endereços varridos (gap limit %s): %d", params['gap_limit'], len(derived_wallets_full_list))
+        else:
+            derived_wallets_full_list = derive_addresses(
+                params["seed_phrase"],
+                params["passphrase"],
+                params["selected_networks"],
+                params["account_indices_str"],
+                params["address_indices_str"],
+                params["bitcoin_address_types"],
+                params["change_types"],
+                derivation_cache=derivation_cache,
+                lazy_private_keys=params["lazy_private_keys"]
+            )
+            logger.info("Total de endereços derivados (lista completa): %d", len(derived_wallets_full_list))
+
+            # Consultas concorrentes, limitadas por provedor; resultados na ordem da derivação
+            lookup_results = lookup_wallets(
+                derived_wallets_full_list, params["api_keys"],
+                rate_limits=params["rate_limits"], use_cache=params["use_cache"],
+                lookup_mode=params["lookup_mode"], use_prescreen=params["use_prescreen"]
+            )
 
         results_filtered = []
-        for i, wallet_info in enumerate(derived_wallets_full_list):
-            address = wallet_info['address']
-            network = wallet_info['network']
-            derivation_path = wallet_info['derivation_path']
-            private_key = wallet_info['private_key']
-            address_type = wallet_info.get('address_type', 'N/A')
-
-            print(f"Consultando dados para endereço {address} na rede {network}")
-
-            api_key_for_network = None
-            if network == "BTC":
-                api_key_for_network = api_keys.get('bitcoin')
-            elif network in ["ETH", "BSC", "MATIC", "BASE", "OPTIMISM", "ARBITRUM"]:
-                api_key_for_network = api_keys.get('ethereum')
-            elif network == "TRX":
-                api_key_for_network = api_keys.get('tron')
-
-            blockchain_data = get_blockchain_data(address, network, api_key_for_network)
-
-            if blockchain_data and not blockchain_data.get("error_fatal"):
-                balance_crypto = blockchain_data.get('balance_crypto', 0)
-                balance_usd = blockchain_data.get('balance_usd', 0)
-                has_transactions = blockchain_data.get('has_transactions', False)
-                explorer_link = blockchain_data.get('explorer_link', '#')
-                has_real_balance = blockchain_data.get('has_real_balance', False)
-                balance_satoshi = blockchain_data.get('balance_satoshi', 0)
-
-                if has_real_balance or has_transactions:
-                    result_item = {
-                        "address": address,
-                        "network": network,
-                        "balance_crypto": balance_crypto,
-                        "balance_usd": balance_usd,
-                        "has_transactions": has_transactions,
-                        "has_real_balance": has_real_balance,
-                        "derivation_path": derivation_path,
-                        "address_type": address_type,
-                        "private_key": private_key,
-                        "explorer_link": explorer_link
-                    }
-                    if network == "BTC":
-                        result_item["balance_satoshi"] = balance_satoshi
-                    results_filtered.append(result_item)
+        failed_total = 0
+        for wallet_info, blockchain_data in zip(derived_wallets_full_list, lookup_results):
+            result_item = build_result_item(wallet_info, blockchain_data, derivation_cache)
+            if result_item is not None:
+                results_filtered.append(result_item)
             elif blockchain_data and blockchain_data.get("error_fatal"):
-                print(f"AVISO: Endereço {address} na rede {network} não adicionado devido a erro fatal da API: {blockchain_data['error_fatal']}")
+                failed_total += 1
+
+        response = {
+            "success": True,
+            "results": results_filtered,
+            "all_derived_wallets_total": len(derived_wallets_full_list),
+            # Endereços que continuaram com erro depois das novas tentativas (ver utils.retry_policy)
+            "failed_total": failed_total,
+            "timings": g.request_timings.summary()
+        }
+        _add_all_wallets(response, params, derived_wallets_full_list)
+        return jsonify(response)
+
+    except ValueError as e:
+        logger.warning("Erro de validação/parsing: %s", e)
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.exception("Erro inesperado no backend: %s", e)
+        return jsonify({"error": "Ocorreu um erro inesperado no servidor"}), 500
+
+
+# Eventos de progresso no streaming: no máximo um a cada STREAM_PROGRESS_INTERVAL segundos
+STREAM_PROGRESS_INTERVAL = 0.5
+# Carteiras derivadas enviadas em lotes (para "Exportar Todos") em vez de uma linha por endereço
+STREAM_WALLETS_BATCH = 100
+
+
+def _ndjson_event(event):
+    return app.json.dumps(event) + "\n"
+
+
+def _iter_scan_params(params, derivation_cache, progress, cancel_event):
+    """Executa iter_scan com os parâmetros lidos por _read_scan_params."""
+    return iter_scan(
+        derivation_cache,
+        params["selected_networks"],
+        parse_range_input(params["account_indices_str"]) or [0],
+        parse_range_input(params["address_indices_str"]) or [0],
+        params["bitcoin_address_types"],
+        params["change_types"],
+        api_keys=params["api_keys"],
+        scan_mode=params["scan_mode"],
+        gap_limit=params["gap_limit"],
+        account_discovery=params["account_discovery"],
+        lazy_private_keys=params["lazy_private_keys"],
+        rate_limits=params["rate_limits"],
+        progress=progress,
+        cancel_event=cancel_event,
+        use_cache=params["use_cache"],
+        lookup_mode=params["lookup_mode"],
+        use_prescreen=params["use_prescreen"]
+    )
+
+
+def _stream_scan_events(params, derivation_cache, request_timings):
+    """
+    Gera os eventos NDJSON de uma varredura:
+    'start', 'result' (endereço com saldo/histórico), 'wallets' (lote de endereços derivados),
+    'progress' (derivados/consultados/restantes), 'done' (com o resumo de tempos) ou 'error'.
+    """
+    start_request_timings(request_timings)
+    status = "500"
+    progress = ScanProgress()
+    cancel_event = threading.Event()
+    wallets_batch = []
+    last_progress_at = time.monotonic()
+    started_at = last_progress_at
+
+    yield _ndjson_event({"type": "start", "scan_mode": params["scan_mode"]})
 
-            # Adicione um pequeno atraso apenas para evitar rate limits excessivos
-            # Ajuste conforme as APIs que você está usando
-            # No Render, você não deve abrir o navegador ou manter o processo com input/sleep
-            if i % 5 == 0 and network != "BTC":
-                time.sleep(0.5)
-            elif network == "BTC":
-                time.sleep(0.05)
+    try:
+        for wallet_info, blockchain_data in _iter_scan_params(params, derivation_cache, progress, cancel_event):
+            result_item = build_result_item(wallet_info, blockchain_data, derivation_cache)
+            if result_item is not None:
+                yield _ndjson_event({"type": "result", "result": result_item})
 
-        return jsonify({"success": True, "results": results_filtered, "all_derived_wallets": derived_wallets_full_list})
+            if params["include_all_wallets"]:
+                wallets_batch.append(wallet_info)
+            if len(wallets_batch) >= STREAM_WALLETS_BATCH:
+                yield _ndjson_event({"type": "wallets", "wallets": wallets_batch})
+                wallets_batch = []
 
+            now = time.monotonic()
+            if now - last_progress_at >= STREAM_PROGRESS_INTERVAL:
+                last_progress_at = now
+                yield _ndjson_event({"type": "progress", **progress.to_dict()})
+
+        if wallets_batch:
+            yield _ndjson_event({"type": "wallets", "wallets": wallets_batch})
+        yield _ndjson_event({
+            "type": "done",
+            **progress.to_dict(),
+            "elapsed_seconds": round(time.monotonic() - started_at, 3),
+            "timings": request_timings.summary()
+        })
+        status = "200"
+    except Exception as e:
+        logger.exception("Erro inesperado no streaming: %s", e)
+        yield _ndjson_event({"type": "error", "error": "Ocorreu um erro inesperado no servidor"})
+    finally:
+        cancel_event.set()
+        record_time(
+            HTTP_REQUEST_SECONDS, time.perf_counter() - request_timings.started_at,
+            route="/derive_and_check_stream", status=status
+        )
+
+
+@app.route('/derive_and_check_stream', methods=['POST'])
+def derive_and_check_stream():
+    """
+    Mesma varredura de /derive_and_check, mas com a resposta em NDJSON (um evento JSON por linha),
+    enviando cada endereço encontrado assim que sua consulta termina.
+    """
+    try:
+        params = _read_scan_params(request.get_json())
+        derivation_cache = create_derivation_cache(
+            params["seed_phrase"], params["passphrase"], use_seed_cache=params["cache_seed"]
+        )
     except ValueError as e:
-        error_msg = f"Erro de validação/parsing: {str(e)}\n{traceback.format_exc()}"
-        print(error_msg)
+        logger.warning("Erro de validação/parsing: %s", e)
+        return jsonify({"error": str(e)}), 400
+
+    response = Response(
+        stream_with_context(_stream_scan_events(params, derivation_cache, g.request_timings)),
+        mimetype='application/x-ndjson'
+    )
+    # Evita que proxies reversos acumulem a resposta antes de repassá-la ao navegador
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+# --- Varreduras em Segundo Plano (Jobs) ---
+def _estimate_scan_size(params):
+    """Número estimado de endereços de uma varredura por intervalo (None no modo gap limit)."""
+    if params["scan_mode"] == 'gap_limit':
+        return None
+    chains = sum(
+        len(params["bitcoin_address_types"]) if network == "BTC" else 1
+        for network in params["selected_networks"]
+    )
+    accounts = len(parse_range_input(params["account_indices_str"]) or [0])
+    indices = len(parse_range_input(params["address_indices_str"]) or [0])
+    return chains * accounts * max(1, len(params["change_types"])) * indices
+
+
+def _run_scan_job(job, derivation_cache):
+    """Executa a varredura de um job, registrando cada carteira e resultado no próprio job."""
+    timings = start_request_timings()
+    try:
+        for wallet_info, blockchain_data in _iter_scan_params(
+            job.params, derivation_cache, job.progress, job.cancel_event
+        ):
+            job.add(wallet_info, build_result_item(wallet_info, blockchain_data, derivation_cache))
+    finally:
+        job.timings = timings.summary()
+
+
+def _job_urls(job_id):
+    return {
+        "poll_url": url_for('get_job', job_id=job_id),
+        "stream_url": url_for('stream_job', job_id=job_id),
+        "cancel_url": url_for('cancel_job', job_id=job_id),
+    }
+
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """
+    Enfileira uma varredura (mesmos parâmetros de /derive_and_check) e retorna o ID do job.
+    A seed é usada só para gerar a semente BIP39 aqui; o job não guarda a seed phrase.
+    """
+    try:
+        params = _read_scan_params(request.get_json())
+        derivation_cache = create_derivation_cache(
+            params.pop("seed_phrase"), params.pop("passphrase"), use_seed_cache=params["cache_seed"]
+        )
+    except ValueError as e:
+        logger.warning("Erro de validação/parsing: %s", e)
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        job = get_job_manager().submit(
+            functools.partial(_run_scan_job, derivation_cache=derivation_cache),
+            params, _estimate_scan_size(params)
+        )
+    except JobQueueFullError as e:
+        return jsonify({"error": str(e)}), 429
+
+    return jsonify({"job_id": job.id, "status": job.status, **_job_urls(job.id)}), 202
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    Estado do job. Query string: results_from (só resultados a partir desse índice),
+    wallets_from (inclui as carteiras derivadas a partir desse índice) e wallets_limit (tamanho da página).
+    """
+    job = get_job_manager().get(job_id)
+    if job is None:
+        return jsonify({"error": "Job não encontrado ou expirado."}), 404
+    snapshot = job.snapshot(
+        results_from=max(0, request.args.get('results_from', 0, type=int)),
+        wallets_from=request.args.get('wallets_from', type=int),
+        wallets_limit=request.args.get('wallets_limit', type=int)
+    )
+    return jsonify({**snapshot, **_job_urls(job_id)})
+
+
+def _stream_job_events(job):
+    """Eventos NDJSON de um job (mesmos tipos de /derive_and_check_stream, mais 'cancelled')."""
+    results_seen = 0
+    wallets_seen = 0
+    last_progress_at = time.monotonic()
+
+    yield _ndjson_event({"type": "start", "job_id": job.id, "status": job.status})
+    while True:
+        job.wait_for_update(
+            results_seen, wallets_seen, timeout=STREAM_PROGRESS_INTERVAL, wallets_batch=STREAM_WALLETS_BATCH
+        )
+        snapshot = job.snapshot(results_from=results_seen, wallets_from=wallets_seen)
+        finished = snapshot["status"] in FINISHED_STATES
+
+        for result_item in snapshot["results"]:
+            yield _ndjson_event({"type": "result", "result": result_item})
+        results_seen += len(snapshot["results"])
+
+        # Carteiras em lotes completos; o resto só no fim do job
+        wallets = snapshot["wallets"]
+        if not finished:
+            wallets = wallets[:len(wallets) - len(wallets) % STREAM_WALLETS_BATCH]
+        for start in range(0, len(wallets), STREAM_WALLETS_BATCH):
+            yield _ndjson_event({"type": "wallets", "wallets": wallets[start:start + STREAM_WALLETS_BATCH]})
+        wallets_seen += len(wallets)
+
+        if finished:
+            if snapshot["status"] == JOB_DONE:
+                yield _ndjson_event({"type": "done", **snapshot["progress"], "timings": snapshot["timings"]})
+            elif snapshot["status"] == JOB_ERROR:
+                yield _ndjson_event({"type": "error", "error": snapshot["error"]})
+            else:
+                yield _ndjson_event({"type": "cancelled", **snapshot["progress"]})
+            return
+
+        now = time.monotonic()
+        if now - last_progress_at >= STREAM_PROGRESS_INTERVAL:
+            last_progress_at = now
+            yield _ndjson_event({"type": "progress", "status": snapshot["status"], **snapshot["progress"]})
+
+
+@app.route('/jobs/<job_id>/stream', methods=['GET'])
+def stream_job(job_id):
+    """
+    Acompanha o job em NDJSON desde o início. Fechar a conexão não cancela o job.
+    """
+    job = get_job_manager().get(job_id)
+    if job is None:
+        return jsonify({"error": "Job não encontrado ou expirado."}), 404
+    response = Response(_stream_job_events(job), mimetype='application/x-ndjson')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancela o job; as consultas em andamento terminam, mas nenhuma nova é iniciada."""
+    job = get_job_manager().cancel(job_id)
+    if job is None:
+        return jsonify({"error": "Job não encontrado ou expirado."}), 404
+    return jsonify({"job_id": job.id, "status": job.status})
+
+
+# --- Sessões de Varredura Incremental ---
+def _run_session_scan(session, params):
+    """
+    Varre, para cada cadeia pedida, só os índices de address_indices que a sessão ainda não varreu
+    (e os que falharam antes), e devolve a resposta no formato de /derive_and_check com o estado da sessão.
+    """
+    if params["scan_mode"] != 'range':
+        raise ValueError("Sessões de varredura só aceitam scan_mode 'range'.")
+    session.check_seed(params["seed_phrase"], params["passphrase"])
+    derivation_cache = create_derivation_cache(
+        params["seed_phrase"], params["passphrase"], use_seed_cache=params["cache_seed"]
+    )
+    chains = plan_chains(
+        params["selected_networks"], parse_range_input(params["account_indices_str"]) or [0],
+        params["bitcoin_address_types"], params["change_types"]
+    )
+
+    session.acquire()
+    try:
+        plan = session.plan(chains, parse_range_input(params["address_indices_str"]) or [0])
+        wallets = []
+        results_filtered = []
+        failed_total = 0
+        for wallet_info, blockchain_data in iter_scan_chain_ranges(
+            derivation_cache, plan, params["api_keys"], params["lazy_private_keys"], params["rate_limits"],
+            use_cache=params["use_cache"], lookup_mode=params["lookup_mode"],
+            use_prescreen=params["use_prescreen"]
+        ):
+            failed = bool(blockchain_data and blockchain_data.get("error_fatal"))
+            session.record(wallet_info, is_used_address(blockchain_data), failed)
+            failed_total += failed
+            wallets.append(wallet_info)
+            result_item = build_result_item(wallet_info, blockchain_data, derivation_cache)
+            if result_item is not None:
+                results_filtered.append(result_item)
+    finally:
+        session.release()
+
+    logger.info("Sessão %s: %d endereços novos varridos", session.id, len(wallets))
+    response = {
+        "success": True,
+        "session": session.to_dict(),
+        # Só os endereços desta requisição (os já varridos na sessão não são repetidos)
+        "results": results_filtered,
+        "all_derived_wallets_total": len(wallets),
+        "failed_total": failed_total,
+        "timings": g.request_timings.summary()
+    }
+    _add_all_wallets(response, params, wallets)
+    return response
+
+
+@app.route('/scan_sessions', methods=['POST'])
+def create_scan_session():
+    """
+    Cria uma sessão de varredura e faz a primeira varredura (mesmos parâmetros de /derive_and_check,
+    modo range). A sessão guarda os parâmetros, menos a seed, a passphrase e as chaves de API, e só
+    é registrada se essa varredura terminar.
+    """
+    try:
+        data = request.get_json()
+        params = _read_scan_params(data)
+        if params["scan_mode"] != 'range':
+            raise ValueError("Sessões de varredura só aceitam scan_mode 'range'.")
+        session = ScanSession(params["seed_phrase"], params["passphrase"], data)
+        response = _run_session_scan(session, params)
+        get_session_store().add(session)
+        return jsonify(response), 201
+    except ValueError as e:
+        logger.warning("Erro de validação/parsing: %s", e)
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.exception("Erro inesperado no backend: %s", e)
+        return jsonify({"error": "Ocorreu um erro inesperado no servidor"}), 500
+
+
+@app.route('/scan_sessions/<session_id>/continue', methods=['POST'])
+def continue_scan_session(session_id):
+    """
+    Continua a sessão: com address_indices (ex.: "0-100" depois de "0-50"), deriva e consulta só os
+    índices novos. account_indices, change_types e redes novos entram como cadeias novas, varridas
+    desde o início do intervalo. seed_phrase, passphrase e api_keys precisam ser reenviadas (a sessão
+    não as guarda); os demais parâmetros omitidos vêm da sessão.
+    """
+    session = get_session_store().get(session_id)
+    if session is None:
+        return jsonify({"error": "Sessão não encontrada ou expirada."}), 404
+    try:
+        params = _read_scan_params({**session.scan_inputs, **(request.get_json() or {})})
+        return jsonify(_run_session_scan(session, params))
+    except SessionBusyError as e:
+        return jsonify({"error": str(e)}), 409
+    except ValueError as e:
+        logger.warning("Erro de validação/parsing: %s", e)
         return jsonify({"error": str(e)}), 400
     except Exception as e:
-        error_msg = f"Erro inesperado no backend: {str(e)}\n{traceback.format_exc()}"
-        print(error_msg)
+        logger.exception("Erro inesperado no backend: %s", e)
         return jsonify({"error": "Ocorreu um erro inesperado no servidor"}), 500
 
+
+@app.route('/scan_sessions/<session_id>', methods=['GET'])
+def get_scan_session(session_id):
+    """Estado da sessão: intervalos varridos, último índice usado e índices com erro por cadeia."""
+    session = get_session_store().get(session_id)
+    if session is None:
+        return jsonify({"error": "Sessão não encontrada ou expirada."}), 404
+    return jsonify(session.to_dict())
+
+
+@app.route('/scan_sessions/<session_id>', methods=['DELETE'])
+def delete_scan_session(session_id):
+    if not get_session_store().delete(session_id):
+        return jsonify({"error": "Sessão não encontrada ou expirada."}), 404
+    return jsonify({"session_id": session_id, "deleted": True})
+
+
+@app.route('/metrics')
+def metrics():
+    """
+    Métricas do processo no formato de texto do Prometheus: tempo de geração da semente,
+    derivação por rede, requisições às APIs, esperas e reduções por limite de taxa e cache de consultas.
+    """
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+
+@app.route('/backends')
+def backends():
+    """Estado dos backends de cada provedor: circuito, latência média e taxa de erros recentes."""
+    return jsonify({"backends": backends_status()})
+
 # --- Ponto de Entrada Principal para Deploy no Render ---
 if __name__ == '__main__':
     # Define a porta a partir da variável de ambiente 'PORT' do Render, ou usa 5000 como fallback
@@ -0,0 +1,277 @@
+import json
+import time
+import random
+import hashlib
+import threading
+import collections
+import urllib.parse
+import http.server
+from contextlib import contextmanager
+
+from utils import blockchain_api, evm_rpc, providers
+
+# --- Servidor Local que Imita Blockstream, Etherscan V2, TronGrid e Nós JSON-RPC EVM ---
+# Usado pelos benchmarks para medir a varredura sem depender das APIs reais.
+# Os endereços "usados" são escolhidos de forma determinística (hash do endereço),
+# então duas execuções com a mesma configuração consultam e encontram os mesmos endereços.
+MOCK_DEFAULTS = {
+    "latency_ms": 50.0,       # Latência fixa de cada resposta
+    "jitter_ms": 10.0,        # Variação aleatória somada à latência (0..jitter_ms)
+    "error_rate": 0.0,        # Fração de respostas HTTP 500
+    "rate_limit_rate": 0.0,   # Fração de respostas de limite de taxa (429 ou status "0" na Etherscan)
+    "used_ratio": 0.05,       # Fração dos endereços com saldo/histórico
+    "seed": 1234,             # Semente do gerador de erros/latência
+}
+
+# Prefixo de cada provedor no servidor simulado (base_url dos backends de utils.providers)
+MOCK_PATHS = {
+    "blockstream": "/blockstream",
+    "etherscan": "/etherscan/v2/api",
+    "trongrid": "/trongrid",
+}
+
+# Nós JSON-RPC simulados: POST /rpc/<REDE> (ver mock_providers(rpc=True))
+MOCK_RPC_PATH = "/rpc"
+
+
+def is_mock_used(address, used_ratio):
+    """Decide, de forma determinística, se o endereço tem saldo/histórico no servidor simulado."""
+    digest = hashlib.sha256(address.lower().encode()).digest()
+    return int.from_bytes(digest[:4], "big") < used_ratio * 2 ** 32
+
+
+class _MockHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        server = self.server
+        parsed = urllib.parse.urlparse(self.path)
+        query = dict(urllib.parse.parse_qsl(parsed.query))
+        parts = [part for part in parsed.path.split("/") if part]
+        provider, rest = (parts[0], parts[1:]) if parts else ("", [])
+        if provider == "etherscan":
+            endpoint = query.get("action")
+        elif provider == "trongrid":
+            # /v1/accounts/{endereço} ou /v1/accounts/{endereço}/transactions
+            endpoint = rest[3] if len(rest) > 3 else "accounts"
+        else:
+            endpoint = rest[0] if rest else ""
+        server.record(provider, endpoint)
+
+        delay, outcome = server.draw_outcome()
+        if delay:
+            time.sleep(delay)
+
+        if outcome == "error":
+            return self._send_json(500, {"error": "Erro simulado"})
+        if outcome == "rate_limited":
+            if provider == "etherscan":
+                return self._send_json(200, {"status": "0", "message": "NOTOK", "result": "Max rate limit reached"})
+            return self._send_json(429, {"error": "Too Many Requests"})
+
+        if provider == "blockstream":
+            return self._send_json(200, server.blockstream_address(rest[1] if len(rest) > 1 else ""))
+        if provider == "etherscan":
+            return self._send_json(200, server.etherscan(query))
+        if provider == "trongrid":
+            return self._send_json(200, server.trongrid(rest))
+        return self._send_json(404, {"error": "Rota não simulada"})
+
+    def do_POST(self):
+        server = self.server
+        parts = [part for part in urllib.parse.urlparse(self.path).path.split("/") if part]
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if len(parts) != 2 or parts[0] != MOCK_RPC_PATH.strip("/"):
+            return self._send_json(404, {"error": "Rota não simulada"})
+        # Uma requisição por lote: é o custo que o backend JSON-RPC reduz
+        server.record("rpc", parts[1])
+
+        delay, outcome = server.draw_outcome()
+        if delay:
+            time.sleep(delay)
+        if outcome == "error":
+            return self._send_json(500, {"error": "Erro simulado"})
+        if outcome == "rate_limited":
+            return self._send_json(429, {"error": "Too Many Requests"})
+
+        calls = json.loads(body)
+        if not isinstance(calls, list):
+            return self._send_json(200, server.rpc_call(calls))
+        return self._send_json(200, [server.rpc_call(call) for call in calls])
+
+
+class MockProviderServer(http.server.ThreadingHTTPServer):
+    """
+    Servidor HTTP local com respostas no formato das APIs usadas por blockchain_api,
+    com latência, erros e limite de taxa configuráveis. Conta as requisições por endpoint.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, **options):
+        super().__init__((host, port), _MockHandler)
+        self.options = {**MOCK_DEFAULTS, **options}
+        self._random = random.Random(self.options["seed"])
+        self._lock = threading.Lock()
+        self.request_counts = collections.Counter()
+        self._thread = None
+        # Servidor reserva (ver mock_providers(standby=...))
+        self.standby = None
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def record(self, provider, endpoint):
+        with self._lock:
+            self.request_counts[f"{provider}:{endpoint}"] += 1
+
+    def reset_counts(self):
+        with self._lock:
+            self.request_counts.clear()
+
+    def draw_outcome(self):
+        with self._lock:
+            delay = (self.options["latency_ms"] + self._random.random() * self.options["jitter_ms"]) / 1000
+            roll = self._random.random()
+        if roll < self.options["error_rate"]:
+            return delay, "error"
+        if roll < self.options["error_rate"] + self.options["rate_limit_rate"]:
+            return delay, "rate_limited"
+        return delay, "ok"
+
+    def _used(self, address):
+        return is_mock_used(address, self.options["used_ratio"])
+
+    def blockstream_address(self, address):
+        used = self._used(address)
+        return {
+            "address": address,
+            "chain_stats": {
+                "funded_txo_count": 1 if used else 0, "funded_txo_sum": 150000 if used else 0,
+                "spent_txo_count": 0, "spent_txo_sum": 0, "tx_count": 1 if used else 0
+            },
+            "mempool_stats": {
+                "funded_txo_count": 0, "funded_txo_sum": 0,
+                "spent_txo_count": 0, "spent_txo_sum": 0, "tx_count": 0
+            }
+        }
+
+    def etherscan(self, query):
+        action = query.get("action")
+        address = query.get("address", "")
+        if action == "balancemulti":
+            return {"status": "1", "message": "OK", "result": [
+                {"account": account, "balance": "1000000000000000" if self._used(account) else "0"}
+                for account in address.split(",")
+            ]}
+        if action == "balance":
+            return {"status": "1", "message": "OK", "result": "1000000000000000" if self._used(address) else "0"}
+        if action in ("txlist", "tokentx"):
+            if self._used(address):
+                return {"status": "1", "message": "OK", "result": [{"hash": "0x" + "0" * 64, "from": address}]}
+            return {"status": "0", "message": "No transactions found", "result": []}
+        if action == "tokenbalance":
+            return {"status": "1", "message": "OK", "result": "2500000" if self._used(address) else "0"}
+        return {"status": "0", "message": "NOTOK", "result": "Ação não simulada"}
+
+    def _rpc_balance(self, selector, address):
+        # balanceOf (USDT) ou getEthBalance (Multicall3) de um endereço usado
+        if not self._used(address):
+            return 0
+        return 2500000 if selector == "70a08231" else 10 ** 15
+
+    def _rpc_aggregate3(self, data):
+        words = bytes.fromhex(data)
+        read = lambda offset: int.from_bytes(words[offset:offset + 32], "big")
+        count = read(32)
+        results = []
+        for i in range(count):
+            start = 64 + read(64 + i * 32)
+            call_data = words[start + read(start + 64) + 32:][:read(start + read(start + 64))].hex()
+            value = self._rpc_balance(call_data[:8], "0x" + call_data[-40:])
+            results.append(format(1, "064x") + format(64, "064x") + format(32, "064x") + format(value, "064x"))
+        offsets, position = [], count * 32
+        for encoded in results:
+            offsets.append(format(position, "064x"))
+            position += len(encoded) // 2
+        return "0x" + format(32, "064x") + format(count, "064x") + "".join(offsets) + "".join(results)
+
+    def rpc_call(self, call):
+        method = call.get("method")
+        params = call.get("params") or []
+        response = {"jsonrpc": "2.0", "id": call.get("id")}
+        if method == "eth_getBalance":
+            response["result"] = hex(10 ** 15 if self._used(params[0]) else 0)
+        elif method == "eth_getTransactionCount":
+            response["result"] = hex(1 if self._used(params[0]) else 0)
+        elif method == "eth_call":
+            data = params[0].get("data", "")[2:]
+            if data.startswith("82ad56cb"):
+                response["result"] = self._rpc_aggregate3(data[8:])
+            else:
+                response["result"] = "0x" + format(self._rpc_balance(data[:8], "0x" + data[-40:]), "064x")
+        else:
+            response["error"] = {"code": -32601, "message": "Método não simulado"}
+        return response
+
+    def trongrid(self, rest):
+        address = rest[2] if len(rest) > 2 else ""
+        used = self._used(address)
+        if len(rest) > 3 and rest[3] == "transactions":
+            return {"success": True, "data": [{"txID": "0" * 64}] if used else [], "meta": {}}
+        data = [{"address": address, "balance": 5000000, "trc20": []}] if used else []
+        return {"success": True, "data": data, "meta": {}}
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+@contextmanager
+def mock_providers(standby=None, rpc=False, **options):
+    """
+    Sobe o servidor simulado e aponta os backends de utils.providers para ele durante o bloco.
+    standby: opções (como em MOCK_DEFAULTS) de um segundo servidor, registrado como backend reserva
+    de todos os provedores, para medir failover e roteamento por latência; fica em server.standby.
+    rpc: registra também nós JSON-RPC simulados para todas as redes EVM, que deixam de usar a Etherscan.
+    Restaura os backends anteriores ao sair.
+    """
+    server = MockProviderServer(**options).start()
+    servers = [server]
+    if standby is not None:
+        server.standby = MockProviderServer(**standby).start()
+        servers.append(server.standby)
+    paths = dict(MOCK_PATHS)
+    if rpc:
+        paths.update({
+            evm_rpc.rpc_provider(network): f"{MOCK_RPC_PATH}/{network}" for network in blockchain_api.EVM_NETWORKS
+        })
+    previous = {
+        provider: providers.configure_backends(provider, [f"{item.base_url}{path}" for item in servers])
+        for provider, path in paths.items()
+    }
+    try:
+        yield server
+    finally:
+        for provider, urls in previous.items():
+            providers.configure_backends(provider, urls)
+        for item in servers:
+            item.stop()
@@ -0,0 +1,251 @@
+"""
+Benchmarks da varredura, sem acesso às APIs reais.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --only derivation --indices 500
+    python -m benchmarks.run --latency-ms 100 --error-rate 0.02 --rate-limit-rate 0.05
+
+O resultado é um JSON com metadados (commit, Python, CPUs) e as medições de cada benchmark,
+para comparar execuções entre commits.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+from benchmarks.mock_providers import mock_providers, MOCK_DEFAULTS
+from utils import blockchain_api, evm_rpc
+from utils.logging_config import configure_logging
+from utils.wallet_derivation import (
+    NETWORK_CONFIGS, DerivationCache, create_derivation_cache, derive_addresses, derive_chain_addresses
+)
+
+# Seed pública de teste (BIP39); nunca use uma seed real em benchmarks
+BENCH_SEED = "abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon about"
+ALL_NETWORKS = list(NETWORK_CONFIGS.keys())
+BTC_ADDRESS_TYPES = list(NETWORK_CONFIGS["BTC"]["derivation_paths"].keys())
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _rate(count, seconds):
+    return round(count / seconds, 2) if seconds > 0 else None
+
+
+def bench_derivation(indices, repeat):
+    """Endereços por segundo em cada rede e tipo de endereço BTC (melhor de 'repeat' execuções)."""
+    seed_bytes = create_derivation_cache(BENCH_SEED, "").seed_bytes
+    address_indices = list(range(indices))
+    chains = [("BTC", btc_type) for btc_type in BTC_ADDRESS_TYPES]
+    chains += [(network, None) for network in ALL_NETWORKS if network != "BTC"]
+
+    results = []
+    for network, btc_type in chains:
+        for lazy in (False, True):
+            best = None
+            for _ in range(repeat):
+                # Cache novo a cada execução: mede a derivação completa, sem reaproveitamento
+                derivation_cache = DerivationCache(seed_bytes)
+                started = time.perf_counter()
+                derive_chain_addresses(derivation_cache, network, 0, 0, address_indices, btc_type, lazy)
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            results.append({
+                "network": network,
+                "address_type": btc_type,
+                "lazy_private_keys": lazy,
+                "addresses": indices,
+                "seconds": round(best, 4),
+                "addresses_per_second": _rate(indices, best),
+            })
+
+    # derive_addresses completo (todas as redes, com compartilhamento entre redes EVM e pool de processos)
+    started = time.perf_counter()
+    wallets = derive_addresses(
+        BENCH_SEED, "", ALL_NETWORKS, "0", f"0-{indices - 1}", BTC_ADDRESS_TYPES, [0, 1]
+    )
+    elapsed = time.perf_counter() - started
+    results.append({
+        "network": "ALL",
+        "address_type": None,
+        "lazy_private_keys": False,
+        "addresses": len(wallets),
+        "seconds": round(elapsed, 4),
+        "addresses_per_second": _rate(len(wallets), elapsed),
+    })
+    return results
+
+
+def _provider_rate_limits(provider_rate):
+    """Limites de taxa no formato do parâmetro 'rate_limits' da API ({} mantém os padrões)."""
+    if not provider_rate:
+        return {}
+    return {
+        provider: {"rate": provider_rate, "burst": max(1, int(provider_rate))}
+        for provider in blockchain_api.RATE_LIMIT_CONFIG
+    }
+
+
+def bench_lookup_functions(server, samples, rate_limits, lookup_mode, evm_backend="etherscan"):
+    """
+    Latência média e requisições por chamada de get_btc_data, get_evm_data (ou get_evm_data_rpc,
+    com evm_backend="rpc") e get_trx_data.
+    """
+    for provider, config in rate_limits.items():
+        blockchain_api.configure_rate_limit(provider, rate=config["rate"], burst=config["burst"])
+    derivation_cache = create_derivation_cache(BENCH_SEED, "")
+    evm_case = ("get_evm_data", "ETH", None,
+                lambda address: blockchain_api.get_evm_data(address, "ETH", lookup_mode=lookup_mode))
+    if evm_backend == "rpc":
+        evm_case = ("get_evm_data_rpc", "ETH", None, lambda address: evm_rpc.get_evm_data_rpc(address, "ETH"))
+    cases = [
+        ("get_btc_data", "BTC", "BECH32", lambda address: blockchain_api.get_btc_data(address)),
+        evm_case,
+        ("get_trx_data", "TRX", None, lambda address: blockchain_api.get_trx_data(address)),
+    ]
+
+    results = []
+    for name, network, btc_type, call in cases:
+        wallets = derive_chain_addresses(derivation_cache, network, 0, 0, range(samples), btc_type, True)
+        server.reset_counts()
+        started = time.perf_counter()
+        for wallet_info in wallets:
+            call(wallet_info["address"])
+        elapsed = time.perf_counter() - started
+        requests_made = sum(server.request_counts.values())
+        results.append({
+            "function": name,
+            "calls": samples,
+            "seconds": round(elapsed, 4),
+            "mean_ms": round(elapsed / samples * 1000, 2),
+            "requests": requests_made,
+            "requests_per_call": round(requests_made / samples, 3),
+            "requests_by_endpoint": dict(server.request_counts),
+        })
+    return results
+
+
+def bench_scan(server, args, rate_limits):
+    """Varredura ponta a ponta pela rota /derive_and_check (cliente de teste do Flask)."""
+    import app as fenix_app
+
+    client = fenix_app.app.test_client()
+
+    # Sem chaves de API, 'rate_limits' na requisição não altera o balde compartilhado: ajusta aqui
+    for provider, config in rate_limits.items():
+        blockchain_api.configure_rate_limit(provider, rate=config["rate"], burst=config["burst"])
+
+    scenarios = [
+        ("range", {"scan_mode": "range", "address_indices": f"0-{args.scan_indices - 1}"}),
+        ("gap_limit", {"scan_mode": "gap_limit", "gap_limit": args.scan_indices, "account_discovery": False}),
+    ]
+
+    results = []
+    for name, options in scenarios:
+        body = {
+            "seed_phrase": BENCH_SEED,
+            "selected_networks": args.scan_networks,
+            "account_indices": "0",
+            "bitcoin_address_types": ["P2PKH", "BECH32"],
+            "change_types": [0],
+            "use_cache": False,
+            "lookup_mode": args.lookup_mode,
+            "lazy_private_keys": True,
+            **options,
+        }
+        server.reset_counts()
+        started = time.perf_counter()
+        response = client.post("/derive_and_check", json=body)
+        elapsed = time.perf_counter() - started
+        payload = response.get_json() or {}
+        scanned = payload.get("all_derived_wallets_total", 0)
+        requests_made = sum(server.request_counts.values())
+        results.append({
+            "scenario": name,
+            "status_code": response.status_code,
+            "addresses": scanned,
+            "found": len(payload.get("results", [])),
+            "seconds": round(elapsed, 4),
+            "addresses_per_second": _rate(scanned, elapsed),
+            "requests": requests_made,
+            "requests_per_address": round(requests_made / scanned, 3) if scanned else None,
+            "requests_by_endpoint": dict(server.request_counts),
+        })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks da varredura do Fênix (APIs simuladas localmente).")
+    parser.add_argument("--output", help="Arquivo JSON de saída (padrão: stdout)")
+    parser.add_argument("--only", choices=["derivation", "lookup", "scan"], action="append",
+                        help="Executa só os benchmarks indicados (pode repetir)")
+    parser.add_argument("--indices", type=int, default=200, help="Índices por cadeia no benchmark de derivação")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetições da derivação (vale a melhor)")
+    parser.add_argument("--samples", type=int, default=20, help="Chamadas por função no benchmark de consulta")
+    parser.add_argument("--scan-indices", type=int, default=20, help="Índices (ou gap limit) da varredura")
+    parser.add_argument("--scan-networks", nargs="+", default=["BTC", "ETH", "TRX"])
+    parser.add_argument("--lookup-mode", choices=blockchain_api.LOOKUP_MODES, default=blockchain_api.LOOKUP_MODE_FULL,
+                        help="Modo de consulta (full ou probe)")
+    parser.add_argument("--evm-backend", choices=["etherscan", "rpc"], default="etherscan",
+                        help="Redes EVM pela Etherscan simulada ou por nós JSON-RPC simulados")
+    parser.add_argument("--provider-rate", type=float, default=50.0,
+                        help="Req/s por provedor nas consultas (0 = limites padrão de RATE_LIMIT_CONFIG)")
+    for option, default in MOCK_DEFAULTS.items():
+        parser.add_argument(f"--{option.replace('_', '-')}", type=type(default), default=default,
+                            help=f"Servidor simulado: {option} (padrão: {default})")
+    parser.add_argument("--log-level", default="WARNING", help="Nível de log do backend durante as medições")
+    args = parser.parse_args(argv)
+    # Antes de importar app, que também chama configure_logging (só a primeira chamada vale)
+    configure_logging(level=args.log_level)
+    selected = set(args.only or ["derivation", "lookup", "scan"])
+    mock_options = {option: getattr(args, option) for option in MOCK_DEFAULTS}
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": vars(args),
+        },
+        "results": {},
+    }
+
+    if "derivation" in selected:
+        report["results"]["derivation"] = bench_derivation(args.indices, args.repeat)
+
+    if selected & {"lookup", "scan"}:
+        rate_limits = _provider_rate_limits(args.provider_rate)
+        with mock_providers(rpc=args.evm_backend == "rpc", **mock_options) as server:
+            if "lookup" in selected:
+                report["results"]["lookup"] = bench_lookup_functions(
+                    server, args.samples, rate_limits, args.lookup_mode, args.evm_backend
+                )
+            if "scan" in selected:
+                report["results"]["scan"] = bench_scan(server, args, rate_limits)
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+        print(f"Resultados gravados em {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -44,6 +44,16 @@ async function searchAddresses() {
     const passphrase = usePassphrase ? document.getElementById('passphrase').value : '';
     // FIM DA ALTERAÇÃO
 
+    const fastModeElement = document.getElementById('lazyPrivateKeys');
+    const lazyPrivateKeys = fastModeElement ? fastModeElement.checked : false;
+
+    // Varredura por gap limit: ignora o intervalo de índices e para após N endereços seguidos sem uso
+    const gapLimitModeElement = document.getElementById('gapLimitMode');
+    const gapLimitMode = gapLimitModeElement ? gapLimitModeElement.checked : false;
+    const gapLimit = parseInt(document.getElementById('gapLimit')?.value, 10) || 20;
+    // Descoberta de contas (só no modo gap limit): opção própria, desmarcada por padrão
+    const accountDiscovery = gapLimitMode && (document.getElementById('accountDiscovery')?.checked || false);
+
     // Safely get API keys, defaulting to empty string if element is null
     const apiKeyEthereumElement = document.getElementById('apiKeyEthereum');
     const apiKeyTronElement = document.getElementById('apiKeyTron');
@@ -63,14 +73,21 @@ async function searchAddresses() {
     document.getElementById('resultsTable').querySelector('tbody').innerHTML = ''; 
     document.getElementById('totalUsdValue').textContent = '$0.00'; 
     document.getElementById('foundCount').textContent = '0';
+    const scanProgressElement = document.getElementById('scanProgress');
+    if (scanProgressElement) {
+        scanProgressElement.textContent = '';
+    }
     allDerivedWalletsData = []; // Limpa a lista de todos os endereços antes de uma nova busca
 
     document.getElementById('searchButton').disabled = true; // Desabilita o botão para evitar cliques múltiplos
     document.getElementById('searchButton').textContent = 'Buscando...';
 
 
+    const scanState = { found: 0, totalUsd: 0 };
+
     try {
-        const response = await fetch('/derive_and_check', {
+        // Rota de streaming: cada endereço encontrado chega como uma linha NDJSON assim que é consultado
+        const response = await fetch('/derive_and_check_stream', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
@@ -84,19 +101,28 @@ async function searchAddresses() {
                 address_indices: indexRange,
                 bitcoin_address_types: btcAddressTypes,
                 api_keys: apiKeys, 
-                change_types: changeTypes
+                change_types: changeTypes,
+                lazy_private_keys: lazyPrivateKeys,
+                scan_mode: gapLimitMode ? 'gap_limit' : 'range',
+                gap_limit: gapLimit,
+                account_discovery: accountDiscovery,
+                // Pede os eventos 'wallets' (lista completa para "Exportar Todos"); a API não os envia por padrão
+                include_all_wallets: true
             })
             // FIM DA ALTERAÇÃO
         });
 
-        const result = await response.json();
-
-        if (response.ok) {
-            displayResults(result.results);
-            allDerivedWalletsData = result.all_derived_wallets || []; 
-        } else {
+        if (!response.ok) {
+            const result = await response.json();
             document.getElementById('errorMessage').textContent = `Erro: ${result.error || 'Ocorreu um erro desconhecido.'}`;
             document.getElementById('errorMessage').style.display = 'block';
+            return;
+        }
+
+        await readNdjsonStream(response, event => handleScanEvent(event, scanState));
+
+        if (scanState.found === 0) {
+            showNoResultsRow();
         }
 
     } catch (error) {
@@ -110,6 +136,161 @@ async function searchAddresses() {
     }
 }
 
+// Lê uma resposta NDJSON (um objeto JSON por linha) e chama onEvent para cada linha completa
+async function readNdjsonStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) {
+            break;
+        }
+        buffer += decoder.decode(value, { stream: true });
+
+        const lines = buffer.split('\n');
+        buffer = lines.pop(); // A última linha pode estar incompleta
+        lines.forEach(line => {
+            if (line.trim()) {
+                onEvent(JSON.parse(line));
+            }
+        });
+    }
+
+    buffer += decoder.decode();
+    if (buffer.trim()) {
+        onEvent(JSON.parse(buffer));
+    }
+}
+
+function handleScanEvent(event, scanState) {
+    switch (event.type) {
+        case 'result':
+            scanState.found += 1;
+            scanState.totalUsd += appendResultRow(event.result);
+            document.getElementById('foundCount').textContent = scanState.found;
+            document.getElementById('totalUsdValue').textContent = `$${scanState.totalUsd.toFixed(2)}`;
+            break;
+        case 'wallets':
+            allDerivedWalletsData.push(...event.wallets);
+            break;
+        case 'progress':
+        case 'done':
+            updateScanProgress(event);
+            break;
+        case 'error':
+            document.getElementById('errorMessage').textContent = `Erro: ${event.error || 'Ocorreu um erro desconhecido.'}`;
+            document.getElementById('errorMessage').style.display = 'block';
+            break;
+    }
+}
+
+function updateScanProgress(event) {
+    const progressElement = document.getElementById('scanProgress');
+    if (!progressElement) {
+        return;
+    }
+    let text = `Derivados: ${event.derived} | Consultados: ${event.queried}`;
+    if (event.remaining !== null && typeof event.remaining !== 'undefined') {
+        text += ` | Restantes: ${event.remaining}`;
+    }
+    if (event.type === 'done' && typeof event.elapsed_seconds !== 'undefined') {
+        text += ` | Concluído em ${event.elapsed_seconds}s`;
+    }
+    progressElement.textContent = text;
+}
+
+function showNoResultsRow() {
+    const tbody = document.getElementById('resultsTable').querySelector('tbody');
+    const row = tbody.insertRow();
+    const cell = row.insertCell();
+    cell.colSpan = 7; // Ajustado para o novo número de colunas (7)
+    cell.textContent = 'Nenhum endereço com saldo ou histórico encontrado para os parâmetros informados.';
+    cell.style.textAlign = 'center';
+    cell.style.fontStyle = 'italic';
+    cell.style.color = 'var(--text-secondary)';
+}
+
+// Adiciona uma linha de resultado à tabela e retorna o valor em USD do endereço (0 se não houver)
+function appendResultRow(item) {
+    const tbody = document.getElementById('resultsTable').querySelector('tbody');
+    const row = tbody.insertRow();
+    
+    const addressCell = row.insertCell();
+    addressCell.textContent = item.address;
+    addressCell.style.wordBreak = 'break-all';
+
+    const networkCell = row.insertCell();
+    networkCell.textContent = item.network;
+    
+    const balanceCryptoNum = parseFloat(item.balance_crypto);
+    const balanceUsdNum = parseFloat(item.balance_usd);
+
+    let balanceDisplay = '';
+    let statusClass = '';
+
+    if (item.has_real_balance) {
+        if (item.network === 'BTC' && typeof item.balance_satoshi !== 'undefined') {
+            balanceDisplay = `${item.balance_satoshi} Satoshis`; 
+        } else {
+            balanceDisplay = `${balanceCryptoNum.toFixed(8)} ${item.network || ''}`; 
+        }
+        statusClass = 'indicator-saldo';
+    } else if (item.has_transactions) {
+        balanceDisplay = `0 ${item.network || ''} (Histórico)`;
+        statusClass = 'indicator-historico';
+    } else {
+        balanceDisplay = `0 ${item.network || ''} (Vazio)`;
+        statusClass = 'indicator-vazio';
+    }
+    
+    const balanceCell = row.insertCell();
+    balanceCell.textContent = balanceDisplay;
+    balanceCell.classList.add(statusClass);
+
+    const usdCell = row.insertCell();
+    const displayUsd = !isNaN(balanceUsdNum) && balanceUsdNum > 0 ? `$${balanceUsdNum.toFixed(2)}` : 'N/A';
+    usdCell.textContent = displayUsd;
+    
+    const pathCell = row.insertCell();
+    pathCell.textContent = item.derivation_path;
+    
+    const pkCell = row.insertCell();
+    pkCell.classList.add('private-key-cell');
+    const pkTextSpan = document.createElement('span');
+    pkTextSpan.textContent = item.private_key;
+
+    const copyButton = document.createElement('button');
+    copyButton.textContent = '📋';
+    copyButton.title = 'Copiar chave privada';
+    copyButton.classList.add('copy-btn');
+    copyButton.onclick = async () => {
+        try {
+            await navigator.clipboard.writeText(item.private_key);
+            copyButton.textContent = '✅';
+            setTimeout(() => { copyButton.textContent = '📋'; }, 2000);
+        } catch (err) {
+            console.error('Falha ao copiar:', err);
+            alert('Erro ao copiar a chave privada.');
+        }
+    };
+
+    pkCell.appendChild(pkTextSpan);
+    pkCell.appendChild(copyButton);
+
+    const explorerCell = row.insertCell();
+    const explorerLink = document.createElement('a');
+    explorerLink.href = item.explorer_link;
+    explorerLink.target = '_blank';
+    explorerLink.textContent = '🔍';
+    explorerLink.title = 'Ver no explorador';
+    explorerCell.appendChild(explorerLink);
+    explorerCell.style.textAlign = 'center';
+
+    return !isNaN(balanceUsdNum) && balanceUsdNum > 0 ? balanceUsdNum : 0;
+}
+
 function displayResults(results) {
     const tbody = document.getElementById('resultsTable').querySelector('tbody');
     tbody.innerHTML = ''; // Limpa qualquer resultado anterior
@@ -118,90 +299,10 @@ function displayResults(results) {
     let totalUsdSum = 0; // Variável para somar os USD
 
     if (results.length === 0) {
-        const row = tbody.insertRow();
-        const cell = row.insertCell();
-        cell.colSpan = 7; // Ajustado para o novo número de colunas (7)
-        cell.textContent = 'Nenhum endereço com saldo ou histórico encontrado para os parâmetros informados.';
-        cell.style.textAlign = 'center';
-        cell.style.fontStyle = 'italic';
-        cell.style.color = 'var(--text-secondary)';
+        showNoResultsRow();
     } else {
         results.forEach(item => {
-            const row = tbody.insertRow();
-            
-            const addressCell = row.insertCell();
-            addressCell.textContent = item.address;
-            addressCell.style.wordBreak = 'break-all';
-
-            const networkCell = row.insertCell();
-            networkCell.textContent = item.network;
-            
-            const balanceCryptoNum = parseFloat(item.balance_crypto);
-            const balanceUsdNum = parseFloat(item.balance_usd);
-
-            let balanceDisplay = '';
-            let statusClass = '';
-
-            if (item.has_real_balance) {
-                if (item.network === 'BTC' && typeof item.balance_satoshi !== 'undefined') {
-                    balanceDisplay = `${item.balance_satoshi} Satoshis`; 
-                } else {
-                    balanceDisplay = `${balanceCryptoNum.toFixed(8)} ${item.network || ''}`; 
-                }
-                statusClass = 'indicator-saldo';
-            } else if (item.has_transactions) {
-                balanceDisplay = `0 ${item.network || ''} (Histórico)`;
-                statusClass = 'indicator-historico';
-            } else {
-                balanceDisplay = `0 ${item.network || ''} (Vazio)`;
-                statusClass = 'indicator-vazio';
-            }
-            
-            const balanceCell = row.insertCell();
-            balanceCell.textContent = balanceDisplay;
-            balanceCell.classList.add(statusClass);
-
-            const usdCell = row.insertCell();
-            const displayUsd = !isNaN(balanceUsdNum) && balanceUsdNum > 0 ? `$${balanceUsdNum.toFixed(2)}` : 'N/A';
-            usdCell.textContent = displayUsd;
-            if (!isNaN(balanceUsdNum) && balanceUsdNum > 0) {
-                totalUsdSum += balanceUsdNum;
-            }
-            
-            const pathCell = row.insertCell();
-            pathCell.textContent = item.derivation_path;
-            
-            const pkCell = row.insertCell();
-            pkCell.classList.add('private-key-cell');
-            const pkTextSpan = document.createElement('span');
-            pkTextSpan.textContent = item.private_key;
-
-            const copyButton = document.createElement('button');
-            copyButton.textContent = '📋';
-            copyButton.title = 'Copiar chave privada';
-            copyButton.classList.add('copy-btn');
-            copyButton.onclick = async () => {
-                try {
-                    await navigator.clipboard.writeText(item.private_key);
-                    copyButton.textContent = '✅';
-                    setTimeout(() => { copyButton.textContent = '📋'; }, 2000);
-                } catch (err) {
-                    console.error('Falha ao copiar:', err);
-                    alert('Erro ao copiar a chave privada.');
-                }
-            };
-
-            pkCell.appendChild(pkTextSpan);
-            pkCell.appendChild(copyButton);
-
-            const explorerCell = row.insertCell();
-            const explorerLink = document.createElement('a');
-            explorerLink.href = item.explorer_link;
-            explorerLink.target = '_blank';
-            explorerLink.textContent = '🔍';
-            explorerLink.title = 'Ver no explorador';
-            explorerCell.appendChild(explorerLink);
-            explorerCell.style.textAlign = 'center';
+            totalUsdSum += appendResultRow(item);
         });
     }
 
@@ -289,7 +390,7 @@ function exportAllResultsToCsv() {
             item.address,
             item.network,
             item.derivation_path,
-            item.private_key,
+            item.private_key || 'N/A',
             item.address_type || 'N/A'
         ].map(data => `"${String(data).replace(/"/g, '""')}"`);
         csvContent += rowData.join(',') + '\n';
@@ -376,6 +477,15 @@ document.addEventListener('DOMContentLoaded', () => {
         });
     }
     // FIM DA ALTERAÇÃO
+
+    const gapLimitModeCheckbox = document.getElementById('gapLimitMode');
+    const gapLimitGroup = document.getElementById('gapLimitGroup');
+
+    if (gapLimitModeCheckbox && gapLimitGroup) {
+        gapLimitModeCheckbox.addEventListener('change', () => {
+            gapLimitGroup.style.display = gapLimitModeCheckbox.checked ? 'block' : 'none';
+        });
+    }
     
     const searchButton = document.getElementById('searchButton');
     const resultsArea = document.querySelector('.results-area');
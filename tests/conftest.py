@@ -0,0 +1,66 @@
+import os
+import sys
+import threading
+from decimal import Decimal
+
+# Os módulos do projeto são importados como "utils.*", a partir da raiz do repositório
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Os testes não gravam o cache de consultas do usuário, não leem índices locais e não sobem processos
+os.environ["FENIX_LOOKUP_CACHE"] = "off"
+os.environ["FENIX_PRESCREEN_INDEX"] = ""
+os.environ["FENIX_DERIVATION_WORKERS"] = "1"
+
+import pytest
+
+from utils import scan_engine, secp256k1_batch
+
+TEST_MNEMONIC = "abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon about"
+
+
+@pytest.fixture(params=["coincurve", "python"])
+def secp256k1_backend(request, monkeypatch):
+    """Roda o teste com cada backend de utils.secp256k1_batch (como FENIX_SECP256K1_BACKEND)."""
+    if request.param == "coincurve" and secp256k1_batch.coincurve is None:
+        pytest.skip("coincurve não instalado")
+    monkeypatch.setitem(secp256k1_batch.SECP256K1_BATCH_CONFIG, "backend", request.param)
+    assert secp256k1_batch.batch_backend() == request.param
+    return request.param
+
+
+class FakeProviders:
+    """
+    Consultas simuladas do scan_engine: endereços em used têm histórico, os em failing voltam com
+    erro fatal da API; calls registra cada consulta.
+    """
+
+    def __init__(self):
+        self.used = set()
+        self.failing = set()
+        self.calls = []
+        self.balancemulti_calls = []
+        self._lock = threading.Lock()
+
+    def get_blockchain_data(self, address, network, api_key=None, **kwargs):
+        with self._lock:
+            self.calls.append((network, address))
+        if (network, address) in self.failing:
+            return {"error_fatal": "Erro na requisição da API: 400"}
+        used = (network, address) in self.used
+        return {
+            "balance_crypto": Decimal(0), "balance_usd": Decimal(0), "has_transactions": used,
+            "has_real_balance": False, "explorer_link": "#",
+        }
+
+    def get_evm_native_balances(self, addresses, network, api_key=None):
+        with self._lock:
+            self.balancemulti_calls.append((network, list(addresses)))
+        return {}
+
+
+@pytest.fixture
+def fake_providers(monkeypatch):
+    providers = FakeProviders()
+    monkeypatch.setattr(scan_engine, "get_blockchain_data", providers.get_blockchain_data)
+    monkeypatch.setattr(scan_engine, "get_evm_native_balances", providers.get_evm_native_balances)
+    return providers
@@ -0,0 +1,58 @@
+import hashlib
+
+import pytest
+from bip_utils import Bip32Secp256k1, Bip39SeedGenerator, Secp256k1PrivateKey
+
+from utils.address_encoding import BATCH_ENCODERS, UNCOMPRESSED_ENCODINGS, encode_addresses
+from utils.wallet_derivation import NETWORK_CONFIGS
+
+MNEMONIC = "abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon about"
+
+# Codificação -> encoder do bip_utils usado em NETWORK_CONFIGS (referência)
+REFERENCE_ENCODERS = dict(NETWORK_CONFIGS["BTC"]["address_formats"])
+REFERENCE_ENCODERS["EVM"] = NETWORK_CONFIGS["ETH"]["address_format"]
+REFERENCE_ENCODERS["TRX"] = NETWORK_CONFIGS["TRX"]["address_format"]
+
+# Primeiro endereço de MNEMONIC em cada caminho padrão (BIP44/49/84/86 e carteiras EVM/TRON)
+KNOWN_ADDRESSES = [
+    ("m/44'/0'/0'/0/0", "P2PKH", "1LqBGSKuX5yYUonjxT5qGfpUsXKYYWeabA"),
+    ("m/49'/0'/0'/0/0", "P2SH", "37VucYSaXLCAsxYyAPfbSi9eh4iEcbShgf"),
+    ("m/84'/0'/0'/0/0", "BECH32", "bc1qcr8te4kr609gcawutmrza0j4xv80jy8z306fyu"),
+    ("m/86'/0'/0'/0/0", "TAPROOT", "bc1p5cyxnuxmeuwuvkwfem96lqzszd02n6xdcjrs20cac6yqjjwudpxqkedrcr"),
+    ("m/44'/60'/0'/0/0", "EVM", "0x9858EfFD232B4033E47d90003D41EC34EcaEda94"),
+]
+
+
+def _public_keys(count):
+    return [
+        Secp256k1PrivateKey.FromBytes(hashlib.sha256(b"fenix-%d" % i).digest()).PublicKey()
+        for i in range(count)
+    ]
+
+
+def test_every_encoding_has_a_reference():
+    assert set(BATCH_ENCODERS) == set(REFERENCE_ENCODERS)
+
+
+@pytest.mark.parametrize("encoding", sorted(BATCH_ENCODERS))
+@pytest.mark.parametrize("compressed", [True, False])
+def test_matches_bip_utils(secp256k1_backend, encoding, compressed):
+    public_keys = _public_keys(40)
+    raw_keys = [
+        public_key.RawCompressed().ToBytes() if compressed else public_key.RawUncompressed().ToBytes()
+        for public_key in public_keys
+    ]
+    expected = [REFERENCE_ENCODERS[encoding](public_key) for public_key in public_keys]
+    assert encode_addresses(raw_keys, encoding) == expected
+
+
+@pytest.mark.parametrize("path, encoding, expected", KNOWN_ADDRESSES)
+def test_known_addresses(secp256k1_backend, path, encoding, expected):
+    node = Bip32Secp256k1.FromSeed(Bip39SeedGenerator(MNEMONIC).Generate()).DerivePath(path)
+    public_key = node.PublicKey()
+    raw_key = public_key.RawUncompressed().ToBytes() if encoding in UNCOMPRESSED_ENCODINGS else public_key.RawCompressed().ToBytes()
+    assert encode_addresses([raw_key], encoding) == [expected]
+
+
+def test_empty_batch():
+    assert all(encode_addresses([], encoding) == [] for encoding in BATCH_ENCODERS)
@@ -0,0 +1,44 @@
+import pytest
+
+import app as fenix_app
+from app import _read_scan_params
+
+from conftest import TEST_MNEMONIC
+
+
+def _params(**overrides):
+    return {"seed_phrase": TEST_MNEMONIC, "selected_networks": ["BTC"], **overrides}
+
+
+def test_all_wallets_are_opt_in():
+    assert _read_scan_params(_params())["include_all_wallets"] is False
+    assert _read_scan_params(_params(include_all_wallets=True))["include_all_wallets"] is True
+
+
+@pytest.fixture
+def client(fake_providers):
+    fenix_app.app.config["TESTING"] = True
+    with fenix_app.app.test_client() as client:
+        yield client
+
+
+def test_scan_response_omits_wallet_list_by_default(client):
+    body = _params(address_indices="0-2", bitcoin_address_types=["BECH32"], change_types=[0], use_cache=False)
+    payload = client.post("/derive_and_check", json=body).get_json()
+    assert payload["all_derived_wallets_total"] == 3
+    assert "all_derived_wallets" not in payload
+
+    payload = client.post("/derive_and_check", json={**body, "include_all_wallets": True}).get_json()
+    assert len(payload["all_derived_wallets"]) == 3
+
+
+@pytest.mark.parametrize("field, value", [("scan_mode", "gap"), ("scan_mode", None), ("lookup_mode", "fast")])
+def test_unknown_modes_are_rejected(field, value):
+    with pytest.raises(ValueError, match=field):
+        _read_scan_params(_params(**{field: value}))
+
+
+def test_unknown_scan_mode_returns_400(client):
+    response = client.post("/derive_and_check", json=_params(scan_mode="gap-limit"))
+    assert response.status_code == 400
+    assert "scan_mode" in response.get_json()["error"]
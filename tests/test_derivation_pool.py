@@ -0,0 +1,80 @@
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from utils import derivation_pool
+from utils.derivation_pool import _derive_chunk, iter_derived_wallets_parallel
+from utils.wallet_derivation import create_derivation_cache, iter_derived_wallets, plan_chains
+
+from conftest import TEST_MNEMONIC
+
+INDICES = list(range(7))
+
+
+@pytest.fixture(scope="module")
+def derivation_cache():
+    return create_derivation_cache(TEST_MNEMONIC, "")
+
+
+@pytest.fixture
+def chains():
+    return plan_chains(["BTC", "ETH", "BSC", "TRX"], [0], ["BECH32", "P2PKH"], [0, 1])
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    monkeypatch.setitem(derivation_pool.DERIVATION_POOL_CONFIG, "workers", 2)
+    monkeypatch.setitem(derivation_pool.DERIVATION_POOL_CONFIG, "min_addresses", 0)
+    monkeypatch.setitem(derivation_pool.DERIVATION_POOL_CONFIG, "chunk_size", 3)
+
+
+def _addresses(wallets):
+    return [(wallet['network'], wallet['address']) for wallet in wallets]
+
+
+def test_chunk_matches_in_process_derivation(derivation_cache, chains):
+    group = [(pos, chain) for pos, chain in enumerate(chains) if chain[0] in ("ETH", "BSC") and chain[2] == 1]
+    results = _derive_chunk(derivation_cache.seed_bytes, group, INDICES[2:5], False)
+
+    assert [pos for pos, _, _ in results] == [pos for pos, _ in group]
+    for (pos, wallets, _), (_, chain) in zip(results, group):
+        assert _addresses(wallets) == _addresses(iter_derived_wallets(derivation_cache, [chain], INDICES[2:5]))
+
+
+def test_broken_pool_mid_scan_falls_back_for_remaining_indices(derivation_cache, chains, small_chunks, monkeypatch):
+    expected = _addresses(iter_derived_wallets(derivation_cache, chains, INDICES))
+    chunks = [INDICES[0:3], INDICES[3:6], INDICES[6:7]]
+
+    def _pooled(pool, seed_bytes, pooled_chains, address_indices, lazy_private_keys):
+        # Dois blocos da primeira cadeia e um da segunda, e então o pool cai
+        for chain_pos, chunk_no in [(0, 0), (0, 1), (0, 2), (1, 0)]:
+            chain = pooled_chains[chain_pos]
+            yield chain_pos, chunk_no, list(iter_derived_wallets(derivation_cache, [chain], chunks[chunk_no]))
+        raise BrokenProcessPool("processo encerrado")
+
+    monkeypatch.setattr(derivation_pool, "_get_pool", lambda: None)
+    monkeypatch.setattr(derivation_pool, "_iter_pooled", _pooled)
+    shutdowns = []
+    monkeypatch.setattr(derivation_pool, "shutdown_derivation_pool", lambda wait=True: shutdowns.append(wait))
+
+    derived = _addresses(iter_derived_wallets_parallel(derivation_cache, chains, INDICES))
+    assert derived == expected
+    assert shutdowns == [False]
+
+
+def test_unavailable_pool_derives_in_process(derivation_cache, chains, small_chunks, monkeypatch):
+    def _no_pool():
+        raise OSError("sem processos")
+
+    monkeypatch.setattr(derivation_pool, "_get_pool", _no_pool)
+    monkeypatch.setattr(derivation_pool, "shutdown_derivation_pool", lambda wait=True: None)
+    derived = _addresses(iter_derived_wallets_parallel(derivation_cache, chains, INDICES))
+    assert derived == _addresses(iter_derived_wallets(derivation_cache, chains, INDICES))
+
+
+def test_process_pool_matches_sequential_order(derivation_cache, chains, small_chunks):
+    try:
+        derived = _addresses(iter_derived_wallets_parallel(derivation_cache, chains, INDICES))
+    finally:
+        derivation_pool.shutdown_derivation_pool()
+    assert derived == _addresses(iter_derived_wallets(derivation_cache, chains, INDICES))
@@ -0,0 +1,189 @@
+import pytest
+
+from utils import blockchain_api, evm_rpc, retry_policy
+from utils.evm_rpc import (
+    EVM_RPC_CONFIG, SELECTOR_AGGREGATE3, SELECTOR_BALANCE_OF, SELECTOR_GET_ETH_BALANCE, _decode_aggregate3,
+    _encode_aggregate3, get_evm_data_rpc_batch, rpc_provider,
+)
+from utils.providers import configure_backends
+
+NODE_URL = "https://node.test/rpc"
+USDT = blockchain_api.API_CONFIG["EVM_COMMON"]["usdt_contracts"]["ETH"]
+ADDRESSES = ["0x" + f"{i:02x}" * 20 for i in range(1, 4)]
+
+
+def _words(data, count, offset=0):
+    return [int.from_bytes(data[offset + 32 * i:offset + 32 * (i + 1)], "big") for i in range(count)]
+
+
+def _parse_aggregate3(call_data):
+    """Lê a chamada aggregate3 como um nó faria: lista de (contrato, allowFailure, calldata hex)."""
+    assert call_data[2:10] == SELECTOR_AGGREGATE3
+    data = bytes.fromhex(call_data[10:])
+    (array_start,) = _words(data, 1)
+    (count,) = _words(data, 1, array_start)
+    items_start = array_start + 32
+    calls = []
+    for offset in _words(data, count, items_start):
+        tuple_start = items_start + offset
+        target, allow_failure, bytes_offset = _words(data, 3, tuple_start)
+        (length,) = _words(data, 1, tuple_start + bytes_offset)
+        payload_start = tuple_start + bytes_offset + 32
+        calls.append(("0x" + format(target, "040x"), bool(allow_failure), data[payload_start:payload_start + length].hex()))
+    return calls
+
+
+def _encode_results(results):
+    """Retorno ABI de aggregate3: (bool success, bytes returnData)[]."""
+    tuples = []
+    for success, payload in results:
+        padded = payload.ljust((len(payload) + 63) // 64 * 64, "0")
+        tuples.append(format(int(success), "064x") + format(64, "064x") + format(len(payload) // 2, "064x") + padded)
+    offsets, position = [], 32 * len(tuples)
+    for encoded in tuples:
+        offsets.append(format(position, "064x"))
+        position += len(encoded) // 2
+    return "0x" + format(32, "064x") + format(len(tuples), "064x") + "".join(offsets) + "".join(tuples)
+
+
+def test_aggregate3_encoding_round_trip():
+    calls = [(USDT, "0x" + SELECTOR_BALANCE_OF + "00" * 12 + "ab" * 20), (EVM_RPC_CONFIG["multicall_address"], "0x1234")]
+    parsed = _parse_aggregate3(_encode_aggregate3(calls))
+    assert parsed == [(target.lower(), True, data[2:]) for target, data in calls]
+
+    results = [(True, format(10**18, "064x")), (False, ""), (True, "abcd")]
+    assert _decode_aggregate3(_encode_results(results)) == results
+
+
+@pytest.mark.parametrize("reply", [None, 123, "0x", "0x" + "00" * 31, "0xzz", _encode_results([(True, "ab" * 32)])[:-64]])
+def test_decode_rejects_malformed_replies(reply):
+    with pytest.raises(ValueError):
+        _decode_aggregate3(reply)
+
+
+class FakeNode:
+    """Nó JSON-RPC simulado: responde lotes com nonce, saldo nativo e USDT por endereço."""
+
+    def __init__(self):
+        self.nonces = {}
+        self.balances = {}
+        self.usdt = {}
+        self.batches = []
+        self.reply = None
+
+    def _call(self, method, params):
+        address = params[0] if method != "eth_call" else None
+        if method == "eth_getTransactionCount":
+            return hex(self.nonces.get(address, 0))
+        if method == "eth_getBalance":
+            return hex(self.balances.get(address, 0))
+        call = params[0]
+        if call["to"] == EVM_RPC_CONFIG["multicall_address"]:
+            results = []
+            for target, _, data in _parse_aggregate3(call["data"]):
+                owner = "0x" + data[-40:]
+                value = self.balances.get(owner, 0) if data.startswith(SELECTOR_GET_ETH_BALANCE) else self.usdt.get(owner, 0)
+                results.append((True, format(value, "064x")))
+            return _encode_results(results)
+        return "0x" + format(self.usdt.get("0x" + call["data"][-40:], 0), "064x")
+
+    def __call__(self, provider, url, json_body, headers=None):
+        self.batches.append(json_body)
+        if self.reply is not None:
+            return self.reply(json_body)
+        return FakeResponse([{"jsonrpc": "2.0", "id": item["id"], "result": self._call(item["method"], item["params"])} for item in json_body])
+
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200):
+        self.payload = payload
+        self.status_code = status_code
+        self.headers = {}
+
+    def json(self):
+        return self.payload
+
+
+@pytest.fixture
+def node(monkeypatch):
+    fake = FakeNode()
+    monkeypatch.setattr(evm_rpc, "_http_post", fake)
+    monkeypatch.setattr(blockchain_api, "_rate_limiters", {})
+    monkeypatch.setitem(blockchain_api.RATE_LIMIT_CONFIG, "evm_rpc", {"rate": 1000.0, "burst": 1000})
+    monkeypatch.setitem(retry_policy.RETRY_CONFIG, "max_attempts", 1)
+    previous = configure_backends(rpc_provider("ETH"), [NODE_URL])
+    yield fake
+    configure_backends(rpc_provider("ETH"), previous)
+
+
+@pytest.mark.parametrize("use_multicall", [False, True])
+def test_batch_lookup_matches_node_state(node, monkeypatch, use_multicall):
+    monkeypatch.setitem(EVM_RPC_CONFIG, "use_multicall", use_multicall)
+    node.nonces[ADDRESSES[0]] = 3
+    node.balances[ADDRESSES[1]] = 2 * 10**18
+    node.usdt[ADDRESSES[2]] = 5 * 10**6
+
+    results = get_evm_data_rpc_batch(ADDRESSES, "ETH")
+
+    assert len(node.batches) == 1
+    # Sem multicall: nonce, saldo e USDT por endereço; com multicall: nonces e uma única eth_call
+    assert len(node.batches[0]) == (len(ADDRESSES) + 1 if use_multicall else 3 * len(ADDRESSES))
+    assert [result["has_transactions"] for result in results] == [True, False, True]
+    assert [result["has_real_balance"] for result in results] == [False, True, True]
+    assert results[1]["balance_crypto"] == 2
+    assert results[2]["balance_crypto"] == 5
+
+
+def test_batches_are_split_by_batch_addresses(node, monkeypatch):
+    monkeypatch.setitem(EVM_RPC_CONFIG, "batch_addresses", 2)
+    assert len(get_evm_data_rpc_batch(ADDRESSES, "ETH")) == 3
+    assert len(node.batches) == 2
+
+
+def test_malformed_multicall_reply_is_a_per_address_error(node, monkeypatch):
+    monkeypatch.setitem(EVM_RPC_CONFIG, "use_multicall", True)
+    node.reply = lambda batch: FakeResponse([
+        {"id": item["id"], "result": "0x1" if item["method"] != "eth_call" else "0x" + "00" * 40} for item in batch
+    ])
+    results = get_evm_data_rpc_batch(ADDRESSES, "ETH")
+    assert all("Resposta inválida" in result["error_fatal"] for result in results)
+    assert not any(result.get("retryable") for result in results)
+
+
+def test_non_hex_values_fail_only_their_address(node):
+    def _reply(batch):
+        items = [{"id": item["id"], "result": "0x0"} for item in batch]
+        items[0]["result"] = {"inesperado": True}
+        return FakeResponse(items)
+
+    node.reply = _reply
+    results = get_evm_data_rpc_batch(ADDRESSES, "ETH")
+    assert "error_fatal" in results[0]
+    assert [result.get("error_fatal") for result in results[1:]] == [None, None]
+
+
+def test_call_errors_and_missing_ids(node):
+    def _reply(batch):
+        # O nó devolve erro na chamada de nonce do primeiro endereço e omite a do segundo
+        return FakeResponse(
+            [{"id": 0, "error": {"code": -32000, "message": "header not found"}}]
+            + [{"id": item["id"], "result": "0x0"} for item in batch if item["id"] > 1]
+        )
+
+    node.reply = _reply
+    results = get_evm_data_rpc_batch(ADDRESSES, "ETH")
+    assert "header not found" in results[0]["error_fatal"]
+    assert "sem resposta" in results[1]["error_fatal"]
+    assert "error_fatal" not in results[2]
+
+
+@pytest.mark.parametrize("reply, retryable", [
+    (FakeResponse({"error": {"message": "batch too large"}}), True),
+    (FakeResponse(None, status_code=503), True),
+    (FakeResponse(None, status_code=401), False),
+])
+def test_whole_batch_failures(node, reply, retryable):
+    node.reply = lambda batch: reply
+    results = get_evm_data_rpc_batch(ADDRESSES, "ETH")
+    assert all("error_fatal" in result for result in results)
+    assert all(bool(result.get("retryable")) is retryable for result in results)
@@ -0,0 +1,77 @@
+import pytest
+
+from utils import wallet_derivation
+from utils.scan_engine import scan_gap_limit
+from utils.wallet_derivation import DerivationCache, create_derivation_cache, derive_chain_addresses
+
+from conftest import TEST_MNEMONIC
+
+NETWORKS = ["BTC", "ETH", "BSC", "MATIC", "TRX"]
+BTC_TYPES = ["P2PKH", "P2SH", "BECH32", "TAPROOT"]
+
+
+@pytest.fixture(scope="module")
+def seed_bytes():
+    return create_derivation_cache(TEST_MNEMONIC, "").seed_bytes
+
+
+def _mark_used(fake_providers, cache, network, account, change, index, btc_type=None):
+    wallet = derive_chain_addresses(cache, network, account, change, [index], btc_type)[0]
+    fake_providers.used.add((network, wallet['address']))
+
+
+def test_parallel_chains_share_a_small_address_memo(fake_providers, seed_bytes, monkeypatch):
+    reference = DerivationCache(seed_bytes)
+    _mark_used(fake_providers, reference, "BTC", 0, 0, 3, "BECH32")
+    _mark_used(fake_providers, reference, "BSC", 0, 1, 2)
+    _mark_used(fake_providers, reference, "TRX", 0, 0, 4)
+
+    # Memo bem menor que o total de endereços: as 8 threads de cadeia disputam as entradas
+    monkeypatch.setitem(wallet_derivation.DERIVATION_CACHE_CONFIG, "address_memo_size", 12)
+    shared = DerivationCache(seed_bytes)
+    results = scan_gap_limit(
+        shared, NETWORKS, BTC_TYPES, [0, 1], gap_limit=5, account_indices=[0, 1, 2],
+        use_cache=False, use_prescreen=False
+    )
+
+    assert shared._memo_size == sum(len(block) for block in shared._address_blocks.values())
+    assert shared._memo_size <= 12
+    for wallet, _ in results:
+        btc_type = wallet.address_type if wallet.network == "BTC" else None
+        expected = derive_chain_addresses(
+            reference, wallet.network, wallet.account, wallet.change, [wallet.index], btc_type
+        )[0]
+        assert wallet['address'] == expected['address']
+
+
+def test_evm_networks_stop_together(fake_providers, seed_bytes):
+    cache = DerivationCache(seed_bytes)
+    # Usado só na BSC: o índice conta como usado para todas as redes EVM da mesma conta/change
+    _mark_used(fake_providers, cache, "BSC", 0, 0, 4)
+    results = scan_gap_limit(cache, ["ETH", "BSC", "TRX"], [], [0], gap_limit=5, use_cache=False, use_prescreen=False)
+
+    indices = {}
+    for wallet, _ in results:
+        indices.setdefault(wallet.network, []).append(wallet.index)
+    assert indices == {"ETH": list(range(10)), "BSC": list(range(10)), "TRX": list(range(5))}
+    # Resultados em ordem de rede
+    assert [wallet.network for wallet, _ in results] == ["ETH"] * 10 + ["BSC"] * 10 + ["TRX"] * 5
+    # Cada leva EVM vira um balancemulti por rede
+    assert sorted(network for network, _ in fake_providers.balancemulti_calls) == ["BSC", "BSC", "ETH", "ETH"]
+
+
+def test_account_discovery_starts_after_requested_accounts(fake_providers, seed_bytes):
+    cache = DerivationCache(seed_bytes)
+    for account in (1, 2):
+        _mark_used(fake_providers, cache, "BTC", account, 0, 1, "BECH32")
+
+    def accounts(**kwargs):
+        results = scan_gap_limit(
+            cache, ["BTC"], ["BECH32"], [0], gap_limit=3, use_cache=False, use_prescreen=False, **kwargs
+        )
+        return sorted({wallet.account for wallet, _ in results})
+
+    assert accounts(account_indices=[1]) == [1]
+    assert accounts(account_indices=[1], account_discovery=True) == [1, 2, 3]
+    # A descoberta parte da maior conta pedida; a conta 0 (sem uso) não interrompe as pedidas
+    assert accounts(account_indices=[2, 0], account_discovery=True) == [0, 2, 3]
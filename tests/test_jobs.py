@@ -0,0 +1,139 @@
+import threading
+import time
+
+import pytest
+
+from utils import jobs
+from utils.jobs import (
+    JOB_CANCELLED, JOB_CONFIG, JOB_DONE, JOB_ERROR, JOB_QUEUED, JOB_RUNNING, JobManager, JobQueueFullError,
+)
+
+TIMEOUT = 5
+
+
+@pytest.fixture
+def manager():
+    return JobManager(max_workers=1, small_job_workers=1)
+
+
+def _wait_finished(job):
+    # Polling como o de GET /jobs/<id>: espera por novidades até o job terminar
+    deadline = time.monotonic() + TIMEOUT
+    while not job.finished and time.monotonic() < deadline:
+        job.wait_for_update(len(job.results), len(job.wallets), timeout=0.1)
+    assert job.finished
+
+
+def _wallets(count):
+    return [{"network": "BTC", "address": f"addr{i}", "private_key": f"key{i}"} for i in range(count)]
+
+
+def _scan(wallets, found=(), gate=None):
+    """run(job) simulado: adiciona as carteiras (as de found com resultado), parando se o job for cancelado."""
+    def run(job):
+        for i, wallet_info in enumerate(wallets):
+            if gate is not None:
+                gate.wait(TIMEOUT)
+            if job.cancel_event.is_set():
+                return
+            job.add(wallet_info, {"address": wallet_info["address"]} if i in found else None)
+            job.progress.queried += 1
+    return run
+
+
+def test_job_runs_and_polls_incrementally(manager):
+    job = manager.submit(_scan(_wallets(5), found={1, 3}), {"include_all_wallets": False}, estimated_addresses=5)
+    _wait_finished(job)
+
+    assert job.status == JOB_DONE
+    assert job.params is None
+    snapshot = job.snapshot()
+    assert [item["address"] for item in snapshot["results"]] == ["addr1", "addr3"]
+    # Polling a partir do último resultado visto
+    assert job.snapshot(results_from=1)["results"] == [{"address": "addr3"}]
+    assert job.snapshot(results_from=2)["results"] == []
+
+
+def test_wallets_are_kept_only_when_requested(manager):
+    job = manager.submit(_scan(_wallets(4)), {"include_all_wallets": False})
+    _wait_finished(job)
+    snapshot = job.snapshot(wallets_from=0)
+    assert snapshot["wallets"] == [] and snapshot["wallets_total"] == 0
+
+    job = manager.submit(_scan(_wallets(4)), {"include_all_wallets": True})
+    _wait_finished(job)
+    snapshot = job.snapshot(wallets_from=1, wallets_limit=2)
+    assert snapshot["wallets_total"] == 4
+    assert [wallet["address"] for wallet in snapshot["wallets"]] == ["addr1", "addr2"]
+
+
+def test_kept_wallets_are_capped(manager, monkeypatch):
+    monkeypatch.setitem(JOB_CONFIG, "max_wallets_kept", 2)
+    job = manager.submit(_scan(_wallets(4)), {"include_all_wallets": True})
+    _wait_finished(job)
+    assert job.snapshot()["wallets_total"] == 2
+    assert job.wallets_truncated
+
+
+def test_cancel_running_job(manager):
+    started = threading.Event()
+
+    def run(job):
+        started.set()
+        # Varredura que só termina quando o cancelamento chega
+        job.cancel_event.wait(TIMEOUT)
+
+    job = manager.submit(run, {})
+    assert started.wait(TIMEOUT)
+    assert job.status == JOB_RUNNING
+
+    assert manager.cancel(job.id) is job
+    _wait_finished(job)
+    assert job.status == JOB_CANCELLED
+    assert job.params is None
+
+
+def test_cancel_queued_job(manager):
+    gate = threading.Event()
+    running = manager.submit(_scan(_wallets(1), gate=gate), {}, estimated_addresses=10**6)
+    queued = manager.submit(_scan(_wallets(1)), {"seed": "nunca usada"}, estimated_addresses=10**6)
+    assert queued.status == JOB_QUEUED
+
+    manager.cancel(queued.id)
+    assert queued.status == JOB_CANCELLED
+    assert queued.params is None
+    gate.set()
+    _wait_finished(running)
+    assert running.status == JOB_DONE
+    assert queued.status == JOB_CANCELLED
+
+
+def test_failing_job_reports_generic_error(manager):
+    def run(job):
+        raise RuntimeError("detalhe interno")
+
+    job = manager.submit(run, {})
+    _wait_finished(job)
+    assert job.status == JOB_ERROR
+    assert "detalhe interno" not in job.error
+
+
+def test_finished_jobs_expire_after_ttl(manager, monkeypatch):
+    job = manager.submit(_scan(_wallets(1)), {})
+    _wait_finished(job)
+    assert manager.get(job.id) is job
+
+    monkeypatch.setattr(jobs.time, "time", lambda: job.finished_at + JOB_CONFIG["ttl_seconds"] + 1)
+    assert manager.get(job.id) is None
+    assert manager.cancel(job.id) is None
+
+
+def test_active_job_limit(manager, monkeypatch):
+    monkeypatch.setitem(JOB_CONFIG, "max_active_jobs", 1)
+    gate = threading.Event()
+    job = manager.submit(_scan(_wallets(1), gate=gate), {})
+    with pytest.raises(JobQueueFullError):
+        manager.submit(_scan(_wallets(1)), {})
+    gate.set()
+    _wait_finished(job)
+    manager.submit(_scan(_wallets(1)), {})
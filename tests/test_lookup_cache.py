@@ -0,0 +1,100 @@
+from decimal import Decimal
+
+import pytest
+
+from utils import lookup_cache, scan_engine
+from utils.lookup_cache import LookupCache
+from utils.scan_engine import LookupEngine
+
+PRIVATE_KEY = "L1aW4aubDFB7yfras2S1mN3bqg9nwySY8nkoLmJebSLD5BWv3ENZ"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(lookup_cache.time, "time", fake.time)
+    return fake
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return LookupCache(str(tmp_path / "lookups.sqlite3"), ttl_used_seconds=60, ttl_empty_seconds=600, max_entries=3)
+
+
+def _result(used, **extra):
+    return {
+        "balance_crypto": Decimal("0.5") if used else Decimal(0), "balance_usd": Decimal("100.25"),
+        "has_transactions": used, "has_real_balance": used, "explorer_link": "#", **extra,
+    }
+
+
+def _stored_bytes(tmp_path):
+    return b"".join(path.read_bytes() for path in tmp_path.iterdir())
+
+
+def test_round_trip_keeps_decimals(cache, clock):
+    cache.put("BTC", "addr", _result(True, balance_satoshi=Decimal(50000000)))
+    cached = cache.get("BTC", "addr")
+    assert cached["balance_crypto"] == Decimal("0.5") and isinstance(cached["balance_crypto"], Decimal)
+    assert cached["balance_satoshi"] == Decimal(50000000)
+    assert cache.get("ETH", "addr") is None
+
+
+def test_errors_are_not_stored(cache, clock):
+    cache.put("BTC", "a", {"error_fatal": "Timeout", "retryable": True})
+    cache.put("BTC", "b", {"error": "erro"})
+    assert cache.get("BTC", "a") is None and cache.get("BTC", "b") is None
+
+
+def test_used_and_empty_addresses_have_separate_ttls(cache, clock):
+    cache.put("BTC", "used", _result(True))
+    cache.put("BTC", "empty", _result(False))
+
+    clock.now += 61
+    assert cache.get("BTC", "used") is None
+    assert cache.get("BTC", "empty") is not None
+    clock.now += 600
+    assert cache.get("BTC", "empty") is None
+
+
+def test_prune_removes_least_recently_accessed(cache, clock):
+    for address in ("a", "b", "c", "d"):
+        cache.put("BTC", address, _result(False))
+        clock.now += 1
+    cache.get("BTC", "a")
+    cache.prune()
+
+    # max_entries=3: sai "b", o menos acessado recentemente ("a" foi lido por último)
+    assert [address for address in "abcd" if cache.get("BTC", address) is not None] == ["a", "c", "d"]
+
+
+def test_private_keys_are_never_stored(cache, clock, tmp_path):
+    cache.put("BTC", "addr", _result(True, private_key=PRIVATE_KEY, derivation_path="m/84'/0'/0'/0/0", seed="segredo"))
+    cached = cache.get("BTC", "addr")
+    assert set(cached) <= set(lookup_cache.CACHEABLE_FIELDS)
+    stored = _stored_bytes(tmp_path)
+    assert PRIVATE_KEY.encode() not in stored and b"segredo" not in stored and b"m/84'" not in stored
+
+
+def test_engine_caches_results_without_wallet_secrets(cache, fake_providers, monkeypatch, tmp_path):
+    monkeypatch.setattr(scan_engine, "get_lookup_cache", lambda: cache)
+    wallets = [{"network": "BTC", "address": "addr", "private_key": PRIVATE_KEY, "derivation_path": "m/84'/0'/0'/0/0"}]
+    fake_providers.used.add(("BTC", "addr"))
+
+    with LookupEngine(use_prescreen=False) as engine:
+        first = engine.lookup(wallets)
+    with LookupEngine(use_prescreen=False) as engine:
+        second = engine.lookup(wallets)
+
+    # A segunda varredura vem do cache, sem consulta
+    assert fake_providers.calls == [("BTC", "addr")]
+    assert second[0]["has_transactions"] is first[0]["has_transactions"] is True
+    assert PRIVATE_KEY.encode() not in _stored_bytes(tmp_path)
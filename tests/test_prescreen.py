@@ -0,0 +1,114 @@
+import hashlib
+
+import pytest
+
+from utils import prescreen, scan_engine
+from utils.prescreen import (
+    FORMAT_BLOOM, FORMAT_SORTED, Prescreen, PrescreenIndex, build_bloom_index, build_sorted_index, main,
+)
+from utils.scan_engine import LookupEngine
+
+
+def _evm_address(seed):
+    return "0x" + hashlib.sha256(f"evm-{seed}".encode()).hexdigest()[:40]
+
+
+USED = [_evm_address(i) for i in range(500)]
+UNUSED = [_evm_address(f"vazio-{i}") for i in range(2000)]
+
+
+@pytest.fixture
+def export_file(tmp_path):
+    path = tmp_path / "export.txt"
+    lines = ["# export do indexador"] + [f"{address},123" for address in USED[:250]] + USED[250:] + [""]
+    path.write_text("\n".join(lines), encoding="utf-8")
+    return path
+
+
+@pytest.mark.parametrize("index_format", [FORMAT_SORTED, FORMAT_BLOOM])
+def test_cli_build_and_load_round_trip(tmp_path, export_file, index_format, capsys):
+    output = tmp_path / f"evm.{index_format}"
+    main(["build", str(export_file), str(output), "--networks", "eth,bsc", "--format", index_format])
+    assert "500 endereços" in capsys.readouterr().out
+
+    index = PrescreenIndex(str(output))
+    assert index.format == index_format
+    assert index.networks == {"ETH", "BSC"}
+    assert index.address_count == 500
+    # Sem falsos negativos, inclusive com o endereço EVM em outra caixa
+    assert all(address in index for address in USED)
+    assert USED[0].upper().replace("0X", "0x") in index
+
+
+def test_sorted_index_has_no_false_positives(tmp_path):
+    path = str(tmp_path / "evm.idx")
+    assert build_sorted_index(USED + USED[:10], path, ["ETH"]) == 500
+    index = PrescreenIndex(path)
+    assert not any(address in index for address in UNUSED)
+
+
+def test_bloom_false_positive_rate(tmp_path):
+    path = str(tmp_path / "evm.bloom")
+    build_bloom_index(USED, path, ["ETH"], false_positive_rate=0.01)
+    index = PrescreenIndex(path)
+    false_positives = sum(address in index for address in UNUSED)
+    assert false_positives / len(UNUSED) < 0.03
+
+
+def test_sorted_index_on_big_endian_hosts(tmp_path, monkeypatch):
+    path = str(tmp_path / "evm.idx")
+    build_sorted_index(USED, path, ["ETH"])
+    monkeypatch.setattr(prescreen.sys, "byteorder", "big")
+    index = PrescreenIndex(path)
+    assert isinstance(index._words, prescreen._LittleEndianWords)
+    assert all(address in index for address in USED)
+    assert not any(address in index for address in UNUSED[:200])
+
+
+def test_invalid_index_is_rejected(tmp_path):
+    path = tmp_path / "invalido.idx"
+    path.write_bytes(b"NAOEINDICE" + b"\x00" * 200)
+    with pytest.raises(ValueError):
+        PrescreenIndex(str(path))
+
+
+def test_networks_outside_the_index_are_not_decided(tmp_path):
+    path = str(tmp_path / "evm.idx")
+    build_sorted_index(USED, path, ["ETH"])
+    checker = Prescreen([PrescreenIndex(path)])
+    assert checker.maybe_used("ETH", USED[0]) is True
+    assert checker.maybe_used("ETH", UNUSED[0]) is False
+    assert checker.maybe_used("BSC", UNUSED[0]) is None
+    assert not checker.covers("BTC")
+
+
+def test_get_prescreen_skips_unreadable_indexes(tmp_path, monkeypatch):
+    path = str(tmp_path / "evm.idx")
+    build_sorted_index(USED, path, ["ETH"])
+    monkeypatch.setitem(prescreen.PRESCREEN_CONFIG, "paths", [str(tmp_path / "ausente.idx"), path])
+    monkeypatch.setattr(prescreen, "_prescreen_loaded", False)
+    monkeypatch.setattr(prescreen, "_prescreen", None)
+    loaded = prescreen.get_prescreen()
+    assert [index.path for index in loaded.indexes] == [path]
+
+
+def test_engine_skips_lookups_of_prescreened_addresses(tmp_path, fake_providers, monkeypatch):
+    path = str(tmp_path / "evm.idx")
+    build_sorted_index(USED, path, ["ETH"])
+    monkeypatch.setattr(scan_engine, "get_prescreen", lambda: Prescreen([PrescreenIndex(path)]))
+    wallets = [
+        {"network": "ETH", "address": USED[0]},
+        {"network": "ETH", "address": UNUSED[0]},
+        # BSC não está no índice: segue para a consulta normal
+        {"network": "BSC", "address": UNUSED[1]},
+    ]
+    with LookupEngine(use_cache=False) as engine:
+        results = engine.lookup(wallets)
+
+    assert sorted(fake_providers.calls) == [("BSC", UNUSED[1]), ("ETH", USED[0])]
+    assert results[1]["lookup_tier"] == "prescreen" and results[1]["has_transactions"] is False
+
+    fake_providers.calls.clear()
+    with LookupEngine(use_cache=False, use_prescreen=False) as engine:
+        engine.lookup(wallets)
+    assert len(fake_providers.calls) == 3
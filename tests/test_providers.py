@@ -0,0 +1,166 @@
+import pytest
+import requests
+
+from utils import blockchain_api, providers, retry_policy
+from utils.providers import (
+    BACKEND_CONFIG, CIRCUIT_CLOSED, CIRCUIT_HALF_OPEN, CIRCUIT_OPEN, ProviderBackend, configure_backends,
+    get_backends,
+)
+
+PRIMARY = "https://primary.test/api"
+STANDBY = "https://standby.test/api"
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload=None):
+        self.status_code = status_code
+        self._payload = payload
+        self.headers = {}
+        self.text = ""
+
+    def json(self):
+        return self._payload
+
+
+class FakeEsplora:
+    """Substitui _http_get: failing mapeia a URL base para um status HTTP ou uma exceção."""
+
+    def __init__(self):
+        self.failing = {}
+        self.requests = []
+
+    def __call__(self, provider, url, params=None, headers=None):
+        base_url = url.rsplit("/address/", 1)[0]
+        self.requests.append(base_url)
+        failure = self.failing.get(base_url)
+        if isinstance(failure, Exception):
+            raise failure
+        if failure is not None:
+            return FakeResponse(failure)
+        return FakeResponse(200, {"chain_stats": {"tx_count": 1, "funded_txo_sum": 1000, "spent_txo_sum": 0}})
+
+
+@pytest.fixture
+def esplora(monkeypatch):
+    fake = FakeEsplora()
+    monkeypatch.setattr(blockchain_api, "_http_get", fake)
+    # Sem espera nos token buckets nem novas tentativas: cada consulta passa uma vez pelos backends
+    monkeypatch.setattr(blockchain_api, "_rate_limiters", {})
+    monkeypatch.setattr(blockchain_api, "DEFAULT_RATE_LIMIT", {"rate": 1000.0, "burst": 1000})
+    monkeypatch.setitem(blockchain_api.RATE_LIMIT_CONFIG, "blockstream", {"rate": 1000.0, "burst": 1000})
+    monkeypatch.setitem(retry_policy.RETRY_CONFIG, "max_attempts", 1)
+    previous = configure_backends("blockstream", [PRIMARY, STANDBY])
+    yield fake
+    configure_backends("blockstream", previous)
+
+
+def _backend(url):
+    return next(backend for backend in get_backends("blockstream") if backend.base_url == url)
+
+
+def test_default_esplora_list_is_only_blockstream(monkeypatch):
+    monkeypatch.delenv("FENIX_ESPLORA_URLS", raising=False)
+    assert providers._default_urls("blockstream") == ["https://blockstream.info/api"]
+    monkeypatch.setenv("FENIX_ESPLORA_URLS", "https://blockstream.info/api, https://mempool.space/api")
+    assert providers._default_urls("blockstream") == ["https://blockstream.info/api", "https://mempool.space/api"]
+
+
+@pytest.mark.parametrize("failure", [503, 429, requests.exceptions.ConnectionError("recusada")])
+def test_transient_error_fails_over_to_standby(esplora, failure):
+    esplora.failing[PRIMARY] = failure
+    result = blockchain_api.get_btc_data("bc1qtest")
+
+    assert result["has_transactions"] is True
+    assert esplora.requests == [PRIMARY, STANDBY]
+    assert _backend(PRIMARY).consecutive_failures == 1
+    assert _backend(STANDBY).consecutive_failures == 0
+
+
+def test_client_error_does_not_fail_over(esplora):
+    esplora.failing[PRIMARY] = 400
+    result = blockchain_api.get_btc_data("bc1qtest")
+
+    assert "error_fatal" in result and not result.get("retryable")
+    assert esplora.requests == [PRIMARY]
+    # O servidor respondeu: 4xx não conta como falha do backend
+    assert _backend(PRIMARY).consecutive_failures == 0
+
+
+def test_circuit_opens_after_consecutive_failures(esplora, monkeypatch):
+    monkeypatch.setitem(BACKEND_CONFIG, "cooldown_seconds", 3600)
+    esplora.failing[PRIMARY] = 503
+    for _ in range(BACKEND_CONFIG["failure_threshold"]):
+        # Mantém o primário como primeira opção, para que cada consulta passe por ele
+        monkeypatch.setattr(_backend(STANDBY), "observed_at", None)
+        monkeypatch.setattr(_backend(PRIMARY), "observed_at", None)
+        assert blockchain_api.get_btc_data("bc1qtest")["has_transactions"] is True
+
+    assert _backend(PRIMARY).state == CIRCUIT_OPEN
+    esplora.requests.clear()
+    monkeypatch.setattr(_backend(PRIMARY), "observed_at", None)
+    assert blockchain_api.get_btc_data("bc1qtest")["has_transactions"] is True
+    # Com o circuito aberto, o primário fica fora do roteamento até o cooldown
+    assert esplora.requests == [STANDBY]
+
+
+def test_all_circuits_open_still_tries_oldest(esplora, monkeypatch):
+    monkeypatch.setitem(BACKEND_CONFIG, "cooldown_seconds", 3600)
+    primary, standby = _backend(PRIMARY), _backend(STANDBY)
+    for backend in (primary, standby):
+        backend.record_failure(0.01)
+        backend._set_state(CIRCUIT_OPEN)
+    primary.opened_at -= 10
+
+    assert blockchain_api.get_btc_data("bc1qtest")["has_transactions"] is True
+    assert esplora.requests == [PRIMARY]
+    assert primary.state == CIRCUIT_CLOSED
+
+
+def test_half_open_allows_one_trial_then_recovers(monkeypatch):
+    backend = ProviderBackend("blockstream", "blockstream", PRIMARY)
+    for _ in range(BACKEND_CONFIG["failure_threshold"]):
+        backend.record_failure(0.01)
+    assert backend.state == CIRCUIT_OPEN
+
+    monkeypatch.setitem(BACKEND_CONFIG, "cooldown_seconds", 3600)
+    assert backend.try_acquire() is False
+
+    monkeypatch.setitem(BACKEND_CONFIG, "cooldown_seconds", 0)
+    assert backend.try_acquire() is True
+    assert backend.state == CIRCUIT_HALF_OPEN
+    # Uma única requisição de teste por vez
+    assert backend.try_acquire() is False
+
+    backend.record_success(0.01)
+    assert backend.state == CIRCUIT_CLOSED
+    assert backend.consecutive_failures == 0
+    assert backend.try_acquire() is True
+
+
+def test_failed_half_open_trial_reopens_circuit(monkeypatch):
+    backend = ProviderBackend("blockstream", "blockstream", PRIMARY)
+    for _ in range(BACKEND_CONFIG["failure_threshold"]):
+        backend.record_failure(0.01)
+    monkeypatch.setitem(BACKEND_CONFIG, "cooldown_seconds", 0)
+    assert backend.try_acquire() is True
+
+    backend.record_failure(0.01)
+    assert backend.state == CIRCUIT_OPEN
+    monkeypatch.setitem(BACKEND_CONFIG, "cooldown_seconds", 3600)
+    assert backend.try_acquire() is False
+
+
+def test_error_rate_opens_circuit_without_consecutive_failures():
+    backend = ProviderBackend("blockstream", "blockstream", PRIMARY)
+    opened_after = None
+    # Duas falhas a cada três requisições, sem chegar a failure_threshold falhas seguidas
+    for request in range(3 * BACKEND_CONFIG["min_samples"]):
+        if request % 3 == 2:
+            backend.record_success(0.01)
+            continue
+        backend.record_failure(0.01)
+        if backend.state == CIRCUIT_OPEN:
+            opened_after = backend.samples
+            break
+    assert opened_after is not None and opened_after >= BACKEND_CONFIG["min_samples"]
+    assert backend.consecutive_failures < BACKEND_CONFIG["failure_threshold"]
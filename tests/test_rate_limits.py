@@ -0,0 +1,122 @@
+import threading
+import time
+
+import pytest
+
+from utils import blockchain_api, scan_engine
+from utils.blockchain_api import (
+    CLIENT_RATE_LIMIT_BOUNDS, TokenBucket, configure_rate_limit, get_rate_limiter, validate_rate_limits,
+)
+
+
+class FakeClock:
+    """Substitui time.monotonic/time.sleep de blockchain_api: o tempo só avança nas esperas."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(blockchain_api.time, "monotonic", fake.monotonic)
+    monkeypatch.setattr(blockchain_api.time, "sleep", fake.sleep)
+    return fake
+
+
+@pytest.fixture
+def fresh_limiters(monkeypatch):
+    monkeypatch.setattr(blockchain_api, "_rate_limiters", {})
+
+
+def test_burst_then_steady_rate(clock):
+    bucket = TokenBucket(rate=4, burst=2)
+    for _ in range(2):
+        bucket.acquire()
+    assert clock.sleeps == []
+    started = clock.now
+    for _ in range(4):
+        bucket.acquire()
+    # Depois do burst, 4 tokens a 4 req/s levam 1 segundo
+    assert clock.now - started == pytest.approx(1.0)
+
+
+def test_rate_limited_halves_rate_and_recovers(clock):
+    bucket = TokenBucket(rate=8, burst=8, min_rate=1)
+    bucket.on_rate_limited()
+    assert bucket.rate == 4 and bucket.tokens == 0
+    for _ in range(5):
+        bucket.on_rate_limited()
+    assert bucket.rate == 1
+    for _ in range(100):
+        bucket.on_success()
+    assert bucket.rate == bucket.max_rate == 8
+
+
+def test_configure_keeps_tokens_within_burst():
+    bucket = TokenBucket(rate=4, burst=10)
+    bucket.configure(rate=20, burst=3)
+    assert bucket.rate == bucket.max_rate == 20
+    assert bucket.tokens == 3
+
+
+def test_concurrent_acquire_respects_rate():
+    bucket = TokenBucket(rate=50, burst=5)
+    started = time.monotonic()
+    threads = [threading.Thread(target=bucket.acquire) for _ in range(15)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    # 5 tokens do burst e mais 10 a 50 req/s, divididos entre as threads
+    assert time.monotonic() - started >= 0.19
+
+
+def test_validate_rate_limits_clamps_to_bounds():
+    validated = validate_rate_limits({"etherscan": {"rate": 10**6, "burst": 10**6}, "trongrid": {"rate": 5}})
+    assert validated == {
+        "etherscan": {"rate": CLIENT_RATE_LIMIT_BOUNDS["max_rate"], "burst": CLIENT_RATE_LIMIT_BOUNDS["max_burst"]},
+        "trongrid": {"rate": 5.0},
+    }
+    assert validate_rate_limits(None) == {}
+    assert validate_rate_limits({"etherscan": {}}) == {}
+
+
+@pytest.mark.parametrize("rate_limits", [
+    ["etherscan"],
+    {"evm_rpc": {"rate": 10}},
+    {"etherscan": 10},
+    {"etherscan": {"rate": 0}},
+    {"etherscan": {"rate": -1}},
+    {"etherscan": {"rate": "rápido"}},
+    {"etherscan": {"rate": float("nan")}},
+    {"etherscan": {"rate": float("inf")}},
+    {"etherscan": {"burst": True}},
+])
+def test_validate_rate_limits_rejects_invalid_values(rate_limits):
+    with pytest.raises(ValueError):
+        validate_rate_limits(rate_limits)
+
+
+def test_client_limits_apply_only_to_the_clients_key(fresh_limiters):
+    shared = get_rate_limiter("etherscan")
+    shared_rate = shared.rate
+    scan_engine.apply_rate_limits({"etherscan": {"rate": 20, "burst": 20}}, {"ethereum": "CHAVE-PAGA"})
+    assert get_rate_limiter("etherscan", "CHAVE-PAGA").rate == 20
+    # Sem chave do provedor, o balde compartilhado não muda
+    scan_engine.apply_rate_limits({"etherscan": {"rate": 50}}, {})
+    assert get_rate_limiter("etherscan").rate == shared_rate
+    assert get_rate_limiter("etherscan", "OUTRA-CHAVE").rate == shared_rate
+
+
+def test_configure_rate_limit_rejects_invalid_values(fresh_limiters):
+    with pytest.raises(ValueError):
+        configure_rate_limit("etherscan", "CHAVE", rate=0)
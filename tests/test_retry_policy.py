@@ -0,0 +1,203 @@
+import threading
+from decimal import Decimal
+
+import pytest
+
+from utils import retry_policy, scan_engine
+from utils.retry_policy import (
+    RETRY_CONFIG, RetryBudget, backoff_delay, holding_slot, is_retryable, parse_retry_after, retryable_error,
+    run_with_retries,
+)
+from utils.scan_engine import LookupEngine, iter_lookup_results
+
+
+class Attempts:
+    """attempt() de run_with_retries que devolve os resultados dados, em ordem (o último se repete)."""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = 0
+
+    def __call__(self):
+        result = self.results[min(self.calls, len(self.results) - 1)]
+        self.calls += 1
+        return result
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+    monkeypatch.setattr(retry_policy.time, "sleep", delays.append)
+    return delays
+
+
+@pytest.fixture
+def provider(request):
+    # Um orçamento de novas tentativas novo por teste (get_retry_budget guarda um por provedor)
+    name = f"test-{request.node.name}"
+    yield name
+    retry_policy._retry_budgets.pop(name, None)
+
+
+def test_backoff_delay_is_bounded_full_jitter(monkeypatch):
+    monkeypatch.setattr(retry_policy.random, "uniform", lambda low, high: high)
+    assert [backoff_delay(n) for n in range(6)] == [0.5, 1.0, 2.0, 4.0, 8.0, 8.0]
+    monkeypatch.setattr(retry_policy.random, "uniform", lambda low, high: low)
+    assert backoff_delay(3) == 0
+    # Nunca menor que o Retry-After do servidor
+    assert backoff_delay(0, retry_after=5.0) == 5.0
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("7") == 7.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("depois") is None
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+
+def test_retries_until_success(provider, sleeps):
+    attempt = Attempts(retryable_error("503"), retryable_error("503"), {"status": "1"})
+    assert run_with_retries(provider, attempt) == {"status": "1"}
+    assert attempt.calls == 3
+    assert len(sleeps) == 2
+
+
+def test_stops_after_max_attempts(provider, sleeps, monkeypatch):
+    monkeypatch.setitem(RETRY_CONFIG, "max_attempts", 3)
+    attempt = Attempts(retryable_error("503"))
+    assert is_retryable(run_with_retries(provider, attempt))
+    assert attempt.calls == 3
+
+
+def test_fatal_error_is_not_retried(provider, sleeps):
+    attempt = Attempts({"error_fatal": "chave inválida"}, {"status": "1"})
+    assert run_with_retries(provider, attempt) == {"error_fatal": "chave inválida"}
+    assert attempt.calls == 1
+    assert sleeps == []
+
+
+def test_waits_for_retry_after(provider, sleeps):
+    attempt = Attempts(retryable_error("429", retry_after=3.0), {"status": "1"})
+    assert run_with_retries(provider, attempt) == {"status": "1"}
+    assert sleeps[0] >= 3.0
+
+
+def test_long_retry_after_is_left_for_requeue(provider, sleeps):
+    attempt = Attempts(retryable_error("429", retry_after=RETRY_CONFIG["max_retry_after"] + 1), {"status": "1"})
+    assert is_retryable(run_with_retries(provider, attempt))
+    assert attempt.calls == 1
+    assert sleeps == []
+
+
+def test_retry_budget_limits_retries(provider, sleeps, monkeypatch):
+    monkeypatch.setitem(retry_policy._retry_budgets, provider, RetryBudget(ratio=0.0, min_per_second=0.0, max_balance=2))
+    attempt = Attempts(retryable_error("503"))
+    monkeypatch.setitem(RETRY_CONFIG, "max_attempts", 10)
+    run_with_retries(provider, attempt)
+    # Duas novas tentativas no orçamento, depois mais nenhuma
+    assert attempt.calls == 3
+    run_with_retries(provider, attempt)
+    assert attempt.calls == 4
+
+
+def test_retry_budget_refills_with_traffic():
+    budget = RetryBudget(ratio=0.5, min_per_second=0.0, max_balance=1)
+    assert budget.try_withdraw()
+    assert not budget.try_withdraw()
+    budget.deposit()
+    budget.deposit()
+    assert budget.try_withdraw()
+
+
+def test_backoff_releases_provider_slot(provider, monkeypatch):
+    slot = threading.BoundedSemaphore(1)
+    free_while_sleeping = []
+
+    def _sleep(delay):
+        # Outra consulta do provedor consegue a vaga durante o backoff
+        acquired = slot.acquire(blocking=False)
+        free_while_sleeping.append(acquired)
+        if acquired:
+            slot.release()
+
+    monkeypatch.setattr(retry_policy.time, "sleep", _sleep)
+    attempt = Attempts(retryable_error("503"), {"status": "1"})
+    with holding_slot(slot):
+        assert run_with_retries(provider, attempt) == {"status": "1"}
+        # A vaga volta para a thread antes da nova tentativa
+        assert slot.acquire(blocking=False) is False
+    assert free_while_sleeping == [True]
+    assert slot.acquire(blocking=False) is True
+
+
+class FlakyLookups:
+    """get_blockchain_data simulado: cada endereço em flaky falha com erro temporário nas primeiras vezes."""
+
+    def __init__(self, flaky):
+        self.flaky = dict(flaky)
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, address, network, api_key=None, **kwargs):
+        with self._lock:
+            self.calls.append(address)
+            if self.flaky.get(address, 0) > 0:
+                self.flaky[address] -= 1
+                return retryable_error("503")
+        return {"balance_crypto": Decimal(0), "has_transactions": address == "used", "explorer_link": "#"}
+
+
+def _wallets(*addresses):
+    return [{"network": "BTC", "address": address} for address in addresses]
+
+
+@pytest.fixture
+def no_requeue_delay(monkeypatch):
+    monkeypatch.setitem(RETRY_CONFIG, "requeue_delay", 0)
+    monkeypatch.setitem(RETRY_CONFIG, "requeue_passes", 2)
+
+
+def test_lookup_requeues_temporary_errors(monkeypatch, no_requeue_delay):
+    lookups = FlakyLookups({"a": 1, "c": 2})
+    monkeypatch.setattr(scan_engine, "get_blockchain_data", lookups)
+    with LookupEngine(use_cache=False, use_prescreen=False) as engine:
+        results = engine.lookup(_wallets("a", "used", "c"))
+
+    assert [is_retryable(result) for result in results] == [False, False, False]
+    assert results[1]["has_transactions"] is True
+    # Primeira rodada com todos, depois só os que falharam
+    assert sorted(lookups.calls[:3]) == ["a", "c", "used"]
+    assert sorted(lookups.calls[3:]) == ["a", "c", "c"]
+
+
+def test_lookup_gives_up_after_requeue_passes(monkeypatch, no_requeue_delay):
+    lookups = FlakyLookups({"a": 10})
+    monkeypatch.setattr(scan_engine, "get_blockchain_data", lookups)
+    with LookupEngine(use_cache=False, use_prescreen=False) as engine:
+        results = engine.lookup(_wallets("a"))
+    assert is_retryable(results[0])
+    assert lookups.calls == ["a"] * 3
+
+
+def test_streaming_defers_temporary_errors_to_the_end(monkeypatch, no_requeue_delay):
+    lookups = FlakyLookups({"a": 1})
+    monkeypatch.setattr(scan_engine, "get_blockchain_data", lookups)
+    with LookupEngine(use_cache=False, use_prescreen=False) as engine:
+        results = list(iter_lookup_results(engine, _wallets("a", "b", "used")))
+
+    assert [wallet_info["address"] for wallet_info, _ in results][-1] == "a"
+    assert not any(is_retryable(blockchain_data) for _, blockchain_data in results)
+
+
+def test_streaming_skips_requeue_when_cancelled(monkeypatch, no_requeue_delay):
+    lookups = FlakyLookups({"a": 10})
+    monkeypatch.setattr(scan_engine, "get_blockchain_data", lookups)
+    cancel_event = threading.Event()
+    cancel_event.set()
+    with LookupEngine(use_cache=False, use_prescreen=False) as engine:
+        results = list(iter_lookup_results(engine, _wallets("a", "b"), cancel_event=cancel_event))
+
+    # Os adiados saem com o erro que tiveram, sem nova rodada
+    assert lookups.calls.count("a") == 1
+    assert [wallet_info["address"] for wallet_info, _ in results] == ["b", "a"]
+    assert is_retryable(results[1][1])
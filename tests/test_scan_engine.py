@@ -0,0 +1,141 @@
+import random
+import threading
+import time
+from decimal import Decimal
+
+import pytest
+
+from utils import scan_engine
+from utils.scan_engine import LookupEngine, iter_lookup_results, iter_scan
+from utils.wallet_derivation import create_derivation_cache
+
+from conftest import TEST_MNEMONIC
+
+
+class SlowLookups:
+    """get_blockchain_data simulado com latência aleatória; mede as consultas simultâneas."""
+
+    def __init__(self, max_delay=0.005):
+        self.max_delay = max_delay
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, address, network, api_key=None, **kwargs):
+        with self._lock:
+            self.calls.append((network, address))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(random.uniform(0, self.max_delay))
+        with self._lock:
+            self.in_flight -= 1
+        return {"balance_crypto": Decimal(0), "has_transactions": False, "explorer_link": "#", "address": address}
+
+
+@pytest.fixture
+def lookups(monkeypatch):
+    fake = SlowLookups()
+    monkeypatch.setattr(scan_engine, "get_blockchain_data", fake)
+    monkeypatch.setattr(scan_engine, "get_evm_native_balances", lambda addresses, network, api_key=None: {})
+    return fake
+
+
+@pytest.fixture
+def provider_limit(monkeypatch):
+    """Define max_workers de um provedor, com semáforos novos (_provider_slot guarda um por processo)."""
+    def _set(provider, max_workers):
+        monkeypatch.setitem(scan_engine.PROVIDER_LIMITS, provider, {"max_workers": max_workers})
+    monkeypatch.setattr(scan_engine, "_provider_slots", {})
+    return _set
+
+
+def _wallets(network, count, prefix="addr"):
+    return [{"network": network, "address": f"{prefix}{i}"} for i in range(count)]
+
+
+def _engine():
+    return LookupEngine(use_cache=False, use_prescreen=False)
+
+
+def test_lookup_results_follow_input_order(lookups):
+    wallets = _wallets("BTC", 30) + _wallets("TRX", 30, "T") + _wallets("ETH", 10, "0xabc")
+    with _engine() as engine:
+        results = engine.lookup(wallets)
+    assert [result["address"] for result in results] == [wallet["address"] for wallet in wallets]
+
+
+def test_duplicate_wallets_are_queried_once(lookups):
+    wallets = [
+        {"network": "BTC", "address": "a"},
+        {"network": "BTC", "address": "b"},
+        {"network": "BTC", "address": "a"},
+        # Endereços EVM não diferenciam maiúsculas
+        {"network": "ETH", "address": "0xAbC"},
+        {"network": "ETH", "address": "0xabc"},
+        # Mesmo endereço em outra rede é outra carteira
+        {"network": "BSC", "address": "0xabc"},
+    ]
+    with _engine() as engine:
+        results = engine.lookup(wallets)
+
+    assert sorted(lookups.calls) == [("BSC", "0xabc"), ("BTC", "a"), ("BTC", "b"), ("ETH", "0xAbC")]
+    assert results[2] == results[0]
+    assert results[4] == results[3]
+
+
+def test_provider_limit_caps_concurrent_requests(lookups, provider_limit):
+    provider_limit("blockstream", 2)
+    with _engine() as engine:
+        engine.lookup(_wallets("BTC", 40))
+    assert lookups.max_in_flight <= 2
+
+
+def test_provider_limit_is_shared_by_engines(lookups, provider_limit):
+    provider_limit("blockstream", 3)
+    lookups.max_delay = 0.01
+
+    def _scan(prefix):
+        with _engine() as engine:
+            engine.lookup(_wallets("BTC", 20, prefix))
+
+    threads = [threading.Thread(target=_scan, args=(f"scan{n}-",)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(lookups.calls) == 80
+    assert lookups.max_in_flight <= 3
+
+
+def test_streaming_limits_pending_lookups(lookups):
+    with _engine() as engine:
+        results = list(iter_lookup_results(engine, iter(_wallets("BTC", 50)), max_in_flight=4))
+    assert sorted(wallet["address"] for wallet, _ in results) == sorted(f"addr{i}" for i in range(50))
+
+
+def test_cancelled_scan_shuts_down_executors(lookups, monkeypatch):
+    engines = []
+
+    class RecordingEngine(LookupEngine):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            engines.append(self)
+
+    monkeypatch.setattr(scan_engine, "LookupEngine", RecordingEngine)
+    cancel_event = threading.Event()
+    derivation_cache = create_derivation_cache(TEST_MNEMONIC, "")
+    scan = iter_scan(
+        derivation_cache, ["BTC", "TRX"], [0], list(range(200)), ["BECH32"], [0],
+        cancel_event=cancel_event, use_cache=False, use_prescreen=False
+    )
+    next(scan)
+    cancel_event.set()
+    scan.close()
+
+    (engine,) = engines
+    assert engine._executors == {}
+    queried = len(lookups.calls)
+    time.sleep(0.05)
+    # Nada mais é consultado depois do cancelamento
+    assert len(lookups.calls) == queried < 400
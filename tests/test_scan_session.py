@@ -0,0 +1,106 @@
+import pytest
+
+import app as fenix_app
+from utils import scan_session
+from utils.scan_session import ChainProgress, ScanSessionStore
+from utils.wallet_derivation import DerivationCache, create_derivation_cache, derive_chain_addresses
+
+from conftest import TEST_MNEMONIC
+
+SCAN = {
+    "seed_phrase": TEST_MNEMONIC,
+    "selected_networks": ["BTC"],
+    "bitcoin_address_types": ["BECH32"],
+    "change_types": [0],
+    "account_indices": "0",
+    "api_keys": {"ethereum": "CHAVE"},
+    "use_cache": False,
+}
+
+
+@pytest.fixture(scope="module")
+def addresses():
+    cache = DerivationCache(create_derivation_cache(TEST_MNEMONIC, "").seed_bytes)
+    return [wallet['address'] for wallet in derive_chain_addresses(cache, "BTC", 0, 0, list(range(20)), "BECH32")]
+
+
+@pytest.fixture
+def client(fake_providers, monkeypatch):
+    monkeypatch.setattr(scan_session, "_session_store", ScanSessionStore())
+    fenix_app.app.config["TESTING"] = True
+    with fenix_app.app.test_client() as client:
+        yield client
+
+
+def _queried(fake_providers, addresses):
+    queried = sorted(addresses.index(address) for _, address in fake_providers.calls)
+    fake_providers.calls.clear()
+    return queried
+
+
+def test_chain_progress_merges_ranges_and_keeps_failed():
+    progress = ChainProgress()
+    progress.add([0, 1, 2, 5, 6])
+    progress.add([3, 4])
+    assert progress.to_dict()["ranges"] == [[0, 6]]
+    progress.record(8, used=False, failed=True)
+    progress.record(7, used=True, failed=False)
+    assert progress.to_dict()["ranges"] == [[0, 8]]
+    assert progress.pending(range(10)) == [8, 9]
+    progress.record(8, used=False, failed=False)
+    assert progress.pending(range(10)) == [9]
+    assert progress.last_used_index == 7
+
+
+def test_continue_scans_only_new_indices(client, fake_providers, addresses):
+    fake_providers.used.add(("BTC", addresses[6]))
+    created = client.post("/scan_sessions", json={**SCAN, "address_indices": "0-4"})
+    assert created.status_code == 201
+    session = created.get_json()["session"]
+    assert _queried(fake_providers, addresses) == [0, 1, 2, 3, 4]
+
+    continued = client.post(
+        f"/scan_sessions/{session['session_id']}/continue",
+        json={"seed_phrase": TEST_MNEMONIC, "address_indices": "0-9"}
+    ).get_json()
+    assert _queried(fake_providers, addresses) == [5, 6, 7, 8, 9]
+    assert [item["address"] for item in continued["results"]] == [addresses[6]]
+    chain = continued["session"]["chains"][0]
+    assert chain["ranges"] == [[0, 9]] and chain["last_used_index"] == 6
+
+
+def test_continue_retries_failed_indices(client, fake_providers, addresses):
+    fake_providers.failing.add(("BTC", addresses[2]))
+    session = client.post("/scan_sessions", json={**SCAN, "address_indices": "0-4"}).get_json()["session"]
+    assert session["chains"][0]["failed_indices"] == [2]
+    fake_providers.calls.clear()
+
+    fake_providers.failing.clear()
+    continue_url = f"/scan_sessions/{session['session_id']}/continue"
+    continued = client.post(continue_url, json={"seed_phrase": TEST_MNEMONIC, "address_indices": "0-4"}).get_json()
+    assert _queried(fake_providers, addresses) == [2]
+    assert continued["session"]["chains"][0]["failed_indices"] == []
+
+    client.post(continue_url, json={"seed_phrase": TEST_MNEMONIC, "address_indices": "0-4"})
+    assert _queried(fake_providers, addresses) == []
+
+
+def test_session_keeps_neither_seed_nor_api_keys(client):
+    session_id = client.post("/scan_sessions", json={**SCAN, "address_indices": "0-1"}).get_json()["session"]["session_id"]
+    session = scan_session.get_session_store().get(session_id)
+    assert "api_keys" not in session.scan_inputs
+    assert "seed_phrase" not in session.scan_inputs and "passphrase" not in session.scan_inputs
+
+    other_seed = "legal winner thank year wave sausage worth useful legal winner thank yellow"
+    response = client.post(f"/scan_sessions/{session_id}/continue", json={"seed_phrase": other_seed})
+    assert response.status_code == 400
+
+
+def test_session_is_registered_only_after_first_scan(client, monkeypatch):
+    def _failing_scan(*args, **kwargs):
+        raise RuntimeError("provedor fora do ar")
+
+    monkeypatch.setattr(fenix_app, "iter_scan_chain_ranges", _failing_scan)
+    response = client.post("/scan_sessions", json={**SCAN, "address_indices": "0-4"})
+    assert response.status_code == 500
+    assert scan_session.get_session_store()._sessions == {}
@@ -0,0 +1,134 @@
+import hashlib
+
+import pytest
+from bip_utils import Bip32Secp256k1, Bip39SeedGenerator, Secp256k1PrivateKey
+
+from utils import secp256k1_batch
+from utils.secp256k1_batch import (
+    child_public_keys, child_tweak, compress_public_key, lift_x_tweak_add, tweak_add_batch,
+    uncompressed_public_key
+)
+from utils.wallet_derivation import DerivationCache, NETWORK_CONFIGS
+
+_N = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141
+
+# BIP32, vetor de teste 1
+BIP32_SEED = bytes.fromhex("000102030405060708090a0b0c0d0e0f")
+BIP32_VECTORS = [
+    # (nó pai, índice não-hardened, chave pública esperada do filho)
+    ("m/0'", 1, "03501e454bf00751f24b1b489aa925215d66af2234e3891c3b21a52bedb3cd711c"),
+    ("m/0'/1/2'", 2, "02e8445082a72f29b75ca48748a914df60622a609cacfce8ed0e35804560741d29"),
+    ("m/0'/1/2'/2", 1000000000, "022a471424da5e657499d1ff51cb43c47481a03b1e77f951fe64cec9f5a48f7011"),
+]
+
+# BIP86, primeiro endereço de "abandon ... about" (m/86'/0'/0'/0/0)
+BIP86_MNEMONIC = "abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon about"
+BIP86_INTERNAL_KEY = "cc8a4bc64d897bddc5fbc2f670f7a8ba0b386779106cf1223c6fc5d7cd6fc115"
+BIP86_OUTPUT_KEY = "a60869f0dbcf1dc659c9cecbaf8050135ea9e8cdc487053f1dc6880949dc684c"
+
+
+def _node_keys(node):
+    return node.PublicKey().RawCompressed().ToBytes(), node.ChainCode().ToBytes()
+
+
+@pytest.mark.parametrize("parent_path, index, expected", BIP32_VECTORS)
+def test_bip32_vectors(secp256k1_backend, parent_path, index, expected):
+    parent = Bip32Secp256k1.FromSeed(BIP32_SEED).DerivePath(parent_path)
+    assert child_public_keys(*_node_keys(parent), [index])[0].hex() == expected
+
+
+@pytest.mark.parametrize("compressed", [True, False])
+def test_matches_bip_utils_per_index(secp256k1_backend, compressed):
+    change_node = Bip32Secp256k1.FromSeed(BIP32_SEED).DerivePath("m/44'/0'/0'/0")
+    indices = list(range(40)) + [2 ** 31 - 1, 7, 0]
+    expected = []
+    for index in indices:
+        public_key = change_node.ChildKey(index).PublicKey()
+        expected.append(public_key.RawCompressed().ToBytes() if compressed else public_key.RawUncompressed().ToBytes())
+    assert child_public_keys(*_node_keys(change_node), indices, compressed=compressed) == expected
+
+
+def test_backends_agree(monkeypatch):
+    if secp256k1_batch.coincurve is None:
+        pytest.skip("coincurve não instalado")
+    parent = Secp256k1PrivateKey.FromBytes(hashlib.sha256(b"fenix").digest()).PublicKey().RawCompressed().ToBytes()
+    tweaks = [1, 2, _N - 1, None] + [int.from_bytes(hashlib.sha256(bytes([i])).digest(), "big") % _N for i in range(20)]
+    results = {}
+    for backend in ("coincurve", "python"):
+        monkeypatch.setitem(secp256k1_batch.SECP256K1_BATCH_CONFIG, "backend", backend)
+        results[backend] = tweak_add_batch([parent] * len(tweaks), tweaks, compressed=False)
+    assert results["coincurve"] == results["python"]
+    assert results["python"][3] is None
+
+
+def test_taproot_tweak_bip86(secp256k1_backend):
+    internal_key = bytes.fromhex(BIP86_INTERNAL_KEY)
+    tag = hashlib.sha256(b"TapTweak").digest()
+    tweak = int.from_bytes(hashlib.sha256(tag + tag + internal_key).digest(), "big")
+    assert lift_x_tweak_add([internal_key], [tweak]) == [bytes.fromhex(BIP86_OUTPUT_KEY)]
+
+
+def test_taproot_internal_key_from_bip86_path(secp256k1_backend):
+    seed = Bip39SeedGenerator(BIP86_MNEMONIC).Generate()
+    change_node = Bip32Secp256k1.FromSeed(seed).DerivePath("m/86'/0'/0'/0")
+    child = child_public_keys(*_node_keys(change_node), [0])[0]
+    assert child[1:].hex() == BIP86_INTERNAL_KEY
+
+
+def test_point_at_infinity_is_none(secp256k1_backend):
+    private_key = 0x1234567890ABCDF2  # chave pública com y par (prefixo 02), ver lift_x abaixo
+    public_key = Secp256k1PrivateKey.FromBytes(private_key.to_bytes(32, "big")).PublicKey().RawCompressed().ToBytes()
+    # P + (n - k)·G = k·G + (n - k)·G = infinito
+    assert tweak_add_batch([public_key, public_key], [_N - private_key, 1]) == [
+        None, Secp256k1PrivateKey.FromBytes((private_key + 1).to_bytes(32, "big")).PublicKey().RawCompressed().ToBytes()
+    ]
+    assert public_key[0] == 2
+    assert lift_x_tweak_add([public_key[1:]], [_N - private_key]) == [None]
+
+
+class _InvalidTweakHmac:
+    """Substitui o módulo hmac de secp256k1_batch: o índice invalid_index recebe IL = n (inválido)."""
+
+    def __init__(self, invalid_index):
+        self.invalid_index = invalid_index
+        self._digest = secp256k1_batch.hmac.digest
+
+    def digest(self, key, message, algorithm):
+        if int.from_bytes(message[-4:], "big") == self.invalid_index:
+            return _N.to_bytes(32, "big") + bytes(32)
+        return self._digest(key, message, algorithm)
+
+
+def test_invalid_il_skips_index(secp256k1_backend, monkeypatch):
+    change_node = Bip32Secp256k1.FromSeed(BIP32_SEED).DerivePath("m/44'/0'/0'/0")
+    monkeypatch.setattr(secp256k1_batch, "hmac", _InvalidTweakHmac(3))
+    parent_public_key, chain_code = _node_keys(change_node)
+    assert child_tweak(parent_public_key, chain_code, 3) is None
+
+    public_keys = child_public_keys(parent_public_key, chain_code, range(6))
+    assert public_keys[3] is None
+    assert [key for i, key in enumerate(public_keys) if i != 3] == [
+        change_node.ChildKey(i).PublicKey().RawCompressed().ToBytes() for i in (0, 1, 2, 4, 5)
+    ]
+
+
+def test_derivation_cache_falls_back_for_skipped_index(secp256k1_backend, monkeypatch):
+    # O índice que a derivação em lote pula é derivado pelo bip_utils em DerivationCache.addresses
+    monkeypatch.setattr(secp256k1_batch, "hmac", _InvalidTweakHmac(3))
+    seed = Bip39SeedGenerator(BIP86_MNEMONIC).Generate()
+    config = NETWORK_CONFIGS["ETH"]
+    derived = DerivationCache(seed).addresses(
+        44, 60, 0, 0, range(6), config["address_encoding"], config["address_format"],
+        config["private_key_format"], lazy_private_key=True
+    )
+    change_node = Bip32Secp256k1.FromSeed(seed).DerivePath("m/44'/60'/0'/0")
+    assert [address for address, _ in derived] == [
+        config["address_format"](change_node.ChildKey(i).PublicKey()) for i in range(6)
+    ]
+
+
+def test_public_key_conversions(secp256k1_backend):
+    public_key = Secp256k1PrivateKey.FromBytes(hashlib.sha256(b"conv").digest()).PublicKey()
+    compressed, uncompressed = public_key.RawCompressed().ToBytes(), public_key.RawUncompressed().ToBytes()
+    assert compress_public_key(uncompressed) == compressed
+    assert uncompressed_public_key(compressed) == uncompressed
@@ -0,0 +1,66 @@
+import pytest
+from bip_utils import Bip44, Bip44Changes, Bip44Coins, Bip49, Bip49Coins, Bip84, Bip84Coins, Bip86, Bip86Coins
+
+from utils.wallet_derivation import (
+    DerivationCache, create_derivation_cache, derive_chain_addresses, resolve_private_key,
+)
+
+from conftest import TEST_MNEMONIC
+
+INDICES = [0, 1, 2, 7, 19]
+
+# Caminho de referência de cada cadeia: a classe BIP do bip_utils e a moeda, como no FromSeed por endereço
+REFERENCE_CHAINS = [
+    ("BTC", "P2PKH", Bip44, Bip44Coins.BITCOIN),
+    ("BTC", "P2SH", Bip49, Bip49Coins.BITCOIN),
+    ("BTC", "BECH32", Bip84, Bip84Coins.BITCOIN),
+    ("BTC", "TAPROOT", Bip86, Bip86Coins.BITCOIN),
+    ("ETH", None, Bip44, Bip44Coins.ETHEREUM),
+    ("BSC", None, Bip44, Bip44Coins.ETHEREUM),
+    ("TRX", None, Bip44, Bip44Coins.TRON),
+]
+
+
+@pytest.fixture(scope="module")
+def seed_bytes():
+    return create_derivation_cache(TEST_MNEMONIC, "").seed_bytes
+
+
+def _is_btc(coin):
+    return coin in (Bip44Coins.BITCOIN, Bip49Coins.BITCOIN, Bip84Coins.BITCOIN, Bip86Coins.BITCOIN)
+
+
+def _reference(seed_bytes, bip_class, coin, account, change, index):
+    chain = bip_class.FromSeed(seed_bytes, coin).Purpose().Coin().Account(account).Change(
+        Bip44Changes.CHAIN_INT if change else Bip44Changes.CHAIN_EXT
+    )
+    node = chain.AddressIndex(index)
+    private_key = node.PrivateKey().ToWif() if _is_btc(coin) else node.PrivateKey().Raw().ToHex()
+    return node.PublicKey().ToAddress(), private_key
+
+
+@pytest.mark.parametrize("network, btc_type, bip_class, coin", REFERENCE_CHAINS)
+@pytest.mark.parametrize("account, change", [(0, 0), (0, 1), (1, 0)])
+def test_cached_derivation_matches_bip_utils(secp256k1_backend, seed_bytes, network, btc_type, bip_class, coin,
+                                             account, change):
+    cache = DerivationCache(seed_bytes)
+    wallets = derive_chain_addresses(cache, network, account, change, INDICES, btc_type)
+    lazy_wallets = derive_chain_addresses(DerivationCache(seed_bytes), network, account, change, INDICES, btc_type, True)
+
+    for index, wallet, lazy_wallet in zip(INDICES, wallets, lazy_wallets):
+        address, private_key = _reference(seed_bytes, bip_class, coin, account, change, index)
+        assert wallet['address'] == address
+        assert wallet['private_key'] == private_key
+        assert wallet['derivation_path'].endswith(f"/{account}'/{change}/{index}")
+        # Modo lazy: mesmo endereço, chave privada derivada só quando pedida
+        assert lazy_wallet['address'] == address
+        assert resolve_private_key(cache, lazy_wallet) == private_key
+
+
+def test_address_blocks_are_reused(seed_bytes):
+    cache = DerivationCache(seed_bytes)
+    first = derive_chain_addresses(cache, "ETH", 0, 0, INDICES)
+    # As redes EVM usam o mesmo caminho: o bloco de endereços já derivado é reaproveitado
+    again = derive_chain_addresses(cache, "BSC", 0, 0, INDICES)
+    assert [wallet['address'] for wallet in again] == [wallet['address'] for wallet in first]
+    assert cache._memo_size == len(INDICES)
@@ -0,0 +1,169 @@
+import os
+import hashlib
+
+from Crypto.Hash import RIPEMD160, keccak
+
+from utils.logging_config import get_logger
+from utils.secp256k1_batch import compress_public_key, uncompressed_public_key, lift_x_tweak_add
+
+logger = get_logger("address_encoding")
+
+# --- Codificação de Endereços em Lote ---
+# Os lambdas de NETWORK_CONFIGS passam cada endereço pelos encoders do bip_utils: objeto de chave,
+# validação, descompressão e várias cópias por endereço. Aqui cada formato codifica uma lista inteira
+# de chaves (bytes) de uma vez, com as constantes (versões, HRP, tag do Taproot) pré-computadas.
+# Os parâmetros são os mesmos dos lambdas (mainnet), e os endereços saem idênticos.
+ADDRESS_ENCODING_CONFIG = {
+    # FENIX_BATCH_ENCODING=off volta para os encoders do bip_utils (lambdas de NETWORK_CONFIGS)
+    "enabled": os.environ.get("FENIX_BATCH_ENCODING", "on").lower() not in ("0", "off", "false", "no"),
+}
+
+P2PKH_NET_VER = b"\x00"
+P2SH_NET_VER = b"\x05"
+TRX_NET_VER = b"\x41"
+BECH32_HRP = "bc"
+
+# Codificações que partem da chave não comprimida (Keccak de X || Y)
+UNCOMPRESSED_ENCODINGS = frozenset(("EVM", "TRX"))
+
+_B58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+# Dois dígitos base58 por divisão: metade das operações com inteiros grandes
+_B58_PAIRS = [a + b for a in _B58_ALPHABET for b in _B58_ALPHABET]
+
+_BECH32_CHARSET = "qpzry9x8gf2tvdw0s3jn54khce6mua7l"
+_BECH32_CONST = 1
+_BECH32M_CONST = 0x2BC830A3
+# Polymod do Bech32 com tabela: os 5 bits que saem do topo escolhem o XOR dos geradores
+_BECH32_GENERATORS = (0x3B6A57B2, 0x26508E6D, 0x1EA119FA, 0x3D4233DD, 0x2A1462B3)
+_BECH32_TABLE = [0] * 32
+for _top in range(32):
+    for _bit, _generator in enumerate(_BECH32_GENERATORS):
+        if (_top >> _bit) & 1:
+            _BECH32_TABLE[_top] ^= _generator
+
+_TAP_TWEAK_TAG = hashlib.sha256(b"TapTweak").digest()
+
+
+def _bech32_polymod(values, chk=1):
+    table = _BECH32_TABLE
+    for value in values:
+        chk = ((chk & 0x1FFFFFF) << 5) ^ value ^ table[chk >> 25]
+    return chk
+
+
+def _bech32_hrp_state(hrp):
+    """Estado do polymod depois da expansão do HRP, igual para todos os endereços da rede."""
+    return _bech32_polymod([ord(c) >> 5 for c in hrp] + [0] + [ord(c) & 31 for c in hrp])
+
+
+_BECH32_HRP_STATE = _bech32_hrp_state(BECH32_HRP)
+
+
+def _segwit_encode(program, witness_version, const):
+    """Endereço segwit (BIP173/BIP350) de um programa de 20 ou 32 bytes."""
+    bits = len(program) * 8
+    pad = -bits % 5
+    number = int.from_bytes(program, "big") << pad
+    groups = (bits + pad) // 5
+    data = [witness_version] + [(number >> (5 * (groups - 1 - i))) & 31 for i in range(groups)]
+    chk = _bech32_polymod(data + [0] * 6, _BECH32_HRP_STATE) ^ const
+    charset = _BECH32_CHARSET
+    return (
+        BECH32_HRP + "1"
+        + "".join(charset[value] for value in data)
+        + "".join(charset[(chk >> (5 * (5 - i))) & 31] for i in range(6))
+    )
+
+
+def _b58check(payload):
+    data = payload + hashlib.sha256(hashlib.sha256(payload).digest()).digest()[:4]
+    number = int.from_bytes(data, "big")
+    chunks = []
+    while number:
+        number, pair = divmod(number, 3364)
+        chunks.append(_B58_PAIRS[pair])
+    encoded = "".join(reversed(chunks)).lstrip("1")
+    return "1" * (len(data) - len(data.lstrip(b"\x00"))) + encoded
+
+
+def _hash160(data):
+    # RIPEMD-160 do pycryptodome: hashlib.new("ripemd160") falha no OpenSSL 3 sem o provider legacy
+    return RIPEMD160.new(hashlib.sha256(data).digest()).digest()
+
+
+def _keccak256(data):
+    return keccak.new(digest_bits=256, data=data).digest()
+
+
+def _eip55(address_bytes):
+    address_hex = address_bytes.hex()
+    hash_hex = _keccak256(address_hex.encode("ascii")).hex()  # hexdigest() do pycryptodome é bem mais lento
+    return "0x" + "".join(
+        char.upper() if hash_char in "89abcdef" else char for char, hash_char in zip(address_hex, hash_hex)
+    )
+
+
+def _key_hashes(public_keys):
+    return [_hash160(compress_public_key(public_key)) for public_key in public_keys]
+
+
+def _eth_bytes(public_keys):
+    """Últimos 20 bytes do Keccak-256 de X || Y (endereço EVM em bytes, base do TRX)."""
+    return [_keccak256(uncompressed_public_key(public_key)[1:])[12:] for public_key in public_keys]
+
+
+def _encode_p2pkh(public_keys):
+    return [_b58check(P2PKH_NET_VER + key_hash) for key_hash in _key_hashes(public_keys)]
+
+
+def _encode_p2sh(public_keys):
+    # P2SH-P2WPKH: hash160 do script 0014<hash160 da chave>
+    return [_b58check(P2SH_NET_VER + _hash160(b"\x00\x14" + key_hash)) for key_hash in _key_hashes(public_keys)]
+
+
+def _encode_bech32(public_keys):
+    return [_segwit_encode(key_hash, 0, _BECH32_CONST) for key_hash in _key_hashes(public_keys)]
+
+
+def _encode_taproot(public_keys):
+    # BIP86: chave de saída = lift_x(x) + TaggedHash("TapTweak", x)·G, sem script path
+    x_only_keys = [compress_public_key(public_key)[1:] for public_key in public_keys]
+    tweaks = [
+        int.from_bytes(hashlib.sha256(_TAP_TWEAK_TAG + _TAP_TWEAK_TAG + x).digest(), "big") for x in x_only_keys
+    ]
+    return [
+        _segwit_encode(output_key, 1, _BECH32M_CONST) if output_key is not None else None
+        for output_key in lift_x_tweak_add(x_only_keys, tweaks)
+    ]
+
+
+def _encode_evm(public_keys):
+    return [_eip55(address_bytes) for address_bytes in _eth_bytes(public_keys)]
+
+
+def _encode_trx(public_keys):
+    return [_b58check(TRX_NET_VER + address_bytes) for address_bytes in _eth_bytes(public_keys)]
+
+
+# Codificação (nome usado em NETWORK_CONFIGS / DerivationCache) -> encoder em lote
+BATCH_ENCODERS = {
+    "P2PKH": _encode_p2pkh,
+    "P2SH": _encode_p2sh,
+    "BECH32": _encode_bech32,
+    "TAPROOT": _encode_taproot,
+    "EVM": _encode_evm,
+    "TRX": _encode_trx,
+}
+
+
+def has_batch_encoder(encoding):
+    return ADDRESS_ENCODING_CONFIG["enabled"] and encoding in BATCH_ENCODERS
+
+
+def encode_addresses(public_keys, encoding):
+    """
+    Codifica as chaves públicas (bytes, comprimidas ou não) na codificação pedida.
+    Retorna os endereços na ordem das chaves; um endereço impossível de gerar (tweak do Taproot
+    no infinito) vem como None.
+    """
+    return BATCH_ENCODERS[encoding](public_keys)
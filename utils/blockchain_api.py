@@ -1,21 +1,37 @@
+import os
 import requests
+from requests.adapters import HTTPAdapter
 import json
+import math
+import hashlib
+import threading
 from decimal import Decimal, getcontext
 import time
 
+from utils.logging_config import get_logger
+from utils.metrics import (
+    record_time, record_count, API_REQUEST_SECONDS, RATE_LIMIT_WAIT_SECONDS, RATE_LIMIT_BACKOFFS_TOTAL,
+    BACKEND_FAILOVERS_TOTAL
+)
+from utils.providers import iter_backends
+from utils.retry_policy import (
+    run_with_retries, retryable_error, is_retryable, is_retryable_status, parse_retry_after
+)
+
+logger = get_logger("blockchain_api")
+
 # Configura a precisão para operações com Decimal
 getcontext().prec = 30
 
-# --- URLs Base das APIs e Contratos USDT/Tokens ---
+# --- Links de Explorador e Contratos USDT/Tokens ---
+# Os servidores consultados (e seus substitutos em caso de falha) ficam em utils.providers.PROVIDER_BACKENDS
 API_CONFIG = {
     "BTC": {
-        "base_url": "https://blockstream.info/api",
         "explorer_link_base": "https://web3.okx.com/pt-br/explorer/bitcoin/address/" # URL corrigida
     },
     # PARA TODAS AS REDES EVM (ETH, BSC, MATIC, BASE, OPTIMISM, ARBITRUM)
     # A Etherscan V2 unifica o endpoint para api.etherscan.io/v2/api e usa o chainid
     "EVM_COMMON": {
-        "base_url_v2_unified": "https://api.etherscan.io/v2/api", # URL UNIFICADA DA V2
         "explorer_link_base": { # Links de explorador ainda serão específicos
             "ETH": "https://etherscan.io/address/",
             "BSC": "https://bscscan.com/address/",
@@ -42,12 +58,43 @@ API_CONFIG = {
         }
     },
     "TRX": {
-        "base_url": "https://api.trongrid.io", # Usando trongrid.io
         "explorer_link_base": "https://tronscan.org/#/address/", # Tronscan para explorer link
         "usdt_contract": "TR7NHqjeKQxGTCi8q8ZiFhgvdhB8zkEgJW" # USDT-TRC20
     }
 }
 
+# --- Provedor de dados por rede ---
+# Usado pelo motor de consultas para limitar a concorrência separadamente por provedor
+EVM_NETWORKS = ["ETH", "BSC", "MATIC", "BASE", "OPTIMISM", "ARBITRUM"]
+
+NETWORK_PROVIDERS = {
+    "BTC": "blockstream",
+    "ETH": "etherscan",
+    "BSC": "etherscan",
+    "MATIC": "etherscan",
+    "BASE": "etherscan",
+    "OPTIMISM": "etherscan",
+    "ARBITRUM": "etherscan",
+    "TRX": "trongrid"
+}
+
+# --- Modos de Consulta (get_blockchain_data) ---
+# "full": saldo nativo, histórico e tokens (USDT) de todo endereço.
+# "probe": uma sonda barata de uso primeiro; as consultas de token só rodam se ela mostrar atividade.
+# Em BTC (tx_count da Blockstream) e TRX (existência da conta na TronGrid) a primeira chamada já é a
+# sonda, então os dois modos custam o mesmo. Em EVM a sonda é o saldo nativo (balancemulti) mais
+# txlist offset=1: um endereço que só recebeu tokens, sem nenhuma transação normal, passa como vazio.
+LOOKUP_MODE_FULL = "full"
+LOOKUP_MODE_PROBE = "probe"
+LOOKUP_MODES = (LOOKUP_MODE_FULL, LOOKUP_MODE_PROBE)
+
+# Nome da chave no dicionário 'api_keys' enviado pelo frontend, por provedor
+PROVIDER_API_KEY_NAMES = {
+    "blockstream": "bitcoin",
+    "etherscan": "ethereum",
+    "trongrid": "tron"
+}
+
 # --- Preços Mockados (para conversão USD) ---
 MOCKED_PRICES_USD = {
     "BTC": Decimal("70000.00"),
@@ -58,10 +105,349 @@ MOCKED_PRICES_USD = {
     "USDT": Decimal("1.00") # Preço do USDT para todos os tokens USDT
 }
 
+def get_provider_for_network(network):
+    """
+    Retorna o nome do provedor de dados usado para a rede (ou None se não suportada).
+    Redes EVM com nós JSON-RPC configurados (utils.evm_rpc) usam "evm_rpc" no lugar da Etherscan.
+    """
+    if network in EVM_NETWORKS and _uses_evm_rpc(network):
+        return "evm_rpc"
+    return NETWORK_PROVIDERS.get(network)
+
+
+def _uses_evm_rpc(network):
+    # Import local: utils.evm_rpc depende deste módulo
+    from utils.evm_rpc import has_rpc_backend
+    return has_rpc_backend(network)
+
+
+def get_api_key_for_provider(api_keys, provider):
+    """Seleciona, no dicionário de chaves enviado pelo frontend, a chave de API do provedor."""
+    key_name = PROVIDER_API_KEY_NAMES.get(provider)
+    if not key_name or not api_keys:
+        return None
+    return api_keys.get(key_name)
+
+
+def get_api_key_for_network(api_keys, network):
+    """Seleciona, no dicionário de chaves enviado pelo frontend, a chave de API da rede."""
+    return get_api_key_for_provider(api_keys, get_provider_for_network(network))
+
+
+# --- Limitação de Taxa (Token Bucket) por Provedor e Chave de API ---
+# rate: requisições por segundo sustentadas; burst: requisições permitidas de uma vez
+# min_rate: piso para a taxa adaptativa após respostas de "rate limit"
+# As taxas valem por chave de API: uma chave paga pode ser configurada com valores maiores
+# Cada backend (utils.providers) tem seu próprio balde; o backend principal usa o nome do provedor,
+# e os demais usam o limite do provedor, a menos que tenham uma entrada própria aqui (pelo nome do host)
+RATE_LIMIT_CONFIG = {
+    "blockstream": {"rate": 8.0, "burst": 8, "min_rate": 1.0},
+    "etherscan": {"rate": 4.0, "burst": 4, "min_rate": 0.5},  # Plano gratuito: 5 req/s por chave
+    "trongrid": {"rate": 8.0, "burst": 8, "min_rate": 1.0},
+    "evm_rpc": {"rate": 20.0, "burst": 20, "min_rate": 2.0},  # Por nó; cada requisição é um lote
+}
+
+DEFAULT_RATE_LIMIT = {"rate": 4.0, "burst": 4, "min_rate": 0.5}
+
+# Teto dos valores aceitos no parâmetro 'rate_limits' das requisições (valores acima são reduzidos).
+# Esses valores só valem para o balde da chave de API enviada pelo próprio usuário, nunca para o
+# balde sem chave, que é compartilhado por todos (ver apply_rate_limits em scan_engine).
+CLIENT_RATE_LIMIT_BOUNDS = {
+    "max_rate": float(os.environ.get("FENIX_MAX_CLIENT_RATE", 50)),
+    "max_burst": float(os.environ.get("FENIX_MAX_CLIENT_BURST", 100)),
+}
+
+
+class TokenBucket:
+    """
+    Token bucket thread-safe com taxa adaptativa.
+    Ao receber uma resposta de limite de taxa, a taxa cai pela metade (até min_rate)
+    e volta a subir gradualmente a cada resposta bem-sucedida.
+    """
+
+    def __init__(self, rate, burst, min_rate=None):
+        self.max_rate = float(rate)
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+        self.min_rate = float(min_rate) if min_rate else self.max_rate / 8
+        self.tokens = self.burst
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+            self.updated_at = now
+
+    def acquire(self):
+        """Bloqueia até haver um token disponível e o consome."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def on_rate_limited(self):
+        """Reduz a taxa e esvazia o balde após uma resposta de limite de taxa do provedor."""
+        with self.lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = 0
+            self.updated_at = time.monotonic()
+
+    def on_success(self):
+        """Recupera a taxa aos poucos (aumento aditivo) até o valor configurado."""
+        if self.rate >= self.max_rate:
+            return
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
+    def configure(self, rate=None, burst=None):
+        with self.lock:
+            if rate is not None:
+                self.max_rate = float(rate)
+                self.rate = float(rate)
+            if burst is not None:
+                self.burst = max(1.0, float(burst))
+                self.tokens = min(self.tokens, self.burst)
+
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def _api_key_fingerprint(api_key):
+    """Identifica a chave de API sem mantê-la em texto puro como chave de dicionário."""
+    if not api_key or not isinstance(api_key, str) or not api_key.strip():
+        return None
+    return hashlib.sha256(api_key.strip().encode()).hexdigest()[:16]
+
+
+def get_rate_limiter(provider, api_key=None, backend=None):
+    """Retorna o token bucket compartilhado para o par (backend ou provedor, chave de API)."""
+    key = (backend or provider, _api_key_fingerprint(api_key))
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(key)
+        if limiter is None:
+            config = RATE_LIMIT_CONFIG.get(backend) or RATE_LIMIT_CONFIG.get(provider, DEFAULT_RATE_LIMIT)
+            limiter = TokenBucket(config["rate"], config["burst"], config.get("min_rate"))
+            _rate_limiters[key] = limiter
+        return limiter
+
+
+def _positive_number(value, name):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} deve ser um número positivo.")
+    if isinstance(value, bool) or not math.isfinite(number) or number <= 0:
+        raise ValueError(f"{name} deve ser um número positivo.")
+    return number
+
+
+def configure_rate_limit(provider, api_key=None, rate=None, burst=None):
+    """
+    Ajusta taxa e burst de um provedor/chave (ex.: chave paga da Etherscan com 10 req/s).
+    Vale para o processo inteiro; valores vindos de requisições passam antes por validate_rate_limits.
+    """
+    if rate is not None:
+        rate = _positive_number(rate, "rate")
+    if burst is not None:
+        burst = _positive_number(burst, "burst")
+    get_rate_limiter(provider, api_key).configure(rate=rate, burst=burst)
+
+
+def validate_rate_limits(rate_limits):
+    """
+    Valida o parâmetro 'rate_limits' de uma requisição, ex.: {"etherscan": {"rate": 10, "burst": 10}}.
+    Retorna {provedor: {"rate": ..., "burst": ...}} com os valores limitados a CLIENT_RATE_LIMIT_BOUNDS;
+    levanta ValueError para provedores sem chave de API, valores não numéricos ou não positivos.
+    """
+    if not rate_limits:
+        return {}
+    if not isinstance(rate_limits, dict):
+        raise ValueError("rate_limits deve ser um objeto {provedor: {\"rate\": ..., \"burst\": ...}}.")
+    validated = {}
+    for provider, config in rate_limits.items():
+        if provider not in PROVIDER_API_KEY_NAMES:
+            raise ValueError(f"rate_limits: provedor inválido '{provider}' (use {', '.join(PROVIDER_API_KEY_NAMES)}).")
+        if not isinstance(config, dict):
+            raise ValueError(f"rate_limits.{provider} deve ser um objeto com 'rate' e/ou 'burst'.")
+        limits = {}
+        if config.get("rate") is not None:
+            limits["rate"] = min(
+                _positive_number(config["rate"], f"rate_limits.{provider}.rate"), CLIENT_RATE_LIMIT_BOUNDS["max_rate"]
+            )
+        if config.get("burst") is not None:
+            limits["burst"] = min(
+                _positive_number(config["burst"], f"rate_limits.{provider}.burst"), CLIENT_RATE_LIMIT_BOUNDS["max_burst"]
+            )
+        if limits:
+            validated[provider] = limits
+    return validated
+
+
+def _is_rate_limit_message(data):
+    """Detecta a resposta de limite de taxa da Etherscan (status "0", "Max rate limit reached")."""
+    message = f"{data.get('message', '')} {data.get('result', '')}".lower()
+    return "rate limit" in message
+
+
+def _url_action(url):
+    """Nome curto do endpoint REST para métricas (ex.: 'address', 'accounts', 'transactions')."""
+    path = url.split("?", 1)[0].rstrip("/")
+    if path.endswith("/transactions"):
+        return "transactions"
+    if "/v1/accounts/" in path:
+        return "accounts"
+    if "/address/" in path:
+        return "address"
+    return "other"
+
+
+def _guess_provider(url):
+    if "trongrid.io" in url:
+        return "trongrid"
+    if "etherscan.io" in url:
+        return "etherscan"
+    if "blockstream.info" in url:
+        return "blockstream"
+    return None
+
+
+# --- Sessões HTTP com Pool de Conexões (keep-alive) ---
+# Timeouts separados: conexão (TCP+TLS) e leitura da resposta
+HTTP_CONFIG = {
+    "connect_timeout": 5,
+    "read_timeout": 15,
+    # Conexões mantidas abertas por host; deve cobrir os workers do provedor no scan_engine
+    "pool_maxsize": {
+        "blockstream": 8,
+        "etherscan": 8,
+        "trongrid": 8,
+        "evm_rpc": 8,
+    },
+    "default_pool_maxsize": 4,
+    # HTTP/2 só é usado se habilitado e se o httpx com suporte a h2 estiver instalado
+    "http2": os.environ.get("FENIX_HTTP2", "0") == "1",
+}
+
+try:
+    import httpx
+    import h2  # noqa: F401 (necessário para httpx.Client(http2=True))
+    HTTP2_AVAILABLE = True
+except ImportError:
+    httpx = None
+    HTTP2_AVAILABLE = False
+
+_http_sessions = {}
+_http_sessions_lock = threading.Lock()
+
+
+def _create_http_session(provider):
+    pool_maxsize = HTTP_CONFIG["pool_maxsize"].get(provider, HTTP_CONFIG["default_pool_maxsize"])
+
+    if HTTP_CONFIG["http2"] and HTTP2_AVAILABLE:
+        return httpx.Client(
+            http2=True,
+            limits=httpx.Limits(max_connections=pool_maxsize, max_keepalive_connections=pool_maxsize),
+            timeout=httpx.Timeout(HTTP_CONFIG["read_timeout"], connect=HTTP_CONFIG["connect_timeout"])
+        )
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize, pool_block=False)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_http_session(provider):
+    """Retorna a sessão HTTP compartilhada (keep-alive, pool de conexões) do provedor."""
+    with _http_sessions_lock:
+        session = _http_sessions.get(provider)
+        if session is None:
+            session = _create_http_session(provider)
+            _http_sessions[provider] = session
+        return session
+
+
+def close_http_sessions():
+    """Fecha todas as sessões HTTP abertas (ex.: ao encerrar o processo ou em testes)."""
+    with _http_sessions_lock:
+        for session in _http_sessions.values():
+            session.close()
+        _http_sessions.clear()
+
+
+def _http_get(provider, url, params=None, headers=None):
+    """
+    GET usando a sessão do provedor. Erros do httpx são convertidos nas exceções
+    equivalentes do requests, para que _fetch_data trate ambos os clientes igualmente.
+    """
+    session = get_http_session(provider)
+    if httpx is not None and isinstance(session, httpx.Client):
+        try:
+            response = session.get(url, params=params, headers=headers)
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(str(e))
+        except httpx.TransportError as e:
+            raise requests.exceptions.ConnectionError(str(e))
+        except httpx.HTTPError as e:
+            raise requests.exceptions.RequestException(str(e))
+        return response
+
+    return session.get(
+        url, params=params, headers=headers,
+        timeout=(HTTP_CONFIG["connect_timeout"], HTTP_CONFIG["read_timeout"])
+    )
+
+
+def _http_post(provider, url, json_body, headers=None):
+    """POST com corpo JSON usando a sessão do provedor (mesma conversão de erros de _http_get)."""
+    session = get_http_session(provider)
+    if httpx is not None and isinstance(session, httpx.Client):
+        try:
+            response = session.post(url, json=json_body, headers=headers)
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(str(e))
+        except httpx.TransportError as e:
+            raise requests.exceptions.ConnectionError(str(e))
+        except httpx.HTTPError as e:
+            raise requests.exceptions.RequestException(str(e))
+        return response
+
+    return session.post(
+        url, json=json_body, headers=headers,
+        timeout=(HTTP_CONFIG["connect_timeout"], HTTP_CONFIG["read_timeout"])
+    )
+
+
+def _raise_for_status(response, url):
+    """Equivalente a response.raise_for_status(), válido para respostas do requests e do httpx."""
+    if response.status_code >= 400:
+        raise requests.exceptions.HTTPError(f"{response.status_code} Error for url: {url}", response=response)
+
+
 # --- Função Auxiliar para Requisições HTTP ---
-def _fetch_data(url, params=None, api_key=None, headers=None):
+def _fetch_data(url, params=None, api_key=None, headers=None, provider=None, backend=None):
+    """
+    GET com limite de taxa, métricas e tratamento de erros das APIs.
+    backend (utils.providers.ProviderBackend): recebe a latência da requisição HTTP (sem a espera
+    no token bucket) e se ela falhou, para o roteamento e o circuit breaker. Só contam como falha do
+    backend os erros de transporte (timeout, conexão, resposta que não é JSON) e os status
+    temporários (429, 5xx; ver is_retryable_status); 4xx e erros da API (ex.: chave inválida,
+    NOTOK) são respostas válidas do servidor.
+    Erros temporários (ver utils.retry_policy) voltam com "retryable": True, e o Retry-After em
+    "retry_after" quando o servidor o envia; os demais são fatais.
+    """
     if params is None:
         params = {}
+    if provider is None:
+        provider = _guess_provider(url)
     
     # Adiciona a chave de API como parâmetro 'apikey' para Etherscan-like APIs (V1 e V2)
     # Garante que a api_key é uma string e remove espaços em branco
@@ -69,52 +455,145 @@ def _fetch_data(url, params=None, api_key=None, headers=None):
         params["apikey"] = api_key.strip() # A chave é passada no parâmetro 'apikey'
     
     # TronGrid API key (no header)
-    if api_key and isinstance(api_key, str) and api_key.strip() and "trongrid.io" in url:
+    if api_key and isinstance(api_key, str) and api_key.strip() and provider == "trongrid":
         headers = headers if headers is not None else {}
         headers["TRON-PRO-API-KEY"] = api_key.strip()
     
+    backend_name = backend.name if backend is not None else provider
+    limiter = get_rate_limiter(provider, api_key, backend_name)
+    wait_started = time.perf_counter()
+    limiter.acquire()
+    record_time(RATE_LIMIT_WAIT_SECONDS, time.perf_counter() - wait_started, "rate_limit_wait", provider=backend_name)
+
+    # Métrica por provedor, ação (ex.: txlist, balancemulti, accounts) e classe de status (2xx, 4xx, timeout...)
+    action = params.get("action") or _url_action(url)
+    status = "error"
+    failed = True
+    request_started = time.perf_counter()
     try:
-        response = requests.get(url, params=params, headers=headers, timeout=15)
-        response.raise_for_status() # Levanta um HTTPError para 4xx/5xx responses
+        response = _http_get(provider, url, params=params, headers=headers)
+        status = f"{response.status_code // 100}xx"
+        if response.status_code == 429: # Too Many Requests (TronGrid, Blockstream)
+            limiter.on_rate_limited()
+            record_count(RATE_LIMIT_BACKOFFS_TOTAL, "rate_limit_backoffs", provider=backend_name)
+            logger.warning(
+                "Limite de taxa (429) atingido em %s. Reduzindo taxa para %.2f req/s.", url, limiter.rate,
+                extra={"provider": backend_name}
+            )
+        _raise_for_status(response, url) # Levanta um HTTPError para 4xx/5xx responses
         
         if response.status_code == 204: # No Content
-            print(f"DEBUG: No Content (204) from API for URL: {url}")
+            failed = False
+            logger.debug("No Content (204) from API for URL: %s", url)
             return {"message": "No Content from API."} # Retorna como erro não-fatal para melhor tratamento
             
         data = response.json()
-        print(f"DEBUG: API Response for {url} - {data}")
+        failed = False
+        # Resposta completa só em DEBUG; os argumentos só são formatados se o registro for emitido
+        logger.debug("API Response for %s - %s", url, data, extra={"provider": provider, "action": action})
+
+        if isinstance(data, dict) and data.get("status") == "0" and _is_rate_limit_message(data):
+            limiter.on_rate_limited()
+            record_count(RATE_LIMIT_BACKOFFS_TOTAL, "rate_limit_backoffs", provider=backend_name)
+        else:
+            limiter.on_success()
 
         # Tratamento de respostas de API com "status": "0" (Etherscan-like V1 e V2 com mensagens de erro)
         if isinstance(data, dict) and data.get("status") == "0":
             message = data.get("message", "").lower()
             # Se for uma mensagem de "sem dados", trata como sucesso com resultado vazio/zero
             if "no transactions found" in message or "no records found" in message or "zero balance" in message or "address not found" in message:
-                print(f"DEBUG: Etherscan-like API status 0 treated as no data: {data.get('message')}")
+                logger.debug("Etherscan-like API status 0 treated as no data: %s", data.get('message'))
                 return {"status": "1", "result": "0"} # Trata como sucesso com resultado zero para saldo, ou lista vazia para tx
+            elif _is_rate_limit_message(data):
+                logger.warning("Etherscan-like API rate limit (status 0): %s", data.get('result'))
+                return retryable_error(f"Limite de taxa da API: {data.get('result') or data.get('message')}")
             else:
-                # Outras mensagens com status 0 são erros reais da API (rate limit, chave inválida)
-                print(f"WARNING: Etherscan-like API returned actual error (status 0): {data.get('message')}")
+                # Outras mensagens com status 0 são erros reais da API (ex.: chave inválida)
+                logger.warning("Etherscan-like API returned actual error (status 0): %s", data.get('message'))
                 return {"message": data.get("message", "Sem resultados ou limite de taxa excedido.")}
             
         # Tratamento de respostas TronGrid (success: false, ou sem 'data'/'total')
-        if "trongrid.io" in url and isinstance(data, dict):
+        if provider == "trongrid" and isinstance(data, dict):
             if data.get("success") is False:
-                print(f"WARNING: TronGrid API returned success: false: {data.get('message')}")
+                logger.warning("TronGrid API returned success: false: %s", data.get('message'))
                 return {"message": data.get("message", "Erro na API Tron.")}
             if "data" in data and len(data["data"]) == 0:
-                print(f"DEBUG: TronGrid API returned empty data for URL: {url}")
+                logger.debug("TronGrid API returned empty data for URL: %s", url)
                 return {"message": "Conta Tron sem dados ou inexistente."} # Retorna como aviso/sem dados
         
         return data # Retorna os dados completos se tudo deu certo
     except requests.exceptions.Timeout:
-        print(f"Erro de timeout ao conectar a {url}")
-        return {"error_fatal": "Timeout na requisição da API."} 
+        status = "timeout"
+        logger.error("Erro de timeout ao conectar a %s", url, extra={"provider": provider})
+        return retryable_error("Timeout na requisição da API.")
+    except requests.exceptions.HTTPError as e:
+        logger.error("Erro na requisição para %s: %s", url, e, extra={"provider": provider})
+        error_response = e.response
+        if error_response is not None and is_retryable_status(error_response.status_code):
+            return retryable_error(
+                f"Erro na requisição da API: {e}", parse_retry_after(error_response.headers.get("Retry-After"))
+            )
+        # 4xx (ex.: chave inválida, endereço malformado): o backend respondeu, o erro é da requisição
+        failed = error_response is None
+        return {"error_fatal": f"Erro na requisição da API: {e}"}
+    except json.JSONDecodeError:
+        # Ex.: página HTML de erro de um proxy/CDN no lugar do JSON
+        logger.error("Erro ao decodificar JSON de %s. Resposta: %s...", url, response.text[:200])
+        return retryable_error("Resposta inválida da API (não é JSON).")
+    except requests.exceptions.ConnectionError as e:
+        logger.error("Erro de conexão com %s: %s", url, e, extra={"provider": provider})
+        return retryable_error(f"Erro de conexão com a API: {e}")
     except requests.exceptions.RequestException as e:
-        print(f"Erro na requisição para {url}: {e}")
+        logger.error("Erro na requisição para %s: %s", url, e, extra={"provider": provider})
         return {"error_fatal": f"Erro na requisição da API: {e}"} 
-    except json.JSONDecodeError:
-        print(f"Erro ao decodificar JSON de {url}. Resposta: {response.text[:200]}...")
-        return {"error_fatal": "Resposta inválida da API (não é JSON)."}
+    finally:
+        request_seconds = time.perf_counter() - request_started
+        record_time(
+            API_REQUEST_SECONDS, request_seconds, f"api.{provider}",
+            provider=backend_name, action=action, status=status
+        )
+        if backend is not None:
+            if failed:
+                backend.record_failure(request_seconds)
+            else:
+                backend.record_success(request_seconds)
+
+
+def _fetch_from_provider(provider, path="", params=None, api_key=None, headers=None):
+    """
+    Faz a requisição (base_url do backend + path) no backend saudável mais rápido do provedor
+    (ver utils.providers). Se ele falhar com erro temporário (timeout, erro de conexão, 429, 5xx,
+    resposta inválida), tenta os próximos; retorna a primeira resposta sem erro temporário (erros
+    fatais como 4xx ou chave inválida seriam os mesmos em outro backend), ou a última falha.
+    Se todos falharem com erro temporário, a rodada inteira é repetida com backoff
+    (utils.retry_policy.run_with_retries).
+    A latência e o resultado de cada tentativa são registrados no backend por _fetch_data.
+    """
+    def _attempt():
+        result = {"error_fatal": f"Nenhum backend configurado para {provider}."}
+        for attempt, backend in enumerate(iter_backends(provider)):
+            if attempt:
+                record_count(BACKEND_FAILOVERS_TOTAL, provider=provider, backend=backend.name)
+                logger.warning("Tentando o backend %s após falha", backend.name, extra={"provider": provider})
+            # _fetch_data acrescenta a chave de API a params/headers; cada tentativa recebe cópias
+            result = _fetch_data(
+                f"{backend.base_url}{path}", dict(params or {}), api_key,
+                dict(headers) if headers else None, provider=provider, backend=backend
+            )
+            if not is_retryable(result):
+                return result
+        return result
+
+    return run_with_retries(provider, _attempt)
+
+
+def _error_result(data):
+    """Resultado de erro de uma consulta, mantendo a indicação de erro temporário (retryable)."""
+    error = {"error_fatal": data["error_fatal"]}
+    if data.get("retryable"):
+        error["retryable"] = True
+    return error
 
 
 # --- Funções de Consulta Específicas por Rede ---
@@ -122,8 +601,8 @@ def _fetch_data(url, params=None, api_key=None, headers=None):
 def get_btc_data(address, api_key=None):
     """Obtém saldo e histórico para Bitcoin usando Blockstream.info."""
     config = API_CONFIG["BTC"]
-    summary_url = f"{config['base_url']}/address/{address}"
-    summary_data = _fetch_data(summary_url) # api_key é passado mas Blockstream.info não usa
+    # API Esplora (Blockstream, mempool.space ou servidor próprio); a chave de API não é usada
+    summary_data = _fetch_from_provider("blockstream", f"/address/{address}")
 
     # Inicializa com 0
     balance_satoshi_received = Decimal(0)
@@ -134,11 +613,11 @@ def get_btc_data(address, api_key=None):
     has_real_balance = False # Para indicar se há saldo real (recebido - gasto > 0)
 
     if isinstance(summary_data, dict) and summary_data.get("error_fatal"):
-        print(f"Erro fatal BTC: {summary_data['error_fatal']}")
-        return {"error_fatal": summary_data["error_fatal"]}
+        logger.error("Erro fatal BTC: %s", summary_data['error_fatal'])
+        return _error_result(summary_data)
     
     if isinstance(summary_data, dict) and summary_data.get("message"):
-        print(f"Aviso BTC: {summary_data['message']}")
+        logger.warning("Aviso BTC: %s", summary_data['message'])
         return {
             "balance_crypto": Decimal(0), "balance_usd": Decimal(0),
             "has_transactions": False, "explorer_link": f"{config['explorer_link_base']}{address}",
@@ -146,7 +625,7 @@ def get_btc_data(address, api_key=None):
         }
     
     if summary_data is None: 
-        print(f"Aviso BTC: Sem dados de resumo para o endereço (pode ser novo/vazio).")
+        logger.warning("Aviso BTC: Sem dados de resumo para o endereço (pode ser novo/vazio).")
         return {
             "balance_crypto": Decimal(0), "balance_usd": Decimal(0),
             "has_transactions": False, "explorer_link": f"{config['explorer_link_base']}{address}",
@@ -181,10 +660,14 @@ def get_btc_data(address, api_key=None):
     }
 
 
-def get_evm_data(address, network, api_key=None):
-    """Obtém saldo (moeda nativa e USDT) e histórico para redes EVM usando Etherscan V2 API unificada."""
+def get_evm_data(address, network, api_key=None, native_balance_wei=None, lookup_mode=LOOKUP_MODE_FULL):
+    """
+    Obtém saldo (moeda nativa e USDT) e histórico para redes EVM usando Etherscan V2 API unificada.
+    native_balance_wei: saldo nativo já obtido em lote (balancemulti); evita a chamada 'balance'.
+    lookup_mode: com LOOKUP_MODE_PROBE, um endereço sem saldo nativo e sem transações normais
+    para depois do txlist (o resultado traz "lookup_tier": "probe").
+    """
     evm_common_config = API_CONFIG["EVM_COMMON"]
-    base_url_v2_unified = evm_common_config["base_url_v2_unified"]
     chain_id = evm_common_config["chain_ids"][network]
     usdt_contract_address = evm_common_config["usdt_contracts"][network]
 
@@ -206,13 +689,17 @@ def get_evm_data(address, network, api_key=None):
             "tag": "latest"
         }
 
-    # 1. Obter saldo da moeda nativa (Etherscan V2)
-    native_balance_params = _get_v2_params("balance")
-    native_balance_data = _fetch_data(base_url_v2_unified, params=native_balance_params, api_key=api_key)
+    # 1. Obter saldo da moeda nativa (Etherscan V2), a menos que já tenha vindo do balancemulti
+    if native_balance_wei is not None:
+        native_balance_data = {"status": "1", "result": str(native_balance_wei)}
+    else:
+        native_balance_params = _get_v2_params("balance")
+        native_balance_data = _fetch_from_provider("etherscan", params=native_balance_params, api_key=api_key)
+    native_balance_known = False
 
     if isinstance(native_balance_data, dict) and native_balance_data.get("error_fatal"):
-        print(f"Erro fatal {network} (saldo nativo V2): {native_balance_data['error_fatal']}")
-        return {"error_fatal": native_balance_data["error_fatal"]}
+        logger.error("Erro fatal %s (saldo nativo V2): %s", network, native_balance_data['error_fatal'])
+        return _error_result(native_balance_data)
     elif isinstance(native_balance_data, dict) and native_balance_data.get("status") == "1":
         balance_wei_str = native_balance_data.get("result", "0")
         try:
@@ -222,61 +709,50 @@ def get_evm_data(address, network, api_key=None):
             results["balance_usd"] += balance_native * MOCKED_PRICES_USD.get(network, MOCKED_PRICES_USD["ETH"])
             if balance_native > 0:
                 results["has_real_balance"] = True
-            print(f"DEBUG: {network} Saldo Nativo: {balance_native} (USD: {balance_native * MOCKED_PRICES_USD.get(network, MOCKED_PRICES_USD['ETH'])})")
+            native_balance_known = True
+            logger.debug("%s Saldo Nativo: %s", network, balance_native)
         except Exception as e:
-            print(f"WARNING: Erro ao converter saldo nativo para {network}: {balance_wei_str}. Erro: {e}")
+            logger.warning("Erro ao converter saldo nativo para %s: %s. Erro: %s", network, balance_wei_str, e)
     elif isinstance(native_balance_data, dict) and native_balance_data.get("message"):
-        print(f"Aviso {network} (saldo nativo V2): {native_balance_data.get('message')}")
-
-    # 2. Obter saldo de USDT (Etherscan V2)
-    if usdt_contract_address:
-        usdt_balance_params = _get_v2_params("tokenbalance")
-        usdt_balance_params["contractaddress"] = usdt_contract_address
-        usdt_balance_data = _fetch_data(base_url_v2_unified, params=usdt_balance_params, api_key=api_key)
-
-        if isinstance(usdt_balance_data, dict) and usdt_balance_data.get("error_fatal"):
-            print(f"Erro fatal {network} (saldo USDT V2): {usdt_balance_data['error_fatal']}")
-            return {"error_fatal": usdt_balance_data["error_fatal"]}
-        elif isinstance(usdt_balance_data, dict) and usdt_balance_data.get("status") == "1":
-            balance_usdt_raw_str = usdt_balance_data.get("result", "0")
-            try:
-                balance_usdt_raw = Decimal(balance_usdt_raw_str)
-                balance_usdt = balance_usdt_raw / Decimal("1e6") # USDT geralmente tem 6 decimais
-                results["balance_crypto"] += balance_usdt
-                results["balance_usd"] += balance_usdt * MOCKED_PRICES_USD["USDT"]
-                if balance_usdt > 0:
-                    results["has_real_balance"] = True
-                print(f"DEBUG: {network} Saldo USDT: {balance_usdt} (USD: {balance_usdt * MOCKED_PRICES_USD['USDT']})")
-            except Exception as e:
-                print(f"WARNING: Erro ao converter saldo USDT para {network}: {balance_usdt_raw_str}. Erro: {e}")
-        elif isinstance(usdt_balance_data, dict) and usdt_balance_data.get("message"):
-            print(f"Aviso {network} (saldo USDT V2): {usdt_balance_data.get('message', 'Sem dados de saldo USDT (endereço pode ser novo/vazio).')}")
-
+        logger.warning("Aviso %s (saldo nativo V2): %s", network, native_balance_data.get('message'))
 
-    # 3. Verificar histórico de transações (nativas e de token) (Etherscan V2)
+    # 2. Verificar histórico de transações (nativas e de token) (Etherscan V2)
     tx_params = _get_v2_params("txlist")
     tx_params["page"] = 1
     tx_params["offset"] = 1 # Apenas 1 para verificar existência
     tx_params["sort"] = "desc"
     
-    tx_list_data = _fetch_data(base_url_v2_unified, params=tx_params, api_key=api_key)
+    tx_list_data = _fetch_from_provider("etherscan", params=tx_params, api_key=api_key)
+    tx_list_empty = False
 
     if isinstance(tx_list_data, dict) and tx_list_data.get("error_fatal"):
-        print(f"Erro fatal {network} (histórico V2): {tx_list_data['error_fatal']}")
+        logger.error("Erro fatal %s (histórico V2): %s", network, tx_list_data['error_fatal'])
+        if is_retryable(tx_list_data):
+            # Sem o histórico o endereço pareceria vazio; volta para o fim da varredura
+            return _error_result(tx_list_data)
         # Not returning here, already handled balances. has_transactions will remain False if error.
     elif isinstance(tx_list_data, dict) and tx_list_data.get("status") == "1":
         if isinstance(tx_list_data.get("result"), list) and len(tx_list_data["result"]) > 0:
             results["has_transactions"] = True
-            print(f"DEBUG: {network} Encontrado histórico de transações.")
+            logger.debug("%s Encontrado histórico de transações.", network)
         elif tx_list_data.get("result") == "0" or (isinstance(tx_list_data.get("result"), str) and "no transactions found" in tx_list_data.get("message", "").lower()):
-            print(f"DEBUG: {network} Sem transações nativas encontradas (status 1, result 0 ou 'no transactions found').")
+            tx_list_empty = True
+            logger.debug("%s Sem transações nativas encontradas (status 1, result 0 ou 'no transactions found').", network)
         else:
-             print(f"DEBUG: {network} Resposta de histórico nativo inesperada: {tx_list_data}")
+             logger.debug("%s Resposta de histórico nativo inesperada: %s", network, tx_list_data)
     elif isinstance(tx_list_data, dict) and tx_list_data.get("message"):
-        print(f"Aviso {network} (histórico V2): {tx_list_data.get('message', 'Sem dados de histórico.')}")
+        logger.warning("Aviso %s (histórico V2): %s", network, tx_list_data.get('message', 'Sem dados de histórico.'))
+
+    # Modo sonda: saldo nativo zero e nenhuma transação normal (ambos confirmados, sem erro na consulta)
+    # bastam para tratar o endereço como nunca usado; tokentx e tokenbalance são pulados
+    if lookup_mode == LOOKUP_MODE_PROBE and native_balance_known and tx_list_empty and not results["has_real_balance"]:
+        results["lookup_tier"] = LOOKUP_MODE_PROBE
+        return results
     
     # Adicional: Verificar transações de token também para `has_transactions`
     # Pois um endereço pode não ter ETH mas ter USDT e transacionar USDT
+    # Também indica se vale consultar o saldo USDT: sem nenhuma transferência, o saldo é zero
+    has_usdt_history = None # None = desconhecido (erro na consulta); o saldo é consultado nesse caso
     if usdt_contract_address:
         token_tx_params = _get_v2_params("tokentx")
         token_tx_params["contractaddress"] = usdt_contract_address
@@ -284,24 +760,116 @@ def get_evm_data(address, network, api_key=None):
         token_tx_params["offset"] = 1
         token_tx_params["sort"] = "desc"
 
-        token_tx_list_data = _fetch_data(base_url_v2_unified, params=token_tx_params, api_key=api_key)
+        token_tx_list_data = _fetch_from_provider("etherscan", params=token_tx_params, api_key=api_key)
+        if is_retryable(token_tx_list_data):
+            logger.error("Erro fatal %s (histórico de token V2): %s", network, token_tx_list_data['error_fatal'])
+            return _error_result(token_tx_list_data)
         if isinstance(token_tx_list_data, dict) and token_tx_list_data.get("status") == "1":
             if isinstance(token_tx_list_data.get("result"), list) and len(token_tx_list_data["result"]) > 0:
                 results["has_transactions"] = True
-                print(f"DEBUG: {network} Encontrado histórico de transações de token.")
+                has_usdt_history = True
+                logger.debug("%s Encontrado histórico de transações de token.", network)
             elif token_tx_list_data.get("result") == "0" or (isinstance(token_tx_list_data.get("result"), str) and "no transactions found" in token_tx_list_data.get("message", "").lower()):
-                print(f"DEBUG: {network} Sem transações de token encontradas (status 1, result 0 ou 'no transactions found').")
+                has_usdt_history = False
+                logger.debug("%s Sem transações de token encontradas (status 1, result 0 ou 'no transactions found').", network)
             else:
-                 print(f"DEBUG: {network} Resposta de histórico de token inesperada: {token_tx_list_data}")
+                 logger.debug("%s Resposta de histórico de token inesperada: %s", network, token_tx_list_data)
+
+    # 3. Obter saldo de USDT (Etherscan V2), apenas se houver (ou não se souber) histórico de USDT
+    if usdt_contract_address and has_usdt_history is not False:
+        usdt_balance_params = _get_v2_params("tokenbalance")
+        usdt_balance_params["contractaddress"] = usdt_contract_address
+        usdt_balance_data = _fetch_from_provider("etherscan", params=usdt_balance_params, api_key=api_key)
 
+        if isinstance(usdt_balance_data, dict) and usdt_balance_data.get("error_fatal"):
+            logger.error("Erro fatal %s (saldo USDT V2): %s", network, usdt_balance_data['error_fatal'])
+            return _error_result(usdt_balance_data)
+        elif isinstance(usdt_balance_data, dict) and usdt_balance_data.get("status") == "1":
+            balance_usdt_raw_str = usdt_balance_data.get("result", "0")
+            try:
+                balance_usdt_raw = Decimal(balance_usdt_raw_str)
+                balance_usdt = balance_usdt_raw / Decimal("1e6") # USDT geralmente tem 6 decimais
+                results["balance_crypto"] += balance_usdt
+                results["balance_usd"] += balance_usdt * MOCKED_PRICES_USD["USDT"]
+                if balance_usdt > 0:
+                    results["has_real_balance"] = True
+                logger.debug("%s Saldo USDT: %s", network, balance_usdt)
+            except Exception as e:
+                logger.warning("Erro ao converter saldo USDT para %s: %s. Erro: %s", network, balance_usdt_raw_str, e)
+        elif isinstance(usdt_balance_data, dict) and usdt_balance_data.get("message"):
+            logger.warning(
+                "Aviso %s (saldo USDT V2): %s", network,
+                usdt_balance_data.get('message', 'Sem dados de saldo USDT (endereço pode ser novo/vazio).')
+            )
 
     return results
 
 
+# Máximo de endereços por chamada 'balancemulti' da Etherscan
+ETHERSCAN_BALANCEMULTI_MAX = 20
+
+
+def get_evm_native_balances(addresses, network, api_key=None):
+    """
+    Obtém o saldo nativo (em wei) de vários endereços EVM com a ação 'balancemulti'
+    da Etherscan V2, em chamadas de até ETHERSCAN_BALANCEMULTI_MAX endereços.
+    Retorna {endereço em minúsculas: saldo em wei (str)}; endereços cuja chamada falhou ficam de fora.
+    """
+    evm_common_config = API_CONFIG["EVM_COMMON"]
+    chain_id = evm_common_config["chain_ids"][network]
+
+    balances = {}
+    for start in range(0, len(addresses), ETHERSCAN_BALANCEMULTI_MAX):
+        chunk = addresses[start:start + ETHERSCAN_BALANCEMULTI_MAX]
+        params = {
+            "module": "account",
+            "action": "balancemulti",
+            "address": ",".join(chunk),
+            "chainid": chain_id,
+            "tag": "latest"
+        }
+        data = _fetch_from_provider("etherscan", params=params, api_key=api_key)
+
+        if isinstance(data, dict) and data.get("status") == "1" and isinstance(data.get("result"), list):
+            for entry in data["result"]:
+                if isinstance(entry, dict) and entry.get("account"):
+                    balances[entry["account"].lower()] = entry.get("balance", "0")
+        else:
+            message = data.get("error_fatal") or data.get("message") if isinstance(data, dict) else data
+            logger.warning("Aviso %s (balancemulti V2): %s. Saldo nativo será consultado por endereço.", network, message)
+    return balances
+
+
+def get_blockchain_data_batch(addresses, network, api_key=None):
+    """
+    Versão em lote de get_blockchain_data: retorna os resultados na ordem de 'addresses'.
+    Em redes EVM o saldo nativo vem de 'balancemulti' (1 chamada a cada 20 endereços) e, por endereço,
+    só ficam as verificações de histórico (e o saldo USDT quando há transferências de USDT).
+    BTC e TRX não têm consulta multi-endereço nas APIs usadas e são consultados um a um.
+    Redes com nós JSON-RPC fazem tudo em lotes (utils.evm_rpc.get_evm_data_rpc_batch).
+    """
+    if network not in EVM_NETWORKS:
+        return [get_blockchain_data(address, network, api_key) for address in addresses]
+
+    if _uses_evm_rpc(network):
+        from utils.evm_rpc import get_evm_data_rpc_batch
+        return get_evm_data_rpc_batch(addresses, network)
+
+    try:
+        native_balances = get_evm_native_balances(addresses, network, api_key)
+    except Exception as e:
+        logger.error("Erro inesperado no balancemulti para %s: %s", network, e)
+        native_balances = {}
+
+    return [
+        get_blockchain_data(address, network, api_key, native_balance_wei=native_balances.get(address.lower()))
+        for address in addresses
+    ]
+
+
 def get_trx_data(address, api_key=None):
     """Obtém saldo (TRX nativo e USDT-TRC20) e histórico para Tron usando TronGrid."""
     config = API_CONFIG["TRX"]
-    base_url = config["base_url"]
     
     results = {
         "balance_crypto": Decimal(0),
@@ -312,14 +880,13 @@ def get_trx_data(address, api_key=None):
     }
 
     # 1. Obter saldo nativo TRX e tokens (usando TronGrid API)
-    account_info_url = f"{base_url}/v1/accounts/{address}"
-    account_data = _fetch_data(account_info_url, api_key=api_key)
+    account_data = _fetch_from_provider("trongrid", f"/v1/accounts/{address}", api_key=api_key)
 
     if isinstance(account_data, dict) and account_data.get("error_fatal"):
-        print(f"Erro fatal TRX (saldo nativo/tokens): {account_data['error_fatal']}")
-        return {"error_fatal": account_data["error_fatal"]}
+        logger.error("Erro fatal TRX (saldo nativo/tokens): %s", account_data['error_fatal'])
+        return _error_result(account_data)
     elif isinstance(account_data, dict) and account_data.get("message"):
-        print(f"Aviso TRX (saldo nativo/tokens): {account_data['message']}")
+        logger.debug("Aviso TRX (saldo nativo/tokens): %s", account_data['message'])
         return results 
     
     if isinstance(account_data, dict) and "data" in account_data and len(account_data["data"]) > 0:
@@ -331,7 +898,7 @@ def get_trx_data(address, api_key=None):
         results["balance_usd"] += balance_trx * MOCKED_PRICES_USD["TRX"]
         if balance_trx > 0:
             results["has_real_balance"] = True
-        print(f"DEBUG: TRX Saldo Nativo: {balance_trx} (USD: {balance_trx * MOCKED_PRICES_USD['TRX']})")
+        logger.debug("TRX Saldo Nativo: %s", balance_trx)
         
         usdt_contract_address_trx = config.get("usdt_contract")
         if usdt_contract_address_trx and "trc20" in account_details:
@@ -343,45 +910,52 @@ def get_trx_data(address, api_key=None):
                     results["balance_usd"] += balance_usdt * MOCKED_PRICES_USD["USDT"]
                     if balance_usdt > 0:
                         results["has_real_balance"] = True
-                    print(f"DEBUG: TRX Saldo USDT: {balance_usdt} (USD: {balance_usdt * MOCKED_PRICES_USD['USDT']})")
+                    logger.debug("TRX Saldo USDT: %s", balance_usdt)
                     break
     
     # 3. Verificar histórico de transações (usando TronGrid API)
-    tx_list_url = f"{base_url}/v1/accounts/{address}/transactions"
     params_tx_list = {
         "limit": 1,
         "order_by": "block_timestamp,desc"
     }
-    tx_list_data = _fetch_data(tx_list_url, params=params_tx_list, api_key=api_key)
+    tx_list_data = _fetch_from_provider(
+        "trongrid", f"/v1/accounts/{address}/transactions", params=params_tx_list, api_key=api_key
+    )
 
     if isinstance(tx_list_data, dict) and tx_list_data.get("error_fatal"):
-        print(f"Erro fatal TRX (histórico): {tx_list_data['error_fatal']}")
-        return {"error_fatal": tx_list_data["error_fatal"]}
+        logger.error("Erro fatal TRX (histórico): %s", tx_list_data['error_fatal'])
+        return _error_result(tx_list_data)
     elif isinstance(tx_list_data, dict) and tx_list_data.get("message"):
-        print(f"Aviso TRX (histórico): {tx_list_data.get('message', 'Sem dados de transação ou erro desconhecido.')}")
+        logger.debug("Aviso TRX (histórico): %s", tx_list_data.get('message', 'Sem dados de transação ou erro desconhecido.'))
     elif isinstance(tx_list_data, dict) and "data" in tx_list_data and len(tx_list_data["data"]) > 0:
         results["has_transactions"] = True
-        print(f"DEBUG: TRX Encontrado histórico de transações.")
+        logger.debug("TRX Encontrado histórico de transações.")
 
     return results
 
 
-def get_blockchain_data(address, network, api_key=None):
+def get_blockchain_data(address, network, api_key=None, native_balance_wei=None, lookup_mode=LOOKUP_MODE_FULL):
     """
     Função principal para obter dados da blockchain, roteando para a função correta.
     Retorna saldo, histórico de transações e link para o explorador.
+    native_balance_wei: saldo nativo EVM já obtido em lote (ver get_blockchain_data_batch).
+    lookup_mode: LOOKUP_MODE_FULL ou LOOKUP_MODE_PROBE (ver LOOKUP_MODES); ignorado via JSON-RPC,
+    onde todas as verificações do endereço já vão em uma única requisição.
     """
     mapped_api_key = api_key 
 
     try:
         if network == "BTC":
             return get_btc_data(address, mapped_api_key)
-        elif network in ["ETH", "BSC", "MATIC", "BASE", "OPTIMISM", "ARBITRUM"]:
-            return get_evm_data(address, network, mapped_api_key)
+        elif network in EVM_NETWORKS and _uses_evm_rpc(network):
+            from utils.evm_rpc import get_evm_data_rpc
+            return get_evm_data_rpc(address, network)
+        elif network in EVM_NETWORKS:
+            return get_evm_data(address, network, mapped_api_key, native_balance_wei, lookup_mode)
         elif network == "TRX":
             return get_trx_data(address, mapped_api_key)
         else:
-            print(f"Aviso: Rede {network} não suportada para consulta de dados on-chain.")
+            logger.warning("Rede %s não suportada para consulta de dados on-chain.", network)
             return {
                 "balance_crypto": Decimal(0),
                 "balance_usd": Decimal(0),
@@ -390,7 +964,7 @@ def get_blockchain_data(address, network, api_key=None):
                 "error": "Rede não suportada para consulta de dados on-chain."
             }
     except Exception as e:
-        print(f"Erro inesperado ao buscar dados para {address} na rede {network}: {str(e)}")
+        logger.exception("Erro inesperado ao buscar dados para %s na rede %s: %s", address, network, e)
         return {
             "balance_crypto": Decimal(0),
             "balance_usd": Decimal(0),
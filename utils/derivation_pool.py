@@ -0,0 +1,176 @@
+import os
+import time
+import atexit
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from utils.logging_config import get_logger
+from utils.metrics import record_time, CHAIN_DERIVATION_SECONDS
+from utils.wallet_derivation import (
+    DerivationCache, EVM_NETWORKS, derive_chain_addresses, iter_derived_wallets
+)
+
+logger = get_logger("derivation_pool")
+
+# --- Derivação em Múltiplos Processos ---
+# A derivação secp256k1 é CPU-bound e segura o GIL; para intervalos grandes ela é dividida em
+# blocos (rede, conta, change, faixa de índices) derivados em paralelo por processos separados.
+DERIVATION_POOL_CONFIG = {
+    # FENIX_DERIVATION_WORKERS=0 ou 1 desativa o pool (derivação no próprio processo)
+    "workers": int(os.environ.get("FENIX_DERIVATION_WORKERS", os.cpu_count() or 1)),
+    # Abaixo deste total de endereços o custo de IPC não compensa
+    "min_addresses": int(os.environ.get("FENIX_DERIVATION_POOL_MIN", 2000)),
+    # Índices de endereço por bloco enviado a um processo
+    "chunk_size": 250,
+}
+
+# --- Lado do processo de trabalho ---
+def _derive_chunk(seed_bytes, chains, address_indices, lazy_private_keys):
+    """
+    Deriva um bloco de índices para um grupo de cadeias com o mesmo material de chave
+    (ex.: a mesma conta/change em todas as redes EVM).
+    Retorna [(posição da cadeia, carteiras, segundos)]; as métricas são registradas no processo principal.
+    O DerivationCache (seed e chaves de conta) só existe durante a tarefa: os processos do pool
+    continuam vivos entre varreduras e não guardam material de chave de uma para outra.
+    """
+    derivation_cache = DerivationCache(seed_bytes)
+    results = []
+    for chain_pos, (network, account_idx, change_type, btc_addr_type) in chains:
+        started = time.perf_counter()
+        try:
+            wallets = derive_chain_addresses(
+                derivation_cache, network, account_idx, change_type, address_indices,
+                btc_addr_type, lazy_private_keys
+            )
+        except Exception as e:
+            if btc_addr_type:
+                logger.error(
+                    "Erro ao derivar endereço(s) para BTC %s na conta %s, change %s: %s",
+                    btc_addr_type, account_idx, change_type, e
+                )
+            else:
+                logger.error(
+                    "Erro ao derivar conta %s ou endereço para %s na cadeia %s: %s",
+                    account_idx, network, change_type, e
+                )
+            wallets = []
+        results.append((chain_pos, wallets, time.perf_counter() - started))
+    return results
+
+
+# --- Lado do processo principal ---
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # forkserver evita fazer fork do processo do Flask com threads em andamento
+            methods = multiprocessing.get_all_start_methods()
+            mp_context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            _pool = ProcessPoolExecutor(max_workers=DERIVATION_POOL_CONFIG["workers"], mp_context=mp_context)
+        return _pool
+
+
+def shutdown_derivation_pool(wait=True):
+    """Encerra os processos de derivação (são recriados no próximo uso)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=wait, cancel_futures=True)
+            _pool = None
+
+
+atexit.register(shutdown_derivation_pool)
+
+
+def _use_pool(chains, address_indices):
+    return (
+        DERIVATION_POOL_CONFIG["workers"] > 1
+        and len(chains) * len(address_indices) >= DERIVATION_POOL_CONFIG["min_addresses"]
+    )
+
+
+def _key_group(chain):
+    # Redes EVM compartilham as chaves da mesma conta/change; derivá-las juntas evita repetir a conta
+    network, account_idx, change_type, btc_addr_type = chain
+    return ("EVM" if network in EVM_NETWORKS else network, account_idx, change_type, btc_addr_type)
+
+
+def _index_chunks(address_indices):
+    chunk_size = DERIVATION_POOL_CONFIG["chunk_size"]
+    return [address_indices[i:i + chunk_size] for i in range(0, len(address_indices), chunk_size)]
+
+
+def _iter_pooled(pool, seed_bytes, chains, address_indices, lazy_private_keys):
+    """Gera (posição da cadeia, número do bloco, carteiras) na ordem de iter_derived_wallets."""
+    chunks = _index_chunks(address_indices)
+
+    groups = {}
+    for chain_pos, chain in enumerate(chains):
+        groups.setdefault(_key_group(chain), []).append((chain_pos, chain))
+
+    # Tarefas submetidas na ordem em que os resultados serão consumidos
+    futures = {}
+    chain_tasks = []
+    for chain in chains:
+        group_key = _key_group(chain)
+        for chunk_no, chunk in enumerate(chunks):
+            if (group_key, chunk_no) not in futures:
+                futures[(group_key, chunk_no)] = pool.submit(
+                    _derive_chunk, seed_bytes, groups[group_key], chunk, lazy_private_keys
+                )
+        chain_tasks.append(group_key)
+
+    try:
+        # Junção determinística: cadeia a cadeia, bloco a bloco, na mesma ordem de iter_derived_wallets
+        for chain_pos, group_key in enumerate(chain_tasks):
+            network = chains[chain_pos][0]
+            for chunk_no in range(len(chunks)):
+                for result_pos, wallets, seconds in futures[(group_key, chunk_no)].result():
+                    if result_pos == chain_pos:
+                        record_time(
+                            CHAIN_DERIVATION_SECONDS, seconds, "derivation",
+                            network=network, lazy=lazy_private_keys
+                        )
+                        yield chain_pos, chunk_no, wallets
+                        break
+    finally:
+        for future in futures.values():
+            future.cancel()
+
+
+def iter_derived_wallets_parallel(derivation_cache, chains, address_indices, lazy_private_keys=False):
+    """
+    Mesmo resultado (e mesma ordem) de iter_derived_wallets, mas com a derivação distribuída
+    entre processos quando o total de endereços é grande. Caso contrário, deriva no próprio processo.
+    """
+    if not _use_pool(chains, address_indices):
+        yield from iter_derived_wallets(derivation_cache, chains, address_indices, lazy_private_keys)
+        return
+
+    address_indices = list(address_indices)
+    # Próximo bloco a gerar; se o pool cair no meio, a derivação continua dele no processo principal
+    next_chain_pos, next_chunk_no = 0, 0
+    try:
+        pool = _get_pool()
+        for chain_pos, chunk_no, wallets in _iter_pooled(
+            pool, derivation_cache.seed_bytes, chains, address_indices, lazy_private_keys
+        ):
+            next_chain_pos, next_chunk_no = chain_pos, chunk_no + 1
+            yield from wallets
+        return
+    except (BrokenProcessPool, OSError) as e:
+        logger.warning("Pool de derivação indisponível (%s). Derivando no processo principal.", e)
+        shutdown_derivation_pool(wait=False)
+
+    remaining_indices = [index for chunk in _index_chunks(address_indices)[next_chunk_no:] for index in chunk]
+    if next_chain_pos < len(chains) and remaining_indices:
+        yield from iter_derived_wallets(
+            derivation_cache, chains[next_chain_pos:next_chain_pos + 1], remaining_indices, lazy_private_keys
+        )
+    yield from iter_derived_wallets(derivation_cache, chains[next_chain_pos + 1:], address_indices, lazy_private_keys)
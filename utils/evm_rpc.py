@@ -0,0 +1,343 @@
+import os
+import time
+import requests
+from decimal import Decimal
+
+from utils.logging_config import get_logger
+from utils.metrics import record_time, API_REQUEST_SECONDS, RATE_LIMIT_WAIT_SECONDS
+from utils.providers import PROVIDER_BACKENDS, get_backends, iter_backends
+from utils.retry_policy import (
+    run_with_retries, retryable_error, is_retryable_status, parse_retry_after
+)
+from utils.blockchain_api import (
+    API_CONFIG, EVM_NETWORKS, MOCKED_PRICES_USD, get_rate_limiter, _http_post
+)
+
+logger = get_logger("evm_rpc")
+
+# --- Backend EVM via JSON-RPC (nós próprios) ---
+# Em vez de 2 a 4 chamadas REST da Etherscan por endereço e rede, um lote de endereços de uma rede
+# vai em uma única requisição HTTP (batch JSON-RPC): eth_getBalance, eth_getTransactionCount e
+# eth_call balanceOf do USDT para cada endereço. Com multicall, saldos nativos e de USDT de todo o
+# lote viram uma única eth_call ao contrato Multicall3.
+# Uma rede passa a usar JSON-RPC quando FENIX_EVM_RPC_URLS_<REDE> (ex.: FENIX_EVM_RPC_URLS_ETH) tem
+# URLs; vários nós da mesma rede têm failover e roteamento por latência (utils.providers).
+EVM_RPC_CONFIG = {
+    # Endereços por requisição (cada um gera até 3 chamadas no lote)
+    "batch_addresses": int(os.environ.get("FENIX_EVM_RPC_BATCH", 100)),
+    # Agrega eth_getBalance e balanceOf em uma eth_call ao Multicall3
+    "use_multicall": os.environ.get("FENIX_EVM_RPC_MULTICALL", "0") == "1",
+    # Multicall3 tem o mesmo endereço em todas as redes EVM suportadas
+    "multicall_address": "0xcA11bde05977b3631167028862bE2a173976CA11",
+}
+
+# Seletores (4 primeiros bytes do keccak256 da assinatura)
+SELECTOR_BALANCE_OF = "70a08231"     # balanceOf(address)
+SELECTOR_GET_ETH_BALANCE = "4d2301cc"  # getEthBalance(address), do Multicall3
+SELECTOR_AGGREGATE3 = "82ad56cb"     # aggregate3((address,bool,bytes)[])
+
+
+def rpc_provider(network):
+    """Nome do provedor (em utils.providers) dos nós JSON-RPC da rede."""
+    return f"evm_rpc_{network.lower()}"
+
+
+for _network in EVM_NETWORKS:
+    PROVIDER_BACKENDS.setdefault(rpc_provider(_network), {"env": f"FENIX_EVM_RPC_URLS_{_network}", "urls": []})
+
+
+def has_rpc_backend(network):
+    """True se a rede EVM tem nós JSON-RPC configurados (e então não usa a Etherscan)."""
+    return network in EVM_NETWORKS and bool(get_backends(rpc_provider(network)))
+
+
+# --- Codificação ABI (só o necessário para balanceOf e Multicall3) ---
+def _word(value):
+    return format(value, "064x")
+
+
+def _address_word(address):
+    return address.lower().replace("0x", "").rjust(64, "0")
+
+
+def _call_data(selector, address):
+    return "0x" + selector + _address_word(address)
+
+
+def _encode_aggregate3(calls):
+    """Codifica aggregate3 para uma lista de (contrato, calldata hex); todas com allowFailure=true."""
+    tuples = []
+    for target, data in calls:
+        payload = data[2:] if data.startswith("0x") else data
+        padded = payload.ljust((len(payload) + 63) // 64 * 64, "0")
+        # (address target, bool allowFailure, bytes callData): bytes começa após as 3 palavras da tupla
+        tuples.append(_address_word(target) + _word(1) + _word(3 * 32) + _word(len(payload) // 2) + padded)
+
+    offsets = []
+    position = len(tuples) * 32
+    for encoded in tuples:
+        offsets.append(_word(position))
+        position += len(encoded) // 2
+    return "0x" + SELECTOR_AGGREGATE3 + _word(32) + _word(len(tuples)) + "".join(offsets) + "".join(tuples)
+
+
+def _decode_aggregate3(result_hex):
+    """
+    Decodifica o retorno de aggregate3 em uma lista de (sucesso, bytes de retorno em hex).
+    Levanta ValueError se o retorno não for ABI válido (ex.: vazio, não hex ou truncado).
+    """
+    if not isinstance(result_hex, str):
+        raise ValueError(f"retorno do multicall não é hex: {str(result_hex)[:100]}")
+    data = bytes.fromhex(result_hex[2:] if result_hex.startswith("0x") else result_hex)
+
+    def _read(offset):
+        if offset + 32 > len(data):
+            raise ValueError(f"retorno do multicall truncado ({len(data)} bytes)")
+        return int.from_bytes(data[offset:offset + 32], "big")
+
+    array_start = _read(0)
+    count = _read(array_start)
+    items_start = array_start + 32
+    results = []
+    for i in range(count):
+        tuple_start = items_start + _read(items_start + i * 32)
+        success = bool(_read(tuple_start))
+        bytes_start = tuple_start + _read(tuple_start + 32)
+        length = _read(bytes_start)
+        if bytes_start + 32 + length > len(data):
+            raise ValueError(f"retorno do multicall truncado ({len(data)} bytes)")
+        results.append((success, data[bytes_start + 32:bytes_start + 32 + length].hex()))
+    return results
+
+
+def _hex_to_int(value):
+    """Quantidade hex do JSON-RPC ("0x1a"); vazio vale 0. Levanta ValueError se não for hex."""
+    if value is None or value == "" or value == "0x":
+        return 0
+    if not isinstance(value, str):
+        raise ValueError(f"valor não é hex: {str(value)[:100]}")
+    return int(value, 16)
+
+
+# --- Transporte ---
+def _post_batch(network, calls):
+    """
+    Envia as chamadas [(método, params), ...] em uma requisição batch ao nó mais rápido e saudável
+    da rede, com failover entre os nós e novas tentativas com backoff (utils.retry_policy).
+    Retorna uma lista alinhada com calls, com o resultado de cada chamada ou um dicionário
+    {"error": ...}; se todos os nós falharem, um dicionário {"error_fatal": ...} (com "retryable"
+    para erros temporários).
+    """
+    payload = [
+        {"jsonrpc": "2.0", "id": call_id, "method": method, "params": params}
+        for call_id, (method, params) in enumerate(calls)
+    ]
+    return run_with_retries("evm_rpc", lambda: _post_batch_once(network, calls, payload))
+
+
+def _post_batch_once(network, calls, payload):
+    """Uma rodada de _post_batch: tenta cada nó da rede uma vez."""
+    last_error = {"error_fatal": f"Nenhum nó JSON-RPC configurado para {network}."}
+    for attempt, backend in enumerate(iter_backends(rpc_provider(network))):
+        if attempt:
+            logger.warning("Tentando o nó %s após falha", backend.name, extra={"network": network})
+        limiter = get_rate_limiter("evm_rpc", None, backend.name)
+        wait_started = time.perf_counter()
+        limiter.acquire()
+        record_time(RATE_LIMIT_WAIT_SECONDS, time.perf_counter() - wait_started, "rate_limit_wait", provider=backend.name)
+
+        status = "error"
+        failed = True
+        started = time.perf_counter()
+        try:
+            response = _http_post("evm_rpc", backend.base_url, payload)
+            status = f"{response.status_code // 100}xx"
+            if response.status_code >= 400:
+                raise requests.exceptions.HTTPError(
+                    f"{response.status_code} Error for url: {backend.base_url}", response=response
+                )
+            data = response.json()
+            if not isinstance(data, list):
+                # Erro do lote inteiro (ex.: lote grande demais para o nó)
+                raise ValueError(f"Resposta batch inválida: {str(data)[:200]}")
+            failed = False
+        except requests.exceptions.Timeout:
+            status = "timeout"
+            last_error = retryable_error(f"Timeout no nó JSON-RPC {backend.name}.")
+            logger.error("Timeout no nó JSON-RPC %s", backend.name, extra={"network": network})
+            continue
+        except requests.exceptions.HTTPError as e:
+            message = f"Erro no nó JSON-RPC {backend.name}: {e}"
+            logger.error("Erro no nó JSON-RPC %s: %s", backend.name, e, extra={"network": network})
+            if is_retryable_status(e.response.status_code):
+                last_error = retryable_error(message, parse_retry_after(e.response.headers.get("Retry-After")))
+                continue
+            # 4xx: o nó respondeu; o erro é do lote e se repetiria nos outros nós
+            failed = False
+            return {"error_fatal": message}
+        except (requests.exceptions.ConnectionError, ValueError) as e:
+            # Conexão recusada/interrompida ou resposta inválida (não é JSON ou não é um lote)
+            last_error = retryable_error(f"Erro no nó JSON-RPC {backend.name}: {e}")
+            logger.error("Erro no nó JSON-RPC %s: %s", backend.name, e, extra={"network": network})
+            continue
+        except requests.exceptions.RequestException as e:
+            last_error = {"error_fatal": f"Erro no nó JSON-RPC {backend.name}: {e}"}
+            logger.error("Erro no nó JSON-RPC %s: %s", backend.name, e, extra={"network": network})
+            continue
+        finally:
+            request_seconds = time.perf_counter() - started
+            record_time(
+                API_REQUEST_SECONDS, request_seconds, "api.evm_rpc",
+                provider=backend.name, action="rpc_batch", status=status
+            )
+            if failed:
+                backend.record_failure(request_seconds)
+            else:
+                backend.record_success(request_seconds)
+
+        by_id = {item.get("id"): item for item in data if isinstance(item, dict)}
+        results = []
+        for call_id in range(len(calls)):
+            item = by_id.get(call_id)
+            if item is None:
+                results.append({"error": "Chamada sem resposta no lote."})
+            elif "error" in item:
+                error = item["error"]
+                results.append({"error": error.get("message") if isinstance(error, dict) else str(error)})
+            else:
+                results.append(item.get("result"))
+        return results
+
+    return last_error
+
+
+def _is_error(result):
+    return isinstance(result, dict) and "error" in result
+
+
+# --- Consulta ---
+def get_evm_data_rpc_batch(addresses, network):
+    """
+    Versão JSON-RPC de get_evm_data para vários endereços da mesma rede, em requisições de até
+    EVM_RPC_CONFIG["batch_addresses"] endereços. Retorna, na ordem de addresses, dicionários no mesmo
+    formato de get_evm_data. has_transactions vem do nonce (eth_getTransactionCount): só transações
+    enviadas contam; endereços que só receberam aparecem pelo saldo.
+    """
+    evm_common_config = API_CONFIG["EVM_COMMON"]
+    usdt_contract_address = evm_common_config["usdt_contracts"].get(network)
+    batch_addresses = max(1, EVM_RPC_CONFIG["batch_addresses"])
+
+    results = []
+    for start in range(0, len(addresses), batch_addresses):
+        chunk = addresses[start:start + batch_addresses]
+        results.extend(_get_chunk(chunk, network, usdt_contract_address))
+    return results
+
+
+def _get_chunk(addresses, network, usdt_contract_address):
+    multicall = EVM_RPC_CONFIG["use_multicall"]
+    calls = [("eth_getTransactionCount", [address, "latest"]) for address in addresses]
+    if multicall:
+        aggregated = [(EVM_RPC_CONFIG["multicall_address"], _call_data(SELECTOR_GET_ETH_BALANCE, address)) for address in addresses]
+        if usdt_contract_address:
+            aggregated += [(usdt_contract_address, _call_data(SELECTOR_BALANCE_OF, address)) for address in addresses]
+        calls.append(("eth_call", [{"to": EVM_RPC_CONFIG["multicall_address"], "data": _encode_aggregate3(aggregated)}, "latest"]))
+    else:
+        calls += [("eth_getBalance", [address, "latest"]) for address in addresses]
+        if usdt_contract_address:
+            calls += [
+                ("eth_call", [{"to": usdt_contract_address, "data": _call_data(SELECTOR_BALANCE_OF, address)}, "latest"])
+                for address in addresses
+            ]
+
+    responses = _post_batch(network, calls)
+    if isinstance(responses, dict):
+        # Todos os nós falharam: o erro (temporário ou não) vale para todo o lote
+        return [dict(responses) for _ in addresses]
+    if not isinstance(responses, list) or len(responses) != len(calls):
+        return _chunk_error(
+            addresses, network,
+            f"lote com {len(responses) if isinstance(responses, list) else 0} respostas para {len(calls)} chamadas"
+        )
+    count = len(addresses)
+    nonces = responses[:count]
+    if multicall:
+        aggregate = responses[count]
+        if _is_error(aggregate):
+            return [{"error_fatal": f"Erro no multicall: {aggregate['error']}"} for _ in addresses]
+        try:
+            # "0x" ou null: o contrato Multicall3 não existe no endereço configurado nesta rede
+            decoded = _decode_aggregate3(aggregate) if aggregate not in (None, "0x") else []
+        except ValueError as e:
+            return _chunk_error(addresses, network, e)
+        expected = 2 * count if usdt_contract_address else count
+        if len(decoded) != expected:
+            return _chunk_error(addresses, network, f"multicall com {len(decoded)} resultados para {expected} chamadas")
+        native_balances = [value if ok else {"error": "getEthBalance falhou"} for ok, value in decoded[:count]]
+        usdt_balances = [value if ok else {"error": "balanceOf falhou"} for ok, value in decoded[count:]]
+    else:
+        native_balances = responses[count:2 * count]
+        usdt_balances = responses[2 * count:]
+
+    return [
+        _build_result(
+            address, network, nonces[i], native_balances[i],
+            usdt_balances[i] if usdt_contract_address else None
+        )
+        for i, address in enumerate(addresses)
+    ]
+
+
+def _chunk_error(addresses, network, reason):
+    """Resposta malformada do nó para o lote inteiro: um error_fatal por endereço."""
+    logger.error("Resposta inválida do nó JSON-RPC (%s): %s", network, reason)
+    return [{"error_fatal": f"Resposta inválida do nó JSON-RPC: {reason}"} for _ in addresses]
+
+
+def _build_result(address, network, nonce, native_balance, usdt_balance):
+    """Monta o resultado no formato de get_evm_data; valores que não são hex viram error_fatal."""
+    try:
+        return _build_result_unchecked(address, network, nonce, native_balance, usdt_balance)
+    except ValueError as e:
+        logger.error("Resposta inválida do nó JSON-RPC (%s, %s): %s", network, address, e)
+        return {"error_fatal": f"Resposta inválida do nó JSON-RPC: {e}"}
+
+
+def _build_result_unchecked(address, network, nonce, native_balance, usdt_balance):
+    for name, value in (("nonce", nonce), ("saldo nativo", native_balance)):
+        if _is_error(value):
+            logger.error("Erro fatal %s (%s JSON-RPC): %s", network, name, value["error"])
+            return {"error_fatal": f"Erro no nó JSON-RPC ({name}): {value['error']}"}
+
+    results = {
+        "balance_crypto": Decimal(0),
+        "balance_usd": Decimal(0),
+        "has_transactions": _hex_to_int(nonce) > 0,
+        "explorer_link": f"{API_CONFIG['EVM_COMMON']['explorer_link_base'][network]}{address}",
+        "has_real_balance": False
+    }
+
+    balance_native = Decimal(_hex_to_int(native_balance)) / Decimal("1e18")
+    results["balance_crypto"] += balance_native
+    results["balance_usd"] += balance_native * MOCKED_PRICES_USD.get(network, MOCKED_PRICES_USD["ETH"])
+    if balance_native > 0:
+        results["has_real_balance"] = True
+
+    if _is_error(usdt_balance):
+        logger.warning("Aviso %s (saldo USDT JSON-RPC): %s", network, usdt_balance["error"])
+    elif usdt_balance is not None:
+        # Mesma conversão da consulta pela Etherscan (6 casas decimais)
+        balance_usdt = Decimal(_hex_to_int(usdt_balance)) / Decimal("1e6")
+        results["balance_crypto"] += balance_usdt
+        results["balance_usd"] += balance_usdt * MOCKED_PRICES_USD["USDT"]
+        if balance_usdt > 0:
+            results["has_real_balance"] = True
+            # Quem tem saldo de token recebeu uma transferência, mesmo sem nonce
+            results["has_transactions"] = True
+    logger.debug("%s JSON-RPC %s: %s", network, address, results)
+    return results
+
+
+def get_evm_data_rpc(address, network):
+    """get_evm_data via JSON-RPC para um único endereço."""
+    return get_evm_data_rpc_batch([address], network)[0]
@@ -0,0 +1,231 @@
+import os
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.logging_config import get_logger
+from utils.scan_engine import ScanProgress
+
+logger = get_logger("jobs")
+
+# --- Fila de Varreduras em Segundo Plano ---
+# Uma varredura enviada como job roda fora da thread da requisição HTTP; o cliente recebe um ID
+# e acompanha o progresso (polling ou streaming) ou cancela o job.
+# O estado fica só em memória: nada do job (muito menos a seed) é gravado em disco.
+JOB_CONFIG = {
+    # Varreduras simultâneas (jobs grandes)
+    "max_workers": int(os.environ.get("FENIX_JOB_WORKERS", 2)),
+    # Pool separado para jobs pequenos, para que não fiquem atrás de varreduras longas
+    "small_job_workers": int(os.environ.get("FENIX_SMALL_JOB_WORKERS", 1)),
+    # Jobs com até este número estimado de endereços vão para o pool de jobs pequenos
+    "small_job_max_addresses": 500,
+    # Jobs ainda não finalizados (na fila ou rodando) aceitos ao mesmo tempo
+    "max_active_jobs": int(os.environ.get("FENIX_MAX_ACTIVE_JOBS", 50)),
+    # Tempo que um job finalizado continua disponível para consulta
+    "ttl_seconds": int(os.environ.get("FENIX_JOB_TTL", 60 * 60)),
+    # Limite de carteiras derivadas guardadas por job (só com include_all_wallets, para "Exportar Todos")
+    "max_wallets_kept": 100000,
+}
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_ERROR = "error"
+JOB_CANCELLED = "cancelled"
+FINISHED_STATES = (JOB_DONE, JOB_ERROR, JOB_CANCELLED)
+
+
+class JobQueueFullError(Exception):
+    """Há jobs ativos demais; o cliente deve tentar de novo mais tarde."""
+
+
+class ScanJob:
+    """Estado de uma varredura em segundo plano: status, progresso e resultados parciais."""
+
+    def __init__(self, params, estimated_addresses=None):
+        self.id = uuid.uuid4().hex
+        # Parâmetros da varredura; seed e passphrase são removidos assim que o job começa
+        self.params = params
+        self.estimated_addresses = estimated_addresses
+        self.status = JOB_QUEUED
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.progress = ScanProgress()
+        # cancel_event também é acionado pela própria varredura ao terminar; cancel_requested indica o pedido do cliente
+        self.cancel_event = threading.Event()
+        self.cancel_requested = False
+        self.results = []
+        # Carteiras derivadas (com chave privada, fora do modo lazy) só ficam no job se o cliente pediu a lista
+        self.keep_wallets = bool(params.get("include_all_wallets"))
+        self.wallets = []
+        self.wallets_truncated = False
+        self.timings = None
+        self._changed = threading.Condition()
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATES
+
+    def add(self, wallet_info, result_item=None):
+        """
+        Registra o item de resultado de uma carteira com saldo/histórico e, se o job guarda a lista
+        completa (include_all_wallets), a própria carteira.
+        """
+        with self._changed:
+            if result_item is not None:
+                self.results.append(result_item)
+            if self.keep_wallets and len(self.wallets) < JOB_CONFIG["max_wallets_kept"]:
+                self.wallets.append(wallet_info)
+            elif self.keep_wallets:
+                self.wallets_truncated = True
+            self._changed.notify_all()
+
+    def set_status(self, status, error=None):
+        with self._changed:
+            self.status = status
+            self.error = error
+            if status == JOB_RUNNING:
+                self.started_at = time.time()
+            elif status in FINISHED_STATES:
+                self.finished_at = time.time()
+            self._changed.notify_all()
+
+    def wait_for_update(self, results_seen, wallets_seen, timeout, wallets_batch=1):
+        """
+        Espera até haver novos resultados, pelo menos wallets_batch novas carteiras,
+        o job terminar ou o timeout expirar.
+        """
+        with self._changed:
+            self._changed.wait_for(
+                lambda: (
+                    self.finished
+                    or len(self.results) > results_seen
+                    or len(self.wallets) >= wallets_seen + wallets_batch
+                ),
+                timeout=timeout
+            )
+
+    def snapshot(self, results_from=0, wallets_from=None, wallets_limit=None):
+        """
+        Estado atual do job para a API. results_from: devolve só os resultados a partir desse índice.
+        wallets_from: se informado, inclui as carteiras derivadas a partir desse índice
+        (no máximo wallets_limit, se informado).
+        """
+        with self._changed:
+            data = {
+                "job_id": self.id,
+                "status": self.status,
+                "error": self.error,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "progress": self.progress.to_dict(),
+                "results_total": len(self.results),
+                "results_from": results_from,
+                "results": self.results[results_from:],
+                "wallets_total": len(self.wallets),
+                "wallets_truncated": self.wallets_truncated,
+                "timings": self.timings,
+            }
+            if wallets_from is not None:
+                wallets_from = max(0, wallets_from)
+                wallets_end = wallets_from + max(0, wallets_limit) if wallets_limit is not None else None
+                data["wallets_from"] = wallets_from
+                data["wallets"] = self.wallets[wallets_from:wallets_end]
+        return data
+
+
+class JobManager:
+    """
+    Executa ScanJobs em pools de threads limitados (um para jobs pequenos, outro para os grandes)
+    e remove os jobs finalizados após JOB_CONFIG["ttl_seconds"].
+    """
+
+    def __init__(self, max_workers=None, small_job_workers=None):
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, max_workers or JOB_CONFIG["max_workers"]), thread_name_prefix="scan-job"
+        )
+        self._small_executor = ThreadPoolExecutor(
+            max_workers=max(1, small_job_workers or JOB_CONFIG["small_job_workers"]),
+            thread_name_prefix="scan-job-small"
+        )
+
+    def _prune(self):
+        now = time.time()
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job.finished and now - job.finished_at > JOB_CONFIG["ttl_seconds"]
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+    def submit(self, run, params, estimated_addresses=None):
+        """
+        Enfileira um job; run(job) executa a varredura e registra os resultados com job.add().
+        Levanta JobQueueFullError se já houver JOB_CONFIG["max_active_jobs"] jobs ativos.
+        """
+        self._prune()
+        job = ScanJob(params, estimated_addresses)
+        with self._lock:
+            active = sum(1 for existing in self._jobs.values() if not existing.finished)
+            if active >= JOB_CONFIG["max_active_jobs"]:
+                raise JobQueueFullError("Muitas varreduras em andamento. Tente novamente em instantes.")
+            self._jobs[job.id] = job
+
+        small = estimated_addresses is not None and estimated_addresses <= JOB_CONFIG["small_job_max_addresses"]
+        executor = self._small_executor if small else self._executor
+        executor.submit(self._run, run, job)
+        logger.info("Job %s enfileirado", job.id, extra={"estimated_addresses": estimated_addresses, "small": small})
+        return job
+
+    def _run(self, run, job):
+        if job.cancel_requested:
+            job.params = None
+            job.set_status(JOB_CANCELLED)
+            return
+
+        job.set_status(JOB_RUNNING)
+        try:
+            run(job)
+        except Exception as e:
+            logger.exception("Erro inesperado no job %s: %s", job.id, e)
+            job.set_status(JOB_ERROR, "Ocorreu um erro inesperado no servidor")
+        else:
+            job.set_status(JOB_CANCELLED if job.cancel_requested else JOB_DONE)
+        finally:
+            job.params = None
+
+    def get(self, job_id):
+        self._prune()
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Sinaliza o cancelamento; o job para na próxima verificação. Retorna o job ou None."""
+        job = self.get(job_id)
+        if job is not None and not job.finished:
+            job.cancel_requested = True
+            job.cancel_event.set()
+            if job.status == JOB_QUEUED:
+                job.params = None
+                job.set_status(JOB_CANCELLED)
+        return job
+
+
+_job_manager = None
+_job_manager_lock = threading.Lock()
+
+
+def get_job_manager():
+    """Retorna o JobManager compartilhado do processo."""
+    global _job_manager
+    with _job_manager_lock:
+        if _job_manager is None:
+            _job_manager = JobManager()
+        return _job_manager
@@ -0,0 +1,105 @@
+import os
+import sys
+import json
+import random
+import logging
+import threading
+
+# --- Logging Estruturado ---
+# Todos os módulos registram em loggers "fenix.<módulo>". Mensagens usam formatação preguiçosa
+# (logger.debug("... %s", valor)): com o nível acima de DEBUG, payloads grandes (ex.: respostas
+# completas das APIs) nem chegam a ser formatados.
+LOGGING_CONFIG = {
+    # DEBUG, INFO, WARNING, ERROR
+    "level": os.environ.get("FENIX_LOG_LEVEL", "INFO").upper(),
+    # "text" (legível) ou "json" (uma linha JSON por registro, para pipelines de logs)
+    "format": os.environ.get("FENIX_LOG_FORMAT", "text").lower(),
+    # Fração dos registros DEBUG mantidos (ex.: 0.01 = 1%); WARNING e acima nunca são amostrados
+    "debug_sample_rate": float(os.environ.get("FENIX_LOG_DEBUG_SAMPLE_RATE", 1.0)),
+}
+
+ROOT_LOGGER_NAME = "fenix"
+
+# Atributos padrão de LogRecord; o que não estiver aqui veio de extra={...} e vira campo estruturado
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_configured = False
+_configure_lock = threading.Lock()
+
+
+def get_logger(name):
+    """Logger do módulo, dentro da hierarquia 'fenix' (ex.: get_logger('blockchain_api'))."""
+    return logging.getLogger(f"{ROOT_LOGGER_NAME}.{name}")
+
+
+def _record_fields(record):
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRS}
+
+
+class SamplingFilter(logging.Filter):
+    """Mantém só uma fração dos registros DEBUG."""
+
+    def __init__(self, debug_sample_rate):
+        super().__init__()
+        self.debug_sample_rate = debug_sample_rate
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG or self.debug_sample_rate >= 1:
+            return True
+        return random.random() < self.debug_sample_rate
+
+
+class TextFormatter(logging.Formatter):
+    """Formato legível; campos estruturados (extra) são anexados como chave=valor."""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record):
+        line = super().format(record)
+        fields = _record_fields(record)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    """Uma linha JSON por registro, com os campos estruturados (extra) no mesmo objeto."""
+
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            **_record_fields(record),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def configure_logging(level=None, log_format=None, debug_sample_rate=None):
+    """
+    Configura o logger 'fenix' (uma única vez por processo; chamadas seguintes são ignoradas).
+    Os parâmetros sobrepõem LOGGING_CONFIG.
+    """
+    global _configured
+    with _configure_lock:
+        if _configured:
+            return
+        _configured = True
+
+    level = (level or LOGGING_CONFIG["level"]).upper()
+    log_format = log_format or LOGGING_CONFIG["format"]
+    if debug_sample_rate is None:
+        debug_sample_rate = LOGGING_CONFIG["debug_sample_rate"]
+
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter() if log_format == "json" else TextFormatter())
+    handler.addFilter(SamplingFilter(debug_sample_rate))
+
+    root = logging.getLogger(ROOT_LOGGER_NAME)
+    root.setLevel(getattr(logging, level, logging.INFO))
+    root.addHandler(handler)
+    root.propagate = False
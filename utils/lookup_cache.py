@@ -0,0 +1,184 @@
+import os
+import json
+import time
+import sqlite3
+import tempfile
+import threading
+from decimal import Decimal
+
+from utils.logging_config import get_logger
+
+logger = get_logger("lookup_cache")
+
+# --- Cache Persistente de Consultas On-chain ---
+# Guarda o resultado de get_blockchain_data por (rede, endereço) em um arquivo SQLite local,
+# para que uma nova varredura (ex.: intervalo de índices ampliado) só consulte endereços novos.
+# Nunca armazena chaves privadas, seeds ou caminhos de derivação: só os campos de CACHEABLE_FIELDS.
+CACHE_CONFIG = {
+    # FENIX_LOOKUP_CACHE=off desativa o cache; FENIX_LOOKUP_CACHE_PATH define o arquivo
+    "enabled": os.environ.get("FENIX_LOOKUP_CACHE", "on").lower() not in ("0", "off", "false", "no"),
+    "path": os.environ.get(
+        "FENIX_LOOKUP_CACHE_PATH",
+        os.path.join(tempfile.gettempdir(), "fenix_lookup_cache.sqlite3")
+    ),
+    # Endereços com saldo/histórico mudam com mais frequência que endereços nunca usados
+    "ttl_used_seconds": int(os.environ.get("FENIX_LOOKUP_CACHE_TTL_USED", 15 * 60)),
+    "ttl_empty_seconds": int(os.environ.get("FENIX_LOOKUP_CACHE_TTL_EMPTY", 6 * 60 * 60)),
+    # Limite de entradas; as menos acessadas recentemente (LRU) são removidas
+    "max_entries": int(os.environ.get("FENIX_LOOKUP_CACHE_MAX_ENTRIES", 200000)),
+}
+
+# Campos do resultado de get_blockchain_data que podem ser armazenados
+CACHEABLE_FIELDS = (
+    "balance_crypto",
+    "balance_usd",
+    "has_transactions",
+    "has_real_balance",
+    "explorer_link",
+    "balance_satoshi",
+    # "probe" quando o resultado veio só da sonda (LOOKUP_MODE_PROBE); o modo completo o ignora
+    "lookup_tier",
+)
+
+# A poda por tamanho roda a cada N gravações, não a cada gravação
+_PRUNE_EVERY = 500
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return {"__decimal__": str(value)}
+    raise TypeError(f"Tipo não serializável no cache: {type(value).__name__}")
+
+
+def _json_object_hook(obj):
+    if "__decimal__" in obj and len(obj) == 1:
+        return Decimal(obj["__decimal__"])
+    return obj
+
+
+class LookupCache:
+    """
+    Cache SQLite (modo WAL) com TTL separado para endereços usados e vazios e limite LRU.
+    Cada thread usa sua própria conexão.
+    """
+
+    def __init__(self, path, ttl_used_seconds, ttl_empty_seconds, max_entries):
+        self.path = path
+        self.ttl_used_seconds = ttl_used_seconds
+        self.ttl_empty_seconds = ttl_empty_seconds
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+        self._init_schema()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS lookups ("
+            " network TEXT NOT NULL,"
+            " address TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " used INTEGER NOT NULL,"
+            " stored_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL,"
+            " PRIMARY KEY (network, address))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS lookups_accessed_at ON lookups (accessed_at)")
+
+    def get(self, network, address):
+        """Retorna o resultado armazenado, ou None se não houver ou se o TTL tiver expirado."""
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT payload, used, stored_at FROM lookups WHERE network = ? AND address = ?",
+            (network, address)
+        ).fetchone()
+        if row is None:
+            return None
+
+        payload, used, stored_at = row
+        ttl = self.ttl_used_seconds if used else self.ttl_empty_seconds
+        now = time.time()
+        if now - stored_at > ttl:
+            conn.execute("DELETE FROM lookups WHERE network = ? AND address = ?", (network, address))
+            return None
+
+        conn.execute(
+            "UPDATE lookups SET accessed_at = ? WHERE network = ? AND address = ?",
+            (now, network, address)
+        )
+        return json.loads(payload, object_hook=_json_object_hook)
+
+    def put(self, network, address, blockchain_data):
+        """Armazena um resultado bem-sucedido. Resultados com erro não são armazenados."""
+        if not isinstance(blockchain_data, dict) or blockchain_data.get("error_fatal") or blockchain_data.get("error"):
+            return
+
+        payload = {field: blockchain_data[field] for field in CACHEABLE_FIELDS if field in blockchain_data}
+        used = 1 if (payload.get("has_transactions") or payload.get("has_real_balance")) else 0
+        now = time.time()
+        self._connection().execute(
+            "INSERT OR REPLACE INTO lookups (network, address, payload, used, stored_at, accessed_at)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (network, address, json.dumps(payload, default=_json_default), used, now, now)
+        )
+
+        with self._writes_lock:
+            self._writes += 1
+            should_prune = self._writes % _PRUNE_EVERY == 0
+        if should_prune:
+            self.prune()
+
+    def prune(self):
+        """Remove entradas expiradas e, acima de max_entries, as menos acessadas recentemente."""
+        conn = self._connection()
+        now = time.time()
+        conn.execute(
+            "DELETE FROM lookups WHERE (used = 1 AND stored_at < ?) OR (used = 0 AND stored_at < ?)",
+            (now - self.ttl_used_seconds, now - self.ttl_empty_seconds)
+        )
+        (count,) = conn.execute("SELECT COUNT(*) FROM lookups").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            conn.execute(
+                "DELETE FROM lookups WHERE rowid IN"
+                " (SELECT rowid FROM lookups ORDER BY accessed_at LIMIT ?)",
+                (excess,)
+            )
+
+    def clear(self):
+        self._connection().execute("DELETE FROM lookups")
+
+
+_lookup_cache = None
+_lookup_cache_lock = threading.Lock()
+
+
+def get_lookup_cache():
+    """Retorna o cache compartilhado do processo, ou None se estiver desativado ou indisponível."""
+    global _lookup_cache
+    if not CACHE_CONFIG["enabled"]:
+        return None
+    with _lookup_cache_lock:
+        if _lookup_cache is None:
+            try:
+                _lookup_cache = LookupCache(
+                    CACHE_CONFIG["path"],
+                    CACHE_CONFIG["ttl_used_seconds"],
+                    CACHE_CONFIG["ttl_empty_seconds"],
+                    CACHE_CONFIG["max_entries"]
+                )
+            except sqlite3.Error as e:
+                logger.warning("Cache de consultas desativado (%s): %s", CACHE_CONFIG['path'], e)
+                CACHE_CONFIG["enabled"] = False
+                return None
+        return _lookup_cache
@@ -0,0 +1,240 @@
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# --- Métricas de Desempenho (formato de texto do Prometheus) ---
+# Contadores e histogramas em memória, por processo, expostos na rota /metrics.
+# Além dos totais do processo, cada requisição pode acumular um resumo próprio (RequestTimings),
+# devolvido na resposta JSON, para saber se uma varredura lenta é derivação (CPU) ou latência de API.
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames, labelvalues, extra=()):
+    pairs = list(zip(labelnames, labelvalues)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    """Contador monotônico com rótulos (labels)."""
+
+    metric_type = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values]
+
+
+class Histogram(Counter):
+    """Histograma de durações (segundos) com buckets cumulativos, soma e contagem."""
+
+    metric_type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["buckets"][i] += 1
+            state["sum"] += value
+            state["count"] += 1
+
+    def render(self):
+        with self._lock:
+            values = sorted(
+                ((key, dict(state, buckets=list(state["buckets"]))) for key, state in self._values.items()),
+                key=lambda item: item[0]
+            )
+        lines = []
+        for key, state in values:
+            for bound, count in zip(self.buckets, state["buckets"]):
+                labels = _format_labels(self.labelnames, key, [("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', '+Inf')])} {state['count']}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {state['sum']!r}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {state['count']}")
+        return lines
+
+
+_METRICS = []
+
+
+def _register(metric):
+    _METRICS.append(metric)
+    return metric
+
+
+# --- Métricas do Processo ---
+SEED_GENERATION_SECONDS = _register(Histogram(
+    "fenix_seed_generation_seconds", "Tempo de Bip39SeedGenerator.Generate (PBKDF2)."
+))
+CHAIN_DERIVATION_SECONDS = _register(Histogram(
+    "fenix_chain_derivation_seconds", "Tempo de derivação de uma cadeia (ou bloco de índices).",
+    ("network", "lazy")
+))
+API_REQUEST_SECONDS = _register(Histogram(
+    "fenix_api_request_seconds", "Duração das requisições HTTP às APIs, por provedor, ação e classe de status.",
+    ("provider", "action", "status")
+))
+RATE_LIMIT_WAIT_SECONDS = _register(Histogram(
+    "fenix_rate_limit_wait_seconds", "Espera no token bucket antes de cada requisição.", ("provider",)
+))
+RATE_LIMIT_BACKOFFS_TOTAL = _register(Counter(
+    "fenix_rate_limit_backoffs_total", "Respostas de limite de taxa que reduziram a taxa do provedor.",
+    ("provider",)
+))
+BACKEND_FAILOVERS_TOTAL = _register(Counter(
+    "fenix_backend_failovers_total", "Requisições repetidas em outro backend após falha, por provedor e backend.",
+    ("provider", "backend")
+))
+CIRCUIT_BREAKER_TRANSITIONS_TOTAL = _register(Counter(
+    "fenix_circuit_breaker_transitions_total", "Mudanças de estado do circuit breaker dos backends.",
+    ("backend", "state")
+))
+API_RETRIES_TOTAL = _register(Counter(
+    "fenix_api_retries_total", "Novas tentativas após erros temporários, por provedor.", ("provider",)
+))
+RETRY_BUDGET_EXHAUSTED_TOTAL = _register(Counter(
+    "fenix_retry_budget_exhausted_total", "Erros temporários sem nova tentativa por falta de orçamento.",
+    ("provider",)
+))
+LOOKUP_REQUEUED_TOTAL = _register(Counter(
+    "fenix_lookup_requeued_total", "Endereços consultados de novo no fim da varredura após erro temporário.",
+    ("network",)
+))
+SEED_CACHE_TOTAL = _register(Counter(
+    "fenix_seed_cache_total", "Consultas ao cache de sementes BIP39 em memória, por resultado (hit/miss).",
+    ("result",)
+))
+LOOKUP_CACHE_TOTAL = _register(Counter(
+    "fenix_lookup_cache_total", "Consultas ao cache local de endereços, por resultado (hit/miss).", ("result",)
+))
+PRESCREEN_TOTAL = _register(Counter(
+    "fenix_prescreen_total",
+    "Endereços verificados no pré-filtro offline, por rede e resultado (hit: vai para a API; miss: não usado).",
+    ("network", "result")
+))
+HTTP_REQUEST_SECONDS = _register(Histogram(
+    "fenix_http_request_seconds", "Tempo total das requisições da aplicação, por rota.", ("route", "status")
+))
+
+
+def render_metrics():
+    """Retorna todas as métricas no formato de texto do Prometheus (versão 0.0.4)."""
+    lines = []
+    for metric in _METRICS:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.metric_type}")
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# --- Resumo de Tempos por Requisição ---
+class RequestTimings:
+    """
+    Tempos e contadores acumulados durante uma requisição.
+    Os tempos de consultas em paralelo são somados, então podem passar do tempo total.
+    """
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self._timings = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def add_time(self, key, seconds):
+        with self._lock:
+            entry = self._timings.setdefault(key, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+
+    def inc(self, key, amount=1):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def summary(self):
+        with self._lock:
+            timings = {
+                key: {"count": count, "seconds": round(seconds, 4)}
+                for key, (count, seconds) in sorted(self._timings.items())
+            }
+            counters = dict(sorted(self._counters.items()))
+        return {
+            "total_seconds": round(time.perf_counter() - self.started_at, 4),
+            "timings": timings,
+            "counters": counters
+        }
+
+
+_request_timings = contextvars.ContextVar("fenix_request_timings", default=None)
+
+
+def start_request_timings(timings=None):
+    """Associa um RequestTimings (novo ou o informado) ao contexto atual e o retorna."""
+    if timings is None:
+        timings = RequestTimings()
+    _request_timings.set(timings)
+    return timings
+
+
+def current_request_timings():
+    return _request_timings.get()
+
+
+def record_time(histogram, seconds, summary_key=None, **labels):
+    """Registra uma duração no histograma e, se houver requisição em andamento, no resumo dela."""
+    histogram.observe(seconds, **labels)
+    timings = _request_timings.get()
+    if summary_key and timings is not None:
+        timings.add_time(summary_key, seconds)
+
+
+def record_count(counter, summary_key=None, amount=1, **labels):
+    """Incrementa o contador e, se houver requisição em andamento, o contador do resumo."""
+    counter.inc(amount, **labels)
+    timings = _request_timings.get()
+    if summary_key and timings is not None:
+        timings.inc(summary_key, amount)
+
+
+@contextmanager
+def timed(histogram, summary_key=None, **labels):
+    """Mede a duração do bloco com record_time."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_time(histogram, time.perf_counter() - started, summary_key, **labels)
@@ -0,0 +1,266 @@
+import os
+import sys
+import math
+import mmap
+import time
+import bisect
+import struct
+import hashlib
+import argparse
+import threading
+from array import array
+
+from utils.logging_config import get_logger
+
+logger = get_logger("prescreen")
+
+# --- Pré-filtro Offline de Endereços Usados ---
+# Um índice local, montado a partir de um export de endereços que já apareceram on-chain (ex.:
+# snapshot de um indexador próprio), decide antes da consulta remota se um endereço derivado pode
+# ter sido usado. Só os endereços presentes no índice vão para as APIs; os ausentes são reportados
+# como não usados sem I/O de rede (scan_engine). Cada índice declara as redes que cobre: endereços
+# de outras redes seguem para a consulta normal.
+# Os índices são arquivos binários abertos com mmap (somente leitura, compartilhados entre processos):
+# - filtro de Bloom: tamanho fixo por endereço (~1,8 byte com 0,1% de falsos positivos);
+# - índice ordenado: hashes de 8 bytes ordenados, busca binária, falsos positivos desprezíveis.
+# Nenhum dos dois tem falsos negativos; o limite é o próprio export (endereços usados depois do
+# snapshot passam como não usados).
+PRESCREEN_CONFIG = {
+    # Arquivos de índice, separados por vírgula (gerados com "python -m utils.prescreen build")
+    "paths": [
+        path.strip() for path in os.environ.get("FENIX_PRESCREEN_INDEX", "").split(",") if path.strip()
+    ],
+}
+
+FORMAT_BLOOM = "bloom"
+FORMAT_SORTED = "sorted"
+PRESCREEN_FORMATS = (FORMAT_BLOOM, FORMAT_SORTED)
+
+_MAGIC = {FORMAT_BLOOM: b"FXPSBLM1", FORMAT_SORTED: b"FXPSIDX1"}
+_FORMAT_BY_MAGIC = {magic: index_format for index_format, magic in _MAGIC.items()}
+# Cabeçalho de 128 bytes: magic, nº de hashes (Bloom), reservado, bits (Bloom) ou entradas
+# (ordenado), endereços no export, criação (epoch) e redes cobertas (ASCII, separadas por vírgula)
+_HEADER = struct.Struct("<8sIIQQQ88s")
+_PERSON = b"fenix-prescreen"
+
+
+def normalize_address(address):
+    """Forma canônica do endereço no índice: EVM e bech32 não diferenciam maiúsculas."""
+    address = address.strip()
+    prefix = address[:4].lower()
+    if prefix.startswith("0x") or prefix.startswith(("bc1", "tb1", "bcrt")):
+        return address.lower()
+    return address
+
+
+def address_digest(address):
+    """Hash de 16 bytes do endereço normalizado (base dos dois formatos de índice)."""
+    return hashlib.blake2b(normalize_address(address).encode("utf-8"), digest_size=16, person=_PERSON).digest()
+
+
+def _bloom_bits(digest, hash_count, bit_count):
+    # Hash duplo (Kirsch-Mitzenmacher): k posições a partir de dois valores de 64 bits
+    h1 = int.from_bytes(digest[:8], "little")
+    h2 = int.from_bytes(digest[8:], "little") | 1
+    return [(h1 + i * h2) % bit_count for i in range(hash_count)]
+
+
+class _LittleEndianWords:
+    """Sequência de uint64 little-endian sobre um buffer, para bisect em máquinas big-endian."""
+
+    def __init__(self, buffer, count):
+        self._buffer = buffer
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, position):
+        return struct.unpack_from("<Q", self._buffer, position * 8)[0]
+
+
+class PrescreenIndex:
+    """Um arquivo de índice aberto com mmap."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as index_file:
+            self._mmap = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, hash_count, _, size, address_count, created_at, networks = _HEADER.unpack_from(self._mmap)
+        except struct.error as e:
+            self._mmap.close()
+            raise ValueError(f"Índice de pré-filtro inválido: {path}") from e
+        self.format = _FORMAT_BY_MAGIC.get(magic)
+        if self.format is None:
+            self._mmap.close()
+            raise ValueError(f"Índice de pré-filtro inválido: {path}")
+        self.hash_count = hash_count
+        self.address_count = address_count
+        self.created_at = created_at
+        self.networks = frozenset(part for part in networks.rstrip(b"\x00").decode("ascii").split(",") if part)
+
+        body = memoryview(self._mmap)[_HEADER.size:]
+        if self.format == FORMAT_BLOOM:
+            self.bit_count = size
+            self._bits = body
+        elif sys.byteorder == "little":
+            self._words = body[:size * 8].cast("Q")
+        else:
+            self._words = _LittleEndianWords(body, size)
+
+    def __contains__(self, address):
+        digest = address_digest(address)
+        if self.format == FORMAT_BLOOM:
+            bits = self._bits
+            return all(bits[bit >> 3] & (1 << (bit & 7)) for bit in _bloom_bits(digest, self.hash_count, self.bit_count))
+        key = int.from_bytes(digest[:8], "little")
+        words = self._words
+        position = bisect.bisect_left(words, key)
+        return position < len(words) and words[position] == key
+
+    def to_dict(self):
+        return {
+            "path": self.path,
+            "format": self.format,
+            "networks": sorted(self.networks),
+            "addresses": self.address_count,
+            "created_at": self.created_at,
+        }
+
+
+class Prescreen:
+    """Conjunto de índices; responde, por rede, se um endereço pode ter sido usado."""
+
+    def __init__(self, indexes):
+        self.indexes = indexes
+
+    def covers(self, network):
+        return any(network in index.networks for index in self.indexes)
+
+    def maybe_used(self, network, address):
+        """
+        True se algum índice da rede contém o endereço (vale a consulta remota), False se nenhum
+        contém, None se nenhum índice cobre a rede.
+        """
+        covering = [index for index in self.indexes if network in index.networks]
+        if not covering:
+            return None
+        return any(address in index for index in covering)
+
+
+_prescreen = None
+_prescreen_loaded = False
+_prescreen_lock = threading.Lock()
+
+
+def get_prescreen():
+    """Retorna o pré-filtro com os índices de PRESCREEN_CONFIG["paths"], ou None se não houver índices."""
+    global _prescreen, _prescreen_loaded
+    with _prescreen_lock:
+        if not _prescreen_loaded:
+            indexes = []
+            for path in PRESCREEN_CONFIG["paths"]:
+                try:
+                    index = PrescreenIndex(path)
+                except (OSError, ValueError) as e:
+                    logger.error("Índice de pré-filtro ignorado (%s): %s", path, e)
+                    continue
+                logger.info(
+                    "Índice de pré-filtro carregado: %s (%s, %d endereços, redes %s)",
+                    path, index.format, index.address_count, ",".join(sorted(index.networks))
+                )
+                indexes.append(index)
+            _prescreen = Prescreen(indexes) if indexes else None
+            _prescreen_loaded = True
+        return _prescreen
+
+
+# --- Geração dos Índices ---
+
+def iter_export_addresses(path):
+    """Endereços de um export: um por linha (primeiro campo, se houver vírgula); '#' inicia comentário."""
+    with open(path, "r", encoding="utf-8") as export_file:
+        for line in export_file:
+            address = line.split("#", 1)[0].split(",", 1)[0].strip()
+            if address:
+                yield address
+
+
+def _write_index(output_path, header, body):
+    temp_path = f"{output_path}.tmp"
+    with open(temp_path, "wb") as output_file:
+        output_file.write(header)
+        output_file.write(body)
+    os.replace(temp_path, output_path)
+
+
+def _networks_field(networks):
+    field = ",".join(networks).encode("ascii")
+    if not networks or len(field) > 88:
+        raise ValueError("Informe de 1 a 88 caracteres de redes (ex.: ETH,BSC).")
+    return field
+
+
+def build_bloom_index(addresses, output_path, networks, false_positive_rate=0.001):
+    """Grava um filtro de Bloom com os endereços; retorna o número de endereços (com repetições)."""
+    addresses = list(addresses)
+    count = max(1, len(addresses))
+    bit_count = max(64, math.ceil(-count * math.log(false_positive_rate) / math.log(2) ** 2))
+    bit_count += -bit_count % 64
+    hash_count = max(1, round(bit_count / count * math.log(2)))
+    bits = bytearray(bit_count // 8)
+    for address in addresses:
+        for bit in _bloom_bits(address_digest(address), hash_count, bit_count):
+            bits[bit >> 3] |= 1 << (bit & 7)
+    header = _HEADER.pack(
+        _MAGIC[FORMAT_BLOOM], hash_count, 0, bit_count, len(addresses), int(time.time()), _networks_field(networks)
+    )
+    _write_index(output_path, header, bits)
+    return len(addresses)
+
+
+def build_sorted_index(addresses, output_path, networks):
+    """Grava o índice ordenado (hashes de 8 bytes, sem repetições); retorna o número de endereços."""
+    keys = sorted({int.from_bytes(address_digest(address)[:8], "little") for address in addresses})
+    words = array("Q", keys)
+    if sys.byteorder != "little":
+        words.byteswap()
+    header = _HEADER.pack(
+        _MAGIC[FORMAT_SORTED], 0, 0, len(keys), len(keys), int(time.time()), _networks_field(networks)
+    )
+    _write_index(output_path, header, words.tobytes())
+    return len(keys)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Índices do pré-filtro offline de endereços usados do Fênix.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Gera um índice a partir de um export de endereços (um por linha)")
+    build.add_argument("export", help="Arquivo de texto com os endereços usados")
+    build.add_argument("output", help="Arquivo de índice a gerar")
+    build.add_argument("--networks", required=True,
+                       help="Redes cobertas pelo export, separadas por vírgula (ex.: ETH,BSC,MATIC)")
+    build.add_argument("--format", choices=PRESCREEN_FORMATS, default=FORMAT_SORTED)
+    build.add_argument("--false-positive-rate", type=float, default=0.001, help="Só para --format bloom")
+
+    info = commands.add_parser("info", help="Mostra o cabeçalho de um índice")
+    info.add_argument("index")
+    args = parser.parse_args(argv)
+
+    if args.command == "info":
+        print(PrescreenIndex(args.index).to_dict())
+        return
+
+    networks = [network.strip().upper() for network in args.networks.split(",") if network.strip()]
+    addresses = iter_export_addresses(args.export)
+    if args.format == FORMAT_BLOOM:
+        total = build_bloom_index(addresses, args.output, networks, args.false_positive_rate)
+    else:
+        total = build_sorted_index(addresses, args.output, networks)
+    print(f"{total} endereços gravados em {args.output} ({args.format}, redes {','.join(networks)})")
+
+
+if __name__ == "__main__":
+    main()
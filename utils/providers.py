@@ -0,0 +1,224 @@
+import os
+import time
+import threading
+import urllib.parse
+
+from utils.logging_config import get_logger
+from utils.metrics import record_count, CIRCUIT_BREAKER_TRANSITIONS_TOTAL
+
+logger = get_logger("providers")
+
+# --- Backends por Provedor (Failover e Roteamento por Latência) ---
+# Cada provedor lógico (o formato de API usado por blockchain_api) pode ter vários servidores:
+# instâncias Esplora (inclusive auto-hospedadas) para BTC, endpoints compatíveis com a Etherscan V2
+# para EVM e servidores compatíveis com a API v1 da TronGrid para TRX.
+# Cada requisição vai para o backend saudável mais rápido; se ele falhar (erro de transporte, 429 ou
+# 5xx), os próximos são tentados. Respostas 4xx e erros da própria API (ex.: chave inválida) não
+# contam como falha do backend nem trocam de backend.
+# A TronGrid só tem a API v1 como backend: um full node TRON (/wallet/getaccount) tem outro formato
+# de resposta e não entra na lista de alternativas.
+# As variáveis FENIX_*_URLS (URLs separadas por vírgula) substituem a lista padrão, na ordem dada.
+# A lista padrão só tem o servidor oficial de cada API: outros servidores (ex.: mempool.space, que
+# também implementa a API Esplora) recebem os endereços consultados e entram só se configurados.
+PROVIDER_BACKENDS = {
+    "blockstream": {
+        "env": "FENIX_ESPLORA_URLS",
+        "urls": ["https://blockstream.info/api"],
+    },
+    "etherscan": {
+        "env": "FENIX_ETHERSCAN_URLS",
+        "urls": ["https://api.etherscan.io/v2/api"],
+    },
+    "trongrid": {
+        "env": "FENIX_TRONGRID_URLS",
+        "urls": ["https://api.trongrid.io"],
+    },
+}
+
+BACKEND_CONFIG = {
+    # Peso da última medição na média móvel exponencial de latência e de erros
+    "ewma_alpha": 0.2,
+    # Falhas seguidas que abrem o circuito do backend
+    "failure_threshold": 5,
+    # Taxa de erros (média móvel) que também abre o circuito, depois de min_samples requisições
+    "error_rate_threshold": 0.5,
+    "min_samples": 10,
+    # Tempo com o circuito aberto antes de uma requisição de teste (half-open)
+    "cooldown_seconds": float(os.environ.get("FENIX_BACKEND_COOLDOWN", 30)),
+    # Backend sem requisições há mais que isso volta a ser testado (a latência medida pode ter mudado)
+    "recheck_seconds": 60.0,
+}
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+
+def _backend_name(provider, url, position):
+    # O primeiro backend leva o nome do provedor: limites de taxa e métricas existentes continuam valendo
+    if position == 0:
+        return provider
+    return urllib.parse.urlparse(url).netloc or f"{provider}-{position}"
+
+
+class ProviderBackend:
+    """Um servidor de um provedor, com latência e taxa de erros recentes e circuit breaker."""
+
+    def __init__(self, provider, name, base_url, position=0):
+        self.provider = provider
+        self.name = name
+        self.base_url = base_url.rstrip("/")
+        self.position = position
+        self.latency_ewma = None
+        self.error_ewma = 0.0
+        self.samples = 0
+        self.observed_at = None
+        self.consecutive_failures = 0
+        self.state = CIRCUIT_CLOSED
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def _set_state(self, state):
+        if state == self.state:
+            return
+        self.state = state
+        record_count(CIRCUIT_BREAKER_TRANSITIONS_TOTAL, backend=self.name, state=state)
+        if state == CIRCUIT_OPEN:
+            self.opened_at = time.monotonic()
+            logger.warning(
+                "Circuito aberto para o backend %s (%s)", self.name, self.base_url,
+                extra={"provider": self.provider, "error_rate": round(self.error_ewma, 3)}
+            )
+        elif state == CIRCUIT_CLOSED:
+            logger.info("Backend %s recuperado", self.name, extra={"provider": self.provider})
+
+    def try_acquire(self, force=False):
+        """
+        Indica se o backend pode receber a requisição agora. Com o circuito aberto, só depois do
+        cooldown, e então uma única requisição de teste por vez (half-open). force ignora o cooldown.
+        """
+        with self._lock:
+            if self.state == CIRCUIT_CLOSED:
+                return True
+            if self.state == CIRCUIT_OPEN:
+                if not force and time.monotonic() - self.opened_at < BACKEND_CONFIG["cooldown_seconds"]:
+                    return False
+                self._set_state(CIRCUIT_HALF_OPEN)
+            if self._trial_in_flight and not force:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def _observe(self, seconds, failed):
+        alpha = BACKEND_CONFIG["ewma_alpha"]
+        self.samples += 1
+        self.observed_at = time.monotonic()
+        self.latency_ewma = seconds if self.latency_ewma is None else alpha * seconds + (1 - alpha) * self.latency_ewma
+        self.error_ewma = alpha * (1.0 if failed else 0.0) + (1 - alpha) * self.error_ewma
+
+    def record_success(self, seconds):
+        with self._lock:
+            self._observe(seconds, False)
+            self.consecutive_failures = 0
+            self._trial_in_flight = False
+            self._set_state(CIRCUIT_CLOSED)
+
+    def record_failure(self, seconds):
+        with self._lock:
+            self._observe(seconds, True)
+            self.consecutive_failures += 1
+            self._trial_in_flight = False
+            if (
+                self.state == CIRCUIT_HALF_OPEN
+                or self.consecutive_failures >= BACKEND_CONFIG["failure_threshold"]
+                or (
+                    self.samples >= BACKEND_CONFIG["min_samples"]
+                    and self.error_ewma >= BACKEND_CONFIG["error_rate_threshold"]
+                )
+            ):
+                self._set_state(CIRCUIT_OPEN)
+
+    def score(self):
+        """
+        Menor é melhor: latência média penalizada pela taxa de erros. Sem medições (ou com medições
+        antigas, ver recheck_seconds) vale 0, para que o backend seja testado.
+        """
+        if self.observed_at is None or time.monotonic() - self.observed_at > BACKEND_CONFIG["recheck_seconds"]:
+            return 0.0
+        return self.latency_ewma * (1 + 4 * self.error_ewma)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "provider": self.provider,
+                "name": self.name,
+                "base_url": self.base_url,
+                "state": self.state,
+                "latency_ewma_ms": round(self.latency_ewma * 1000, 1) if self.latency_ewma is not None else None,
+                "error_rate": round(self.error_ewma, 3),
+                "samples": self.samples,
+            }
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def _default_urls(provider):
+    config = PROVIDER_BACKENDS[provider]
+    from_env = os.environ.get(config["env"], "")
+    urls = [url.strip() for url in from_env.split(",") if url.strip()]
+    return urls or list(config["urls"])
+
+
+def configure_backends(provider, base_urls):
+    """
+    Substitui os backends de um provedor (ex.: servidores auto-hospedados ou simulados em testes).
+    Retorna as URLs anteriores, para restaurar depois.
+    """
+    backends = [
+        ProviderBackend(provider, _backend_name(provider, url, position), url, position)
+        for position, url in enumerate(base_urls)
+    ]
+    with _backends_lock:
+        previous = [backend.base_url for backend in _backends.get(provider, [])] or _default_urls(provider)
+        _backends[provider] = backends
+    return previous
+
+
+def get_backends(provider):
+    """Backends configurados para o provedor, na ordem de preferência inicial."""
+    with _backends_lock:
+        backends = _backends.get(provider)
+        if backends is None:
+            backends = _backends[provider] = [
+                ProviderBackend(provider, _backend_name(provider, url, position), url, position)
+                for position, url in enumerate(_default_urls(provider))
+            ]
+        return list(backends)
+
+
+def iter_backends(provider):
+    """
+    Gera os backends a tentar para uma requisição: os disponíveis, do mais rápido ao mais lento.
+    Se todos estiverem com o circuito aberto, tenta o que está aberto há mais tempo.
+    Quem chama deve registrar o resultado (record_success/record_failure) de cada backend gerado.
+    """
+    backends = get_backends(provider)
+    yielded = False
+    for backend in sorted(backends, key=lambda item: (item.score(), item.position)):
+        if backend.try_acquire():
+            yielded = True
+            yield backend
+    if not yielded and backends:
+        oldest = min(backends, key=lambda item: item.opened_at or 0)
+        oldest.try_acquire(force=True)
+        yield oldest
+
+
+def backends_status():
+    """Estado de todos os backends já usados (para diagnóstico)."""
+    with _backends_lock:
+        backends = [backend for provider_backends in _backends.values() for backend in provider_backends]
+    return [backend.to_dict() for backend in backends]
@@ -0,0 +1,194 @@
+import os
+import time
+import random
+import threading
+import email.utils
+import contextlib
+
+from utils.logging_config import get_logger
+from utils.metrics import record_count, API_RETRIES_TOTAL, RETRY_BUDGET_EXHAUSTED_TOTAL
+
+logger = get_logger("retry_policy")
+
+# --- Novas Tentativas com Backoff Exponencial e Jitter ---
+# Erros temporários (timeout, erro de conexão, 429, 5xx, "Max rate limit reached" da Etherscan,
+# resposta que não é JSON) voltam marcados com "retryable": True e são tentados de novo após um
+# backoff exponencial com jitter (ou o Retry-After do servidor, se maior). Os demais são fatais.
+# Cada provedor tem um orçamento de novas tentativas: com o provedor fora do ar, as novas tentativas
+# não multiplicam a carga; os endereços que ainda falharem voltam para o fim da varredura (scan_engine).
+RETRY_CONFIG = {
+    # Tentativas por requisição, contando a primeira (cada tentativa já passa por todos os backends)
+    "max_attempts": int(os.environ.get("FENIX_RETRY_ATTEMPTS", 3)),
+    # Backoff da n-ésima nova tentativa: aleatório entre 0 e min(max_delay, base_delay * 2^n)
+    "base_delay": 0.5,
+    "max_delay": 8.0,
+    # Retry-After acima disso não é esperado na thread da consulta: o endereço volta no fim da varredura
+    "max_retry_after": 30.0,
+    # Rodadas extras, no fim da varredura, para os endereços que terminaram com erro temporário
+    "requeue_passes": int(os.environ.get("FENIX_RETRY_REQUEUE_PASSES", 2)),
+    # Pausa antes de cada rodada extra (o provedor costuma precisar de alguns segundos)
+    "requeue_delay": float(os.environ.get("FENIX_RETRY_REQUEUE_DELAY", 2.0)),
+}
+
+# --- Orçamento de Novas Tentativas por Provedor ---
+# ratio: fração das requisições que pode virar nova tentativa; min_per_second: novas tentativas
+# garantidas mesmo com pouco tráfego; max_balance: acúmulo máximo do orçamento
+RETRY_BUDGET_CONFIG = {
+    "etherscan": {"ratio": 0.2, "min_per_second": 1.0, "max_balance": 20},
+}
+
+DEFAULT_RETRY_BUDGET = {"ratio": 0.2, "min_per_second": 1.0, "max_balance": 20}
+
+
+class RetryBudget:
+    """
+    Orçamento thread-safe de novas tentativas: cada requisição original deposita ratio,
+    cada nova tentativa consome 1, e min_per_second é reposto com o tempo.
+    """
+
+    def __init__(self, ratio, min_per_second, max_balance):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_balance = max_balance
+        self._balance = float(max_balance)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._balance = min(self.max_balance, self._balance + (now - self._updated) * self.min_per_second)
+        self._updated = now
+
+    def deposit(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            self._balance = min(self.max_balance, self._balance + self.ratio)
+
+    def try_withdraw(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._balance < 1:
+                return False
+            self._balance -= 1
+            return True
+
+
+_retry_budgets = {}
+_retry_budgets_lock = threading.Lock()
+
+
+def get_retry_budget(provider):
+    """Retorna o orçamento de novas tentativas do provedor."""
+    with _retry_budgets_lock:
+        budget = _retry_budgets.get(provider)
+        if budget is None:
+            config = RETRY_BUDGET_CONFIG.get(provider, DEFAULT_RETRY_BUDGET)
+            budget = RetryBudget(config["ratio"], config["min_per_second"], config["max_balance"])
+            _retry_budgets[provider] = budget
+        return budget
+
+
+def is_retryable_status(status_code):
+    """Status HTTP temporários: 408, 425, 429 e 5xx."""
+    return status_code in (408, 425, 429) or status_code >= 500
+
+
+def parse_retry_after(value):
+    """Converte o cabeçalho Retry-After (segundos ou data HTTP) em segundos; None se ausente/inválido."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+def retryable_error(message, retry_after=None):
+    """Resultado de erro temporário, no formato {"error_fatal": ...} das funções de consulta."""
+    error = {"error_fatal": message, "retryable": True}
+    if retry_after is not None:
+        error["retry_after"] = retry_after
+    return error
+
+
+def is_retryable(result):
+    """Indica se o resultado é um erro temporário (que vale tentar de novo)."""
+    return isinstance(result, dict) and bool(result.get("error_fatal")) and bool(result.get("retryable"))
+
+
+def backoff_delay(retry_number, retry_after=None):
+    """Espera antes da nova tentativa retry_number (0, 1, ...): full jitter, nunca menor que Retry-After."""
+    delay = random.uniform(0, min(RETRY_CONFIG["max_delay"], RETRY_CONFIG["base_delay"] * 2 ** retry_number))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+
+# Vaga de provedor (semáforo de scan_engine._provider_slot) ocupada pela thread atual, se houver
+_slot_state = threading.local()
+
+
+@contextlib.contextmanager
+def holding_slot(slot):
+    """
+    Ocupa a vaga (semáforo) durante o bloco e a registra na thread, para que o backoff de
+    run_with_retries a devolva enquanto espera: outras consultas do provedor seguem no intervalo.
+    """
+    slot.acquire()
+    previous = getattr(_slot_state, "slot", None)
+    _slot_state.slot = slot
+    try:
+        yield
+    finally:
+        _slot_state.slot = previous
+        slot.release()
+
+
+def _sleep_without_slot(delay):
+    """Espera delay segundos sem ocupar a vaga de provedor da thread (retomada antes de voltar)."""
+    slot = getattr(_slot_state, "slot", None)
+    if slot is None:
+        time.sleep(delay)
+        return
+    slot.release()
+    try:
+        time.sleep(delay)
+    finally:
+        slot.acquire()
+
+
+def run_with_retries(provider, attempt):
+    """
+    Chama attempt() (uma requisição, já com failover entre backends) e, enquanto o resultado for um
+    erro temporário, tenta de novo após o backoff, até RETRY_CONFIG["max_attempts"] tentativas e
+    dentro do orçamento do provedor. Retorna o último resultado.
+    Durante o backoff, a vaga de provedor ocupada pela thread (holding_slot) fica livre.
+    """
+    budget = get_retry_budget(provider)
+    budget.deposit()
+    result = attempt()
+    for retry_number in range(RETRY_CONFIG["max_attempts"] - 1):
+        if not is_retryable(result):
+            return result
+        retry_after = result.get("retry_after")
+        if retry_after is not None and retry_after > RETRY_CONFIG["max_retry_after"]:
+            logger.warning(
+                "Retry-After de %.0fs em %s; a consulta fica para o fim da varredura", retry_after, provider
+            )
+            return result
+        if not budget.try_withdraw():
+            record_count(RETRY_BUDGET_EXHAUSTED_TOTAL, "retry_budget_exhausted", provider=provider)
+            logger.warning("Orçamento de novas tentativas esgotado para %s", provider)
+            return result
+        delay = backoff_delay(retry_number, retry_after)
+        record_count(API_RETRIES_TOTAL, "api_retries", provider=provider)
+        logger.info(
+            "Nova tentativa em %s após %.2fs: %s", provider, delay, result["error_fatal"],
+            extra={"provider": provider, "retry": retry_number + 1}
+        )
+        _sleep_without_slot(delay)
+        result = attempt()
+    return result
@@ -0,0 +1,845 @@
+import time
+import queue
+import sqlite3
+import threading
+import functools
+import itertools
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+
+from decimal import Decimal
+
+from utils.blockchain_api import (
+    get_blockchain_data, get_provider_for_network, get_api_key_for_network,
+    get_api_key_for_provider, configure_rate_limit, validate_rate_limits, get_evm_native_balances,
+    API_CONFIG, EVM_NETWORKS, ETHERSCAN_BALANCEMULTI_MAX, LOOKUP_MODE_FULL, LOOKUP_MODE_PROBE
+)
+from utils.derivation_pool import iter_derived_wallets_parallel
+from utils.evm_rpc import EVM_RPC_CONFIG, get_evm_data_rpc_batch
+from utils.logging_config import get_logger
+from utils.lookup_cache import get_lookup_cache
+from utils.metrics import record_count, LOOKUP_CACHE_TOTAL, LOOKUP_REQUEUED_TOTAL, PRESCREEN_TOTAL
+from utils.prescreen import get_prescreen
+from utils.retry_policy import RETRY_CONFIG, holding_slot, is_retryable
+from utils.wallet_derivation import (
+    NETWORK_CONFIGS, derive_chain_addresses, plan_chains
+)
+
+logger = get_logger("scan_engine")
+
+# --- Limites por Provedor ---
+# max_workers: consultas simultâneas permitidas no provedor, no processo inteiro (todas as varreduras
+# e jobs somados; ver _provider_slot). provider_limits de um LookupEngine só pode reduzir o limite.
+# A taxa de requisições é controlada pelo token bucket de blockchain_api (por provedor e chave).
+PROVIDER_LIMITS = {
+    "blockstream": {"max_workers": 4},
+    "etherscan": {"max_workers": 4},
+    "trongrid": {"max_workers": 4},
+    # Cada tarefa é um lote JSON-RPC inteiro (utils.evm_rpc), para todas as redes com nós próprios
+    "evm_rpc": {"max_workers": 4},
+}
+
+# Limite usado para redes sem provedor conhecido (a consulta retorna "não suportada" sem I/O)
+DEFAULT_PROVIDER_LIMITS = {"max_workers": 1}
+
+# Provedor -> semáforo com max_workers vagas, compartilhado por todos os LookupEngine do processo.
+# Cada engine tem seus próprios pools (encerrados no close), mas uma tarefa só chama o provedor
+# com uma vaga: N varreduras simultâneas continuam somando no máximo max_workers consultas.
+_provider_slots = {}
+_provider_slots_lock = threading.Lock()
+
+
+def _provider_slot(provider):
+    with _provider_slots_lock:
+        slot = _provider_slots.get(provider)
+        if slot is None:
+            provider_limit = PROVIDER_LIMITS.get(provider, DEFAULT_PROVIDER_LIMITS)
+            slot = _provider_slots[provider] = threading.BoundedSemaphore(max(1, provider_limit["max_workers"]))
+        return slot
+
+
+def _run_in_slot(slot, fn, *args, **kwargs):
+    # holding_slot: o backoff das novas tentativas (run_with_retries) devolve a vaga enquanto espera
+    with holding_slot(slot):
+        return fn(*args, **kwargs)
+
+
+def _lookup_wallet(wallet_info, api_keys, native_balance_wei=None, lookup_cache=None, lookup_mode=LOOKUP_MODE_FULL):
+    """Consulta os dados on-chain de um único endereço derivado (e grava no cache, se houver)."""
+    network = wallet_info['network']
+    address = wallet_info['address']
+    logger.debug("Consultando dados para endereço %s na rede %s", address, network)
+
+    blockchain_data = get_blockchain_data(
+        address, network, get_api_key_for_network(api_keys, network),
+        native_balance_wei=native_balance_wei, lookup_mode=lookup_mode
+    )
+
+    _store_result(lookup_cache, network, address, blockchain_data)
+    return blockchain_data
+
+
+def _lookup_rpc_batch(wallets, network, lookup_cache=None):
+    """Consulta um lote de endereços de uma rede EVM via JSON-RPC (e grava no cache, se houver)."""
+    logger.debug("Consultando lote JSON-RPC de %s endereços na rede %s", len(wallets), network)
+    results = get_evm_data_rpc_batch([wallet_info['address'] for wallet_info in wallets], network)
+    for wallet_info, blockchain_data in zip(wallets, results):
+        _store_result(lookup_cache, network, wallet_info['address'], blockchain_data)
+    return results
+
+
+def _prescreened_result(wallet_info):
+    """Resultado de um endereço ausente do pré-filtro offline (utils.prescreen): não usado, sem I/O."""
+    network = wallet_info['network']
+    address = wallet_info['address']
+    if network in EVM_NETWORKS:
+        explorer_link = f"{API_CONFIG['EVM_COMMON']['explorer_link_base'][network]}{address}"
+    else:
+        explorer_link = f"{API_CONFIG[network]['explorer_link_base']}{address}"
+    result = {
+        "balance_crypto": Decimal(0),
+        "balance_usd": Decimal(0),
+        "has_transactions": False,
+        "has_real_balance": False,
+        "explorer_link": explorer_link,
+        # Resultado do pré-filtro, não da API (não vai para o cache de consultas)
+        "lookup_tier": "prescreen",
+    }
+    if network == "BTC":
+        result["balance_satoshi"] = Decimal(0)
+    return result
+
+
+def _store_result(lookup_cache, network, address, blockchain_data):
+    if lookup_cache is None:
+        return
+    try:
+        lookup_cache.put(network, address, blockchain_data)
+    except sqlite3.Error as e:
+        logger.warning("Falha ao gravar no cache de consultas: %s", e)
+
+
+def _submit_in_context(executor, context, fn, *args, **kwargs):
+    # As threads dos pools não herdam contextvars; o contexto leva o resumo de tempos da requisição (utils.metrics)
+    return executor.submit(context.run, fn, *args, **kwargs)
+
+
+def _completed_future(result):
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+def _copy_future_result(source, target):
+    """Repassa o resultado (ou a exceção) de um Future para outro."""
+    if source.cancelled():
+        target.cancel()
+    elif source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result(source.result())
+
+
+def _wait_before_requeue(wallets):
+    """Registra a nova rodada de consultas de endereços com erro temporário e espera o requeue_delay."""
+    for wallet_info in wallets:
+        record_count(LOOKUP_REQUEUED_TOTAL, "lookup_requeued", network=wallet_info['network'])
+    logger.info("Consultando de novo %d endereços com erro temporário", len(wallets))
+    time.sleep(RETRY_CONFIG["requeue_delay"])
+
+
+def apply_rate_limits(rate_limits, api_keys=None):
+    """
+    Aplica limites de taxa enviados na requisição, ex.: {"etherscan": {"rate": 10, "burst": 10}}.
+    Os valores (validados e limitados por validate_rate_limits) valem só para o balde da chave de API
+    do provedor informada em api_keys. Sem chave, o limite é ignorado: o balde sem chave é
+    compartilhado por todas as varreduras do processo.
+    """
+    for provider, config in validate_rate_limits(rate_limits).items():
+        api_key = get_api_key_for_provider(api_keys, provider)
+        if not api_key or not isinstance(api_key, str) or not api_key.strip():
+            logger.warning("Limite de taxa para %s ignorado: a requisição não tem chave de API desse provedor", provider)
+            continue
+        configure_rate_limit(provider, api_key, rate=config.get("rate"), burst=config.get("burst"))
+
+
+class LookupEngine:
+    """
+    Executa consultas on-chain com um pool de threads por provedor (Blockstream, Etherscan V2,
+    TronGrid, nós JSON-RPC), cada um limitado por PROVIDER_LIMITS; as consultas de todos os engines
+    do processo dividem as mesmas vagas por provedor (_provider_slot). Pode receber consultas em
+    várias levas (ex.: varredura por gap limit) reaproveitando os mesmos pools.
+    lookup_mode: LOOKUP_MODE_FULL ou LOOKUP_MODE_PROBE (ver get_blockchain_data).
+    use_prescreen: com índices de pré-filtro configurados (utils.prescreen), endereços ausentes deles
+    são reportados como não usados sem consulta remota.
+    """
+
+    def __init__(self, api_keys=None, provider_limits=None, rate_limits=None, use_cache=True,
+                 lookup_mode=LOOKUP_MODE_FULL, use_prescreen=True):
+        self.api_keys = api_keys or {}
+        self.lookup_mode = lookup_mode
+        # Cache persistente (rede, endereço) -> resultado; endereços em cache não geram I/O de rede
+        self.lookup_cache = get_lookup_cache() if use_cache else None
+        # Índices offline de endereços usados; None quando não há índices ou a requisição os dispensa
+        self.prescreen = get_prescreen() if use_prescreen else None
+        self.limits = dict(PROVIDER_LIMITS)
+        if provider_limits:
+            self.limits.update(provider_limits)
+        self._executors = {}
+        self._lock = threading.Lock()
+        # Endereços distintos por leva no streaming (iter_lookup_results): cobre um lote JSON-RPC inteiro
+        # quando alguma rede usa nós próprios, senão um 'balancemulti'
+        self.batch_addresses = ETHERSCAN_BALANCEMULTI_MAX
+        if any(get_provider_for_network(network) == "evm_rpc" for network in EVM_NETWORKS):
+            self.batch_addresses = max(ETHERSCAN_BALANCEMULTI_MAX, EVM_RPC_CONFIG["batch_addresses"])
+        apply_rate_limits(rate_limits, self.api_keys)
+
+    def _executor_for(self, provider):
+        with self._lock:
+            executor = self._executors.get(provider)
+            if executor is None:
+                provider_limit = self.limits.get(provider, DEFAULT_PROVIDER_LIMITS)
+                executor = ThreadPoolExecutor(
+                    max_workers=max(1, provider_limit["max_workers"]),
+                    thread_name_prefix=f"lookup-{provider}"
+                )
+                self._executors[provider] = executor
+            return executor
+
+    def _submit_to(self, provider, context, fn, *args, **kwargs):
+        """Agenda fn no pool do provedor; a execução espera uma vaga global do provedor."""
+        return _submit_in_context(
+            self._executor_for(provider), context, _run_in_slot, _provider_slot(provider), fn, *args, **kwargs
+        )
+
+    def _cached_result(self, wallet_info):
+        """Resultado local do endereço (pré-filtro offline ou cache de consultas), ou None."""
+        if self.prescreen is not None:
+            maybe_used = self.prescreen.maybe_used(wallet_info['network'], wallet_info['address'])
+            if maybe_used is not None:
+                result = "hit" if maybe_used else "miss"
+                record_count(PRESCREEN_TOTAL, f"prescreen_{result}", network=wallet_info['network'], result=result)
+                if not maybe_used:
+                    return _prescreened_result(wallet_info)
+        if self.lookup_cache is None:
+            return None
+        try:
+            cached = self.lookup_cache.get(wallet_info['network'], wallet_info['address'])
+        except sqlite3.Error as e:
+            logger.warning("Falha ao ler o cache de consultas: %s", e)
+            return None
+        if cached is not None and cached.get("lookup_tier") == LOOKUP_MODE_PROBE and self.lookup_mode != LOOKUP_MODE_PROBE:
+            cached = None # Resultado só da sonda: a consulta completa nunca foi feita para este endereço
+        result = "hit" if cached is not None else "miss"
+        record_count(LOOKUP_CACHE_TOTAL, f"lookup_cache_{result}", result=result)
+        return cached
+
+    def submit(self, wallet_info):
+        """Agenda a consulta de um endereço derivado; retorna um Future com o resultado."""
+        cached = self._cached_result(wallet_info)
+        if cached is not None:
+            return _completed_future(cached)
+        provider = get_provider_for_network(wallet_info['network'])
+        return self._submit_to(
+            provider, contextvars.copy_context(),
+            _lookup_wallet, wallet_info, self.api_keys,
+            lookup_cache=self.lookup_cache, lookup_mode=self.lookup_mode
+        )
+
+    def _submit_evm_group(self, derived_wallets, groups):
+        """
+        Agenda um lote de até ETHERSCAN_BALANCEMULTI_MAX endereços EVM, cada um com as redes em que
+        aparece: groups é uma lista de (endereço em minúsculas, {rede: posição em derived_wallets}).
+        O lote é consultado como uma unidade: um 'balancemulti' por rede para o saldo nativo de todos
+        e, quando todos terminam, a consulta de histórico de cada endereço em todas as suas redes,
+        uma seguida da outra (reaproveitando o saldo já obtido). Retorna {posição: Future}.
+        """
+        # Guarda as carteiras agora: a lista de quem chamou pode mudar antes de o lote terminar
+        members = [
+            (address, [(network, i, derived_wallets[i]) for network, i in positions.items()])
+            for address, positions in groups
+        ]
+        addresses_by_network = {}
+        for _, wallets in members:
+            for network, _, wallet_info in wallets:
+                addresses_by_network.setdefault(network, []).append(wallet_info['address'])
+        result_futures = {i: Future() for _, wallets in members for _, i, _ in wallets}
+        balances = {}
+        pending_networks = set(addresses_by_network)
+        lock = threading.Lock()
+        # Os callbacks rodam na thread do pool, fora do contexto de quem agendou o lote
+        context = contextvars.copy_context()
+
+        def _submit_lookups():
+            for address, wallets in members:
+                for network, i, wallet_info in wallets:
+                    result_future = result_futures[i]
+                    try:
+                        follow_up = self._submit_to(
+                            get_provider_for_network(network), context.copy(),
+                            _lookup_wallet, wallet_info, self.api_keys,
+                            balances[network].get(address), self.lookup_cache, self.lookup_mode
+                        )
+                    except RuntimeError as e: # Engine encerrado (ex.: varredura cancelada)
+                        result_future.set_exception(e)
+                        continue
+                    follow_up.add_done_callback(lambda done, target=result_future: _copy_future_result(done, target))
+
+        def _on_balances(network, balances_future):
+            try:
+                network_balances = balances_future.result()
+            except Exception as e:
+                logger.error("Erro no balancemulti para %s: %s. Consultando saldo por endereço.", network, e)
+                network_balances = {}
+            with lock:
+                balances[network] = network_balances
+                pending_networks.discard(network)
+                complete = not pending_networks
+            if complete:
+                _submit_lookups()
+
+        for network, addresses in addresses_by_network.items():
+            self._submit_to(
+                get_provider_for_network(network), context.copy(),
+                get_evm_native_balances, addresses, network, get_api_key_for_network(self.api_keys, network)
+            ).add_done_callback(functools.partial(_on_balances, network))
+        return result_futures
+
+    def _submit_rpc_batch(self, derived_wallets, network, positions):
+        """
+        Agenda um lote JSON-RPC com as carteiras das posições informadas, todas da mesma rede.
+        Retorna {posição: Future}.
+        """
+        wallets = [derived_wallets[i] for i in positions]
+        result_futures = {i: Future() for i in positions}
+
+        def _on_batch(batch_future):
+            try:
+                results = batch_future.result()
+            except Exception as e:
+                for future in result_futures.values():
+                    future.set_exception(e)
+                return
+            for i, blockchain_data in zip(positions, results):
+                result_futures[i].set_result(blockchain_data)
+
+        self._submit_to(
+            "evm_rpc", contextvars.copy_context(),
+            _lookup_rpc_batch, wallets, network, self.lookup_cache
+        ).add_done_callback(_on_batch)
+        return result_futures
+
+    def submit_many(self, derived_wallets):
+        """
+        Agenda a consulta de vários endereços; retorna um Future por carteira, na mesma ordem.
+        Redes EVM derivam o mesmo endereço (m/44'/60'/...); cada endereço EVM é agrupado com todas
+        as suas redes e os grupos são consultados em lotes de 'balancemulti'. Redes com nós JSON-RPC
+        são consultadas em lotes por rede de até EVM_RPC_CONFIG["batch_addresses"] endereços.
+        A mesma carteira (rede e endereço) repetida na lista é consultada uma única vez.
+        """
+        futures = [None] * len(derived_wallets)
+        first_positions = {}
+        duplicates = []
+        evm_groups = {}
+        rpc_positions = {}
+        for i, wallet_info in enumerate(derived_wallets):
+            network = wallet_info['network']
+            address = wallet_info['address'].lower() if network in EVM_NETWORKS else wallet_info['address']
+            if (network, address) in first_positions:
+                duplicates.append((i, first_positions[(network, address)]))
+                continue
+            first_positions[(network, address)] = i
+
+            cached = self._cached_result(wallet_info)
+            if cached is not None:
+                futures[i] = _completed_future(cached)
+            elif network in EVM_NETWORKS and get_provider_for_network(network) == "evm_rpc":
+                rpc_positions.setdefault(network, []).append(i)
+            elif network in EVM_NETWORKS:
+                evm_groups.setdefault(address, {})[network] = i
+            else:
+                futures[i] = self.submit(wallet_info)
+
+        groups = list(evm_groups.items())
+        for start in range(0, len(groups), ETHERSCAN_BALANCEMULTI_MAX):
+            futures_by_position = self._submit_evm_group(derived_wallets, groups[start:start + ETHERSCAN_BALANCEMULTI_MAX])
+            for i, future in futures_by_position.items():
+                futures[i] = future
+
+        rpc_batch_size = max(1, EVM_RPC_CONFIG["batch_addresses"])
+        for network, positions in rpc_positions.items():
+            for start in range(0, len(positions), rpc_batch_size):
+                futures_by_position = self._submit_rpc_batch(derived_wallets, network, positions[start:start + rpc_batch_size])
+                for i, future in futures_by_position.items():
+                    futures[i] = future
+
+        # Cada posição recebe seu próprio Future (iter_lookup_results os usa como chaves)
+        for i, source in duplicates:
+            futures[i] = Future()
+            futures[source].add_done_callback(lambda done, target=futures[i]: _copy_future_result(done, target))
+        return futures
+
+    def lookup(self, derived_wallets):
+        """
+        Consulta uma lista de endereços e retorna os resultados na mesma ordem.
+        Os que terminam com erro temporário (utils.retry_policy) são consultados de novo depois
+        de todos os outros, em até RETRY_CONFIG["requeue_passes"] rodadas.
+        """
+        results = [future.result() for future in self.submit_many(derived_wallets)]
+        for _ in range(RETRY_CONFIG["requeue_passes"]):
+            retry_positions = [i for i, blockchain_data in enumerate(results) if is_retryable(blockchain_data)]
+            if not retry_positions:
+                break
+            retry_wallets = [derived_wallets[i] for i in retry_positions]
+            _wait_before_requeue(retry_wallets)
+            for i, future in zip(retry_positions, self.submit_many(retry_wallets)):
+                results[i] = future.result()
+        return results
+
+    def close(self):
+        with self._lock:
+            executors = list(self._executors.values())
+            self._executors.clear()
+        for executor in executors:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+
+def lookup_wallets(derived_wallets, api_keys=None, provider_limits=None, rate_limits=None, use_cache=True,
+                   lookup_mode=LOOKUP_MODE_FULL, use_prescreen=True):
+    """
+    Consulta concorrentemente todos os endereços derivados.
+    Cada provedor (Blockstream, Etherscan V2, TronGrid) tem seu próprio pool de threads,
+    limitado por PROVIDER_LIMITS. Retorna a lista de resultados de get_blockchain_data
+    na mesma ordem da derivação.
+    """
+    if not derived_wallets:
+        return []
+
+    with LookupEngine(api_keys, provider_limits, rate_limits, use_cache, lookup_mode, use_prescreen) as engine:
+        return engine.lookup(derived_wallets)
+
+
+# Consultas pendentes no streaming; limita a memória usada por carteiras ainda não consultadas
+STREAM_MAX_IN_FLIGHT = 64
+
+
+def iter_lookup_results(engine, wallets, max_in_flight=STREAM_MAX_IN_FLIGHT, cancel_event=None):
+    """
+    Consulta as carteiras de um iterável (ex.: iter_derived_wallets) e gera os pares
+    (carteira, dados on-chain) na ordem em que as consultas terminam.
+    No máximo max_in_flight consultas ficam pendentes, então a derivação avança
+    junto com as consultas e a memória não cresce com o tamanho da varredura.
+    Carteiras com erro temporário (utils.retry_policy) ficam para o fim: são consultadas de novo,
+    em até RETRY_CONFIG["requeue_passes"] rodadas (não com cancel_event acionado), e só então geradas.
+    """
+    requeue_passes = RETRY_CONFIG["requeue_passes"]
+    deferred = []
+    for wallet_info, blockchain_data in _iter_lookup_pass(engine, wallets, max_in_flight):
+        if requeue_passes and is_retryable(blockchain_data):
+            deferred.append((wallet_info, blockchain_data))
+            continue
+        yield wallet_info, blockchain_data
+
+    for remaining_passes in range(requeue_passes, 0, -1):
+        if not deferred:
+            return
+        if cancel_event is not None and cancel_event.is_set():
+            break
+        wallets = [wallet_info for wallet_info, _ in deferred]
+        deferred = []
+        _wait_before_requeue(wallets)
+        for wallet_info, blockchain_data in _iter_lookup_pass(engine, wallets, max_in_flight):
+            if remaining_passes > 1 and is_retryable(blockchain_data):
+                deferred.append((wallet_info, blockchain_data))
+                continue
+            yield wallet_info, blockchain_data
+
+    # Varredura cancelada: os adiados saem com o erro que tiveram
+    yield from deferred
+
+
+def _iter_lookup_pass(engine, wallets, max_in_flight):
+    """Uma rodada de iter_lookup_results: consulta as carteiras em levas e gera os pares ao terminar."""
+    pending = {}
+    to_submit = []
+    to_submit_addresses = set()
+
+    def _submit():
+        for wallet_info, future in zip(to_submit, engine.submit_many(to_submit)):
+            pending[future] = wallet_info
+        to_submit.clear()
+        to_submit_addresses.clear()
+
+    def _drain():
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield pending.pop(future), future.result()
+
+    for wallet_info in wallets:
+        # Agrupa em lotes de até engine.batch_addresses endereços distintos; o mesmo endereço EVM
+        # em várias redes (ver iter_grouped_wallets) cai no mesmo lote e é consultado como uma unidade
+        address = wallet_info['address'].lower()
+        if address not in to_submit_addresses and len(to_submit_addresses) >= engine.batch_addresses:
+            _submit()
+        to_submit.append(wallet_info)
+        to_submit_addresses.add(address)
+        while len(pending) >= max_in_flight:
+            yield from _drain()
+
+    if to_submit:
+        _submit()
+    while pending:
+        yield from _drain()
+
+
+# Índices derivados por vez para cada grupo de redes EVM em iter_grouped_wallets
+EVM_GROUP_BLOCK_SIZE = 500
+
+
+def group_evm_chains(chains):
+    """
+    Separa as cadeias de plan_chains em unidades de varredura. As redes EVM usam o mesmo caminho
+    (m/44'/60'/conta'/change) e geram os mesmos endereços, então as cadeias EVM com a mesma conta
+    e change formam uma unidade; as demais cadeias ficam sozinhas. Mantém a ordem do plano.
+    """
+    units = []
+    evm_units = {}
+    for chain in chains:
+        network, account_idx, change_type, _ = chain
+        if network not in EVM_NETWORKS:
+            units.append([chain])
+            continue
+        unit = evm_units.get((account_idx, change_type))
+        if unit is None:
+            unit = evm_units[(account_idx, change_type)] = []
+            units.append(unit)
+        unit.append(chain)
+    return units
+
+
+def iter_grouped_wallets(derivation_cache, chains, address_indices, lazy_private_keys=False,
+                         block_size=EVM_GROUP_BLOCK_SIZE):
+    """
+    Gera as mesmas carteiras de iter_derived_wallets_parallel, mas nas unidades EVM (group_evm_chains)
+    as redes são intercaladas por índice, em blocos de block_size: cada endereço sai em todas as suas
+    redes, um seguido do outro, para que iter_lookup_results o consulte como um grupo.
+    A chave de cada índice é derivada uma única vez para todas as redes da unidade.
+    """
+    address_indices = list(address_indices)
+    for unit in group_evm_chains(chains):
+        if len(unit) == 1:
+            yield from iter_derived_wallets_parallel(derivation_cache, unit, address_indices, lazy_private_keys)
+            continue
+        for start in range(0, len(address_indices), block_size):
+            block = address_indices[start:start + block_size]
+            wallets_by_network = {}
+            for wallet_info in iter_derived_wallets_parallel(derivation_cache, unit, block, lazy_private_keys):
+                wallets_by_network.setdefault(wallet_info['network'], []).append(wallet_info)
+            # Redes cuja derivação falhou ficam de fora (iter_derived_wallets registra o erro)
+            for same_index in itertools.zip_longest(*wallets_by_network.values()):
+                yield from (wallet_info for wallet_info in same_index if wallet_info is not None)
+
+
+# --- Varredura por Gap Limit (BIP44) ---
+DEFAULT_GAP_LIMIT = 20
+MAX_GAP_LIMIT = 200
+# Limite de segurança para a descoberta de contas (m/purpose'/coin'/account'): contas além das pedidas
+MAX_DISCOVERED_ACCOUNTS = 20
+# Cadeias (rede/tipo de endereço) varridas em paralelo; as consultas continuam limitadas por provedor
+GAP_SCAN_PARALLEL_CHAINS = 8
+
+
+def is_used_address(blockchain_data):
+    """Endereço usado = com saldo ou com histórico de transações (erros contam como não usado)."""
+    return bool(
+        blockchain_data
+        and not blockchain_data.get("error_fatal")
+        and (blockchain_data.get("has_transactions") or blockchain_data.get("has_real_balance"))
+    )
+
+
+def scan_chain_gap_limit(engine, derivation_cache, network, account_idx, change_type,
+                         gap_limit=DEFAULT_GAP_LIMIT, btc_addr_type=None, lazy_private_keys=False,
+                         start_index=0, on_result=None, cancel_event=None):
+    """
+    Varre uma cadeia (rede, tipo de endereço, conta, change) a partir de start_index,
+    derivando e consultando em levas, até encontrar gap_limit endereços seguidos sem uso.
+    Cada leva tem exatamente o tamanho da folga restante, então nunca se consulta
+    além do gap limit. Retorna a lista de pares (carteira, dados on-chain) em ordem de rede e índice.
+    on_result(carteira, dados) é chamado para cada endereço assim que sua leva termina.
+    network também pode ser uma lista de redes EVM: elas têm o mesmo caminho e os mesmos endereços,
+    então cada leva é derivada uma vez e consultada em todas as redes como um grupo
+    (LookupEngine.submit_many); um índice conta como usado se foi usado em qualquer uma delas.
+    """
+    networks = [network] if isinstance(network, str) else list(network)
+    results_by_network = {chain_network: [] for chain_network in networks}
+    next_index = start_index
+    consecutive_unused = 0
+
+    while consecutive_unused < gap_limit:
+        if cancel_event is not None and cancel_event.is_set():
+            break
+        batch_indices = range(next_index, next_index + (gap_limit - consecutive_unused))
+        wallets = []
+        for chain_network in networks:
+            wallets.extend(derive_chain_addresses(
+                derivation_cache, chain_network, account_idx, change_type, batch_indices,
+                btc_addr_type, lazy_private_keys
+            ))
+        wallet_indices = list(batch_indices) * len(networks)
+        used_indices = set()
+        for addr_idx, wallet_info, blockchain_data in zip(wallet_indices, wallets, engine.lookup(wallets)):
+            results_by_network[wallet_info['network']].append((wallet_info, blockchain_data))
+            if on_result is not None:
+                on_result(wallet_info, blockchain_data)
+            if is_used_address(blockchain_data):
+                used_indices.add(addr_idx)
+        for addr_idx in batch_indices:
+            consecutive_unused = 0 if addr_idx in used_indices else consecutive_unused + 1
+        next_index = batch_indices.stop
+
+    return [pair for chain_results in results_by_network.values() for pair in chain_results]
+
+
+def _scan_accounts(engine, derivation_cache, network, btc_addr_type, account_indices, change_types,
+                   gap_limit, account_discovery, lazy_private_keys, on_result=None, cancel_event=None):
+    """
+    Varre as contas pedidas de uma rede/tipo de endereço, todas elas. Com account_discovery, continua
+    nas contas seguintes à maior pedida enquanto a última varrida tiver algum endereço usado
+    (descoberta de contas BIP44), até MAX_DISCOVERED_ACCOUNTS contas a mais.
+    """
+    def _scan_account(account_idx):
+        account_results = []
+        for change_type in change_types:
+            account_results.extend(scan_chain_gap_limit(
+                engine, derivation_cache, network, account_idx, change_type,
+                gap_limit, btc_addr_type, lazy_private_keys,
+                on_result=on_result, cancel_event=cancel_event
+            ))
+        return account_results
+
+    results = []
+    account_results = []
+    # Em ordem crescente: a descoberta parte do resultado da maior conta pedida
+    for account_idx in sorted(set(account_indices)):
+        if cancel_event is not None and cancel_event.is_set():
+            return results
+        account_results = _scan_account(account_idx)
+        results.extend(account_results)
+
+    if account_discovery and account_indices:
+        first_discovered = max(account_indices) + 1
+        for account_idx in range(first_discovered, first_discovered + MAX_DISCOVERED_ACCOUNTS):
+            if not any(is_used_address(data) for _, data in account_results):
+                break
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            account_results = _scan_account(account_idx)
+            results.extend(account_results)
+    return results
+
+
+def scan_gap_limit(derivation_cache, selected_networks, bitcoin_address_types, change_types,
+                   api_keys=None, gap_limit=DEFAULT_GAP_LIMIT, account_indices=None,
+                   account_discovery=False, lazy_private_keys=False, rate_limits=None,
+                   on_result=None, cancel_event=None, use_cache=True, lookup_mode=LOOKUP_MODE_FULL,
+                   use_prescreen=True):
+    """
+    Varredura adaptativa: em vez de um intervalo fixo de índices, cada cadeia é varrida até
+    gap_limit endereços seguidos sem uso. Derivação e consultas são intercaladas por cadeia,
+    e cadeias diferentes rodam em paralelo. As redes EVM pedidas são varridas juntas, por conta e
+    change, como em group_evm_chains (ver scan_chain_gap_limit). Retorna os pares (carteira, dados
+    on-chain) ordenados por rede, tipo de endereço, conta, change e índice.
+    on_result é chamado (a partir das threads de varredura) a cada endereço consultado;
+    cancel_event (threading.Event) interrompe a varredura entre levas.
+    """
+    gap_limit = max(1, min(int(gap_limit), MAX_GAP_LIMIT))
+    account_indices = account_indices or [0]
+
+    units = []
+    evm_networks = []
+    for network in dict.fromkeys(selected_networks):
+        if network not in NETWORK_CONFIGS:
+            logger.warning("Configuração para rede %s não encontrada. Pulando.", network)
+            continue
+        if network == "BTC":
+            for btc_addr_type in bitcoin_address_types:
+                if btc_addr_type in NETWORK_CONFIGS["BTC"]["derivation_paths"]:
+                    units.append((network, btc_addr_type))
+        elif network in EVM_NETWORKS:
+            if not evm_networks:
+                units.append((evm_networks, None))  # Uma unidade para todas as redes EVM
+            evm_networks.append(network)
+        else:
+            units.append((network, None))
+
+    with LookupEngine(api_keys, rate_limits=rate_limits, use_cache=use_cache, lookup_mode=lookup_mode,
+                      use_prescreen=use_prescreen) as engine:
+        with ThreadPoolExecutor(max_workers=GAP_SCAN_PARALLEL_CHAINS, thread_name_prefix="gap-scan") as chain_pool:
+            futures = [
+                _submit_in_context(
+                    chain_pool, contextvars.copy_context(), _scan_accounts,
+                    engine, derivation_cache, network, btc_addr_type, account_indices,
+                    change_types, gap_limit, account_discovery, lazy_private_keys, on_result, cancel_event
+                )
+                for network, btc_addr_type in units
+            ]
+            results = []
+            for future in futures:
+                results.extend(future.result())
+    # As redes EVM saem juntas da sua unidade; a ordenação estável devolve a ordem por rede
+    network_order = {network: position for position, network in enumerate(dict.fromkeys(selected_networks))}
+    results.sort(key=lambda pair: network_order[pair[0]['network']])
+    return results
+
+
+# --- Varredura em Streaming ---
+class ScanProgress:
+    """Contadores de progresso de uma varredura (total é None quando não se sabe de antemão)."""
+
+    def __init__(self):
+        self.total = None
+        self.derived = 0
+        self.queried = 0
+        self.found = 0
+        # Endereços que terminaram com erro (mesmo depois das novas tentativas)
+        self.failed = 0
+
+    def to_dict(self):
+        return {
+            "total": self.total,
+            "derived": self.derived,
+            "queried": self.queried,
+            "remaining": self.total - self.queried if self.total is not None else None,
+            "found": self.found,
+            "failed": self.failed
+        }
+
+
+_SCAN_DONE = object()
+
+
+def _iter_gap_limit_scan(derivation_cache, selected_networks, account_indices, bitcoin_address_types,
+                         change_types, api_keys, gap_limit, account_discovery, lazy_private_keys,
+                         rate_limits, progress, cancel_event, use_cache, lookup_mode, use_prescreen):
+    """Executa scan_gap_limit em segundo plano e gera os pares (carteira, dados) à medida que chegam."""
+    results_queue = queue.Queue()
+
+    def _on_result(wallet_info, blockchain_data):
+        results_queue.put((wallet_info, blockchain_data))
+
+    def _run():
+        try:
+            scan_gap_limit(
+                derivation_cache, selected_networks, bitcoin_address_types, change_types, api_keys,
+                gap_limit=gap_limit, account_indices=account_indices, account_discovery=account_discovery,
+                lazy_private_keys=lazy_private_keys, rate_limits=rate_limits,
+                on_result=_on_result, cancel_event=cancel_event, use_cache=use_cache,
+                lookup_mode=lookup_mode, use_prescreen=use_prescreen
+            )
+        except Exception as e:
+            results_queue.put(e)
+        finally:
+            results_queue.put(_SCAN_DONE)
+
+    worker = threading.Thread(
+        target=contextvars.copy_context().run, args=(_run,), name="gap-scan-stream", daemon=True
+    )
+    worker.start()
+    try:
+        while True:
+            item = results_queue.get()
+            if item is _SCAN_DONE:
+                break
+            if isinstance(item, Exception):
+                raise item
+            progress.derived += 1
+            yield item
+    finally:
+        # Cliente desconectado ou varredura encerrada: interrompe as levas restantes
+        cancel_event.set()
+
+
+def _count_result(progress, blockchain_data):
+    progress.queried += 1
+    if is_used_address(blockchain_data):
+        progress.found += 1
+    elif blockchain_data and blockchain_data.get("error_fatal"):
+        progress.failed += 1
+
+
+def iter_scan(derivation_cache, selected_networks, account_indices, address_indices, bitcoin_address_types,
+              change_types, api_keys=None, scan_mode="range", gap_limit=DEFAULT_GAP_LIMIT,
+              account_discovery=False, lazy_private_keys=False, rate_limits=None,
+              progress=None, cancel_event=None, use_cache=True, lookup_mode=LOOKUP_MODE_FULL,
+              use_prescreen=True):
+    """
+    Gera os pares (carteira, dados on-chain) de uma varredura assim que cada consulta termina,
+    sem acumular a lista completa. A ordem é a de conclusão, não a de derivação.
+    progress (ScanProgress) é atualizado durante a varredura.
+    """
+    if progress is None:
+        progress = ScanProgress()
+    if cancel_event is None:
+        cancel_event = threading.Event()
+
+    if scan_mode == "gap_limit":
+        results = _iter_gap_limit_scan(
+            derivation_cache, selected_networks, account_indices, bitcoin_address_types, change_types,
+            api_keys, gap_limit, account_discovery, lazy_private_keys, rate_limits, progress, cancel_event,
+            use_cache, lookup_mode, use_prescreen
+        )
+        for wallet_info, blockchain_data in results:
+            _count_result(progress, blockchain_data)
+            yield wallet_info, blockchain_data
+        return
+
+    chains = plan_chains(selected_networks, account_indices, bitcoin_address_types, change_types)
+    yield from iter_scan_chain_ranges(
+        derivation_cache, [(chain, address_indices) for chain in chains], api_keys, lazy_private_keys,
+        rate_limits, progress, cancel_event, use_cache, lookup_mode, use_prescreen
+    )
+
+
+def iter_scan_chain_ranges(derivation_cache, chain_ranges, api_keys=None, lazy_private_keys=False,
+                           rate_limits=None, progress=None, cancel_event=None, use_cache=True,
+                           lookup_mode=LOOKUP_MODE_FULL, use_prescreen=True):
+    """
+    Como iter_scan no modo range, mas cada cadeia com os próprios índices: chain_ranges é uma lista
+    de (cadeia de plan_chains, índices). Usado pelas sessões de varredura (utils.scan_session) para
+    consultar só a parte nova de cada cadeia. Cadeias com os mesmos índices são derivadas juntas
+    (iter_grouped_wallets), e todas as consultas dividem o mesmo LookupEngine.
+    """
+    if progress is None:
+        progress = ScanProgress()
+    if cancel_event is None:
+        cancel_event = threading.Event()
+
+    chains_by_indices = {}
+    for chain, indices in chain_ranges:
+        if indices:
+            chains_by_indices.setdefault(tuple(indices), []).append(chain)
+    progress.total = sum(len(chains) * len(indices) for indices, chains in chains_by_indices.items())
+
+    def _counted(wallets):
+        for wallet_info in wallets:
+            if cancel_event.is_set():
+                return
+            progress.derived += 1
+            yield wallet_info
+
+    derived_wallets = _counted(itertools.chain.from_iterable(
+        iter_grouped_wallets(derivation_cache, chains, list(indices), lazy_private_keys)
+        for indices, chains in chains_by_indices.items()
+    ))
+    with LookupEngine(api_keys, rate_limits=rate_limits, use_cache=use_cache, lookup_mode=lookup_mode,
+                      use_prescreen=use_prescreen) as engine:
+        for wallet_info, blockchain_data in iter_lookup_results(engine, derived_wallets, cancel_event=cancel_event):
+            _count_result(progress, blockchain_data)
+            yield wallet_info, blockchain_data
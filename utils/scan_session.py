@@ -0,0 +1,238 @@
+import os
+import hmac
+import time
+import uuid
+import bisect
+import hashlib
+import threading
+
+from utils.logging_config import get_logger
+
+logger = get_logger("scan_session")
+
+# --- Sessões de Varredura Incremental ("continuar varredura") ---
+# Uma sessão lembra, por cadeia (rede, tipo de endereço BTC, conta, change), os índices já derivados e
+# consultados e o último índice usado encontrado. Uma nova requisição na mesma sessão (ex.: 0-100
+# depois de 0-50) deriva e consulta só os índices que faltam (51-100), e mais os que falharam antes.
+# O estado fica só em memória. A sessão não guarda a seed: só um HMAC com sal próprio, para conferir
+# que a seed reenviada é a mesma. A semente BIP39 é recalculada da seed reenviada a cada requisição
+# (ou vem de utils.seed_cache, se a requisição pedir cache_seed).
+SCAN_SESSION_CONFIG = {
+    # Tempo sem uso após o qual a sessão é descartada
+    "ttl_seconds": int(os.environ.get("FENIX_SCAN_SESSION_TTL", 30 * 60)),
+    # Sessões guardadas ao mesmo tempo; acima disso, a usada há mais tempo sai
+    "max_sessions": int(os.environ.get("FENIX_MAX_SCAN_SESSIONS", 100)),
+}
+
+# Parâmetros da varredura guardados na sessão e usados quando a continuação não os informa.
+# Chaves de API não ficam na sessão: a continuação as reenvia, como a seed
+SESSION_SCAN_INPUTS = (
+    "selected_networks", "account_indices", "bitcoin_address_types", "change_types",
+    "rate_limits", "lazy_private_keys", "use_cache", "lookup_mode", "use_prescreen",
+)
+
+
+class SessionBusyError(Exception):
+    """A sessão já tem uma varredura em andamento."""
+
+
+class SeedMismatchError(ValueError):
+    """A seed (ou passphrase) enviada não é a da sessão."""
+
+
+def chain_key(wallet_info):
+    """Cadeia (no formato de plan_chains) de uma carteira derivada."""
+    btc_addr_type = wallet_info.address_type if wallet_info.network == "BTC" else None
+    return (wallet_info.network, wallet_info.account, wallet_info.change, btc_addr_type)
+
+
+class ChainProgress:
+    """Índices já varridos de uma cadeia, em intervalos fechados [início, fim] ordenados e disjuntos."""
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+        # Índices varridos que terminaram com erro da API; voltam na próxima continuação
+        self.failed = set()
+        self.last_used_index = None
+
+    def covers(self, index):
+        pos = bisect.bisect_right(self.starts, index) - 1
+        return pos >= 0 and self.ends[pos] >= index
+
+    def pending(self, indices):
+        """Dos índices pedidos, os que ainda precisam ser varridos (novos ou com erro antes)."""
+        return [index for index in indices if index in self.failed or not self.covers(index)]
+
+    def add(self, indices):
+        """Marca os índices como varridos, juntando intervalos adjacentes."""
+        intervals = list(zip(self.starts, self.ends))
+        run_start = run_end = None
+        for index in sorted(set(indices)):
+            if run_end is not None and index == run_end + 1:
+                run_end = index
+                continue
+            if run_start is not None:
+                intervals.append((run_start, run_end))
+            run_start = run_end = index
+        if run_start is not None:
+            intervals.append((run_start, run_end))
+
+        intervals.sort()
+        merged = []
+        for start, end in intervals:
+            if merged and start <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        self.starts = [start for start, _ in merged]
+        self.ends = [end for _, end in merged]
+
+    def record(self, index, used, failed):
+        """Registra o resultado de um índice varrido."""
+        if self.ends and self.starts[-1] <= index <= self.ends[-1] + 1:
+            self.ends[-1] = max(self.ends[-1], index)  # Caso comum: índices em sequência
+        elif not self.covers(index):
+            self.add([index])
+        if failed:
+            self.failed.add(index)
+            return
+        self.failed.discard(index)
+        if used and (self.last_used_index is None or index > self.last_used_index):
+            self.last_used_index = index
+
+    @property
+    def last_index(self):
+        return self.ends[-1] if self.ends else None
+
+    def to_dict(self):
+        return {
+            "ranges": [[start, end] for start, end in zip(self.starts, self.ends)],
+            "last_index": self.last_index,
+            "last_used_index": self.last_used_index,
+            "failed_indices": sorted(self.failed),
+        }
+
+
+class ScanSession:
+    """Estado de uma sessão de varredura: parâmetros (sem a seed) e o progresso de cada cadeia."""
+
+    def __init__(self, seed_phrase, passphrase, scan_inputs):
+        self.id = uuid.uuid4().hex
+        self._salt = os.urandom(16)
+        self._seed_digest = self._digest(seed_phrase, passphrase)
+        self.scan_inputs = {key: scan_inputs[key] for key in SESSION_SCAN_INPUTS if key in scan_inputs}
+        self.chains = {}
+        self.created_at = time.time()
+        self.last_used_at = time.monotonic()
+        self.scans = 0
+        self._busy = threading.Lock()
+
+    def _digest(self, seed_phrase, passphrase):
+        message = seed_phrase.encode("utf-8") + b"\x00" + (passphrase or "").encode("utf-8")
+        return hmac.new(self._salt, message, hashlib.sha256).digest()
+
+    def check_seed(self, seed_phrase, passphrase):
+        if not hmac.compare_digest(self._digest(seed_phrase, passphrase), self._seed_digest):
+            raise SeedMismatchError("A seed phrase ou a passphrase não correspondem às da sessão.")
+
+    def acquire(self):
+        """Reserva a sessão para uma varredura; levanta SessionBusyError se já houver outra."""
+        if not self._busy.acquire(blocking=False):
+            raise SessionBusyError("Esta sessão já tem uma varredura em andamento.")
+        self.last_used_at = time.monotonic()
+        self.scans += 1
+
+    def release(self):
+        self.last_used_at = time.monotonic()
+        self._busy.release()
+
+    def plan(self, chains, address_indices):
+        """Lista (cadeia, índices que faltam) para varrer address_indices em cada cadeia."""
+        plan = []
+        for chain in chains:
+            progress = self.chains.get(chain)
+            indices = progress.pending(address_indices) if progress is not None else list(address_indices)
+            if indices:
+                plan.append((chain, indices))
+        return plan
+
+    def record(self, wallet_info, used, failed):
+        """
+        Registra o resultado de uma carteira varrida nesta sessão. Só índices efetivamente
+        consultados contam como varridos (uma varredura interrompida continua de onde parou).
+        """
+        self.chains.setdefault(chain_key(wallet_info), ChainProgress()).record(wallet_info.index, used, failed)
+
+    def to_dict(self):
+        return {
+            "session_id": self.id,
+            "created_at": self.created_at,
+            "scans": self.scans,
+            "expires_in": max(0, round(self.last_used_at + SCAN_SESSION_CONFIG["ttl_seconds"] - time.monotonic())),
+            "chains": [
+                {
+                    "network": network,
+                    "account": account,
+                    "change": change,
+                    "address_type": btc_addr_type,
+                    **progress.to_dict(),
+                }
+                for (network, account, change, btc_addr_type), progress in sorted(
+                    self.chains.items(), key=lambda item: tuple(str(part) for part in item[0])
+                )
+            ],
+        }
+
+
+class ScanSessionStore:
+    """Sessões em memória, descartadas após SCAN_SESSION_CONFIG["ttl_seconds"] sem uso."""
+
+    def __init__(self):
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def _prune(self):
+        cutoff = time.monotonic() - SCAN_SESSION_CONFIG["ttl_seconds"]
+        with self._lock:
+            expired = [
+                session_id for session_id, session in self._sessions.items()
+                if session.last_used_at < cutoff and not session._busy.locked()
+            ]
+            for session_id in expired:
+                del self._sessions[session_id]
+
+    def add(self, session):
+        """Guarda a sessão (depois da primeira varredura), descartando a usada há mais tempo se preciso."""
+        self._prune()
+        with self._lock:
+            idle = sorted(
+                (item for item in self._sessions.values() if not item._busy.locked()),
+                key=lambda item: item.last_used_at
+            )
+            while idle and len(self._sessions) >= SCAN_SESSION_CONFIG["max_sessions"]:
+                del self._sessions[idle.pop(0).id]
+            self._sessions[session.id] = session
+        logger.info("Sessão de varredura %s criada", session.id)
+
+    def get(self, session_id):
+        self._prune()
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def delete(self, session_id):
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+
+_session_store = None
+_session_store_lock = threading.Lock()
+
+
+def get_session_store():
+    """Retorna o ScanSessionStore compartilhado do processo."""
+    global _session_store
+    with _session_store_lock:
+        if _session_store is None:
+            _session_store = ScanSessionStore()
+        return _session_store
@@ -0,0 +1,240 @@
+import os
+import hmac
+import threading
+
+from utils.logging_config import get_logger
+
+logger = get_logger("secp256k1_batch")
+
+# --- Derivação Pública em Lote (secp256k1) ---
+# O último nível do caminho (m/.../change/índice) não é hardened: a chave pública do filho é
+# P + IL·G, com IL = HMAC-SHA512(chain code, P || índice)[:32]. Em vez de montar um Bip32Secp256k1
+# por índice, a cadeia inteira é derivada de uma vez a partir da chave pública e do chain code do nó
+# change. Com o coincurve (o mesmo backend do bip_utils), cada filho é um tweak_add da libsecp256k1,
+# que já usa a tabela pré-computada de G; sem ele, a versão em Python puro usa uma tabela de base
+# fixa para G e normaliza todos os pontos com uma única inversão modular (truque de Montgomery).
+SECP256K1_BATCH_CONFIG = {
+    # FENIX_BULK_DERIVATION=off volta para a derivação índice a índice do bip_utils
+    "enabled": os.environ.get("FENIX_BULK_DERIVATION", "on").lower() not in ("0", "off", "false", "no"),
+    # auto, coincurve ou python
+    "backend": os.environ.get("FENIX_SECP256K1_BACKEND", "auto").lower(),
+    # Bits por janela da tabela de base fixa (Python puro): 8 = 32 somas por ponto, 8160 pontos na tabela
+    "window_bits": 8,
+}
+
+# Parâmetros da curva secp256k1
+_P = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEFFFFFC2F
+_N = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141
+_GX = 0x79BE667EF9DCBBAC55A06295CE870B07029BFCDB2DCE28D959F2815B16F81798
+_GY = 0x483ADA7726A3C4655DA4FBFC0E1108A8FD17B448A68554199C47D08FFB10D4B8
+
+try:
+    import coincurve
+except ImportError:  # pragma: no cover - o bip_utils também funciona só com o ecdsa
+    coincurve = None
+
+
+def child_tweak(parent_public_key, chain_code, index):
+    """IL (inteiro) do filho não-hardened index; None se IL >= n (índice inválido pelo BIP32)."""
+    digest = hmac.digest(chain_code, parent_public_key + index.to_bytes(4, "big"), "sha512")
+    tweak = int.from_bytes(digest[:32], "big")
+    return tweak if tweak < _N else None
+
+
+# --- Backend em Python puro ---
+# Pontos em coordenadas jacobianas (X, Y, Z), com Z = 0 para o ponto no infinito; a tabela guarda
+# pontos afins (x, y) para usar a soma mista, mais barata.
+
+def _jacobian_double(point):
+    x, y, z = point
+    if z == 0 or y == 0:
+        return (0, 1, 0)
+    a = x * x % _P
+    b = y * y % _P
+    c = b * b % _P
+    d = 2 * ((x + b) * (x + b) - a - c) % _P
+    e = 3 * a % _P
+    x3 = (e * e - 2 * d) % _P
+    y3 = (e * (d - x3) - 8 * c) % _P
+    z3 = 2 * y * z % _P
+    return (x3, y3, z3)
+
+
+def _jacobian_add_affine(point, affine):
+    x1, y1, z1 = point
+    x2, y2 = affine
+    if z1 == 0:
+        return (x2, y2, 1)
+    z1z1 = z1 * z1 % _P
+    u2 = x2 * z1z1 % _P
+    s2 = y2 * z1 * z1z1 % _P
+    h = (u2 - x1) % _P
+    r = (s2 - y1) % _P
+    if h == 0:
+        return _jacobian_double(point) if r == 0 else (0, 1, 0)
+    hh = h * h % _P
+    hhh = h * hh % _P
+    v = x1 * hh % _P
+    x3 = (r * r - hhh - 2 * v) % _P
+    y3 = (r * (v - x3) - y1 * hhh) % _P
+    z3 = z1 * h % _P
+    return (x3, y3, z3)
+
+
+def _batch_to_affine(points):
+    """Converte pontos jacobianos em afins com uma única inversão (truque de Montgomery); infinito vira None."""
+    prefix = []
+    acc = 1
+    for _, _, z in points:
+        prefix.append(acc)
+        if z:
+            acc = acc * z % _P
+    inverse = pow(acc, -1, _P)
+
+    affine = [None] * len(points)
+    for i in range(len(points) - 1, -1, -1):
+        x, y, z = points[i]
+        if not z:
+            continue
+        z_inv = inverse * prefix[i] % _P
+        inverse = inverse * z % _P
+        z_inv2 = z_inv * z_inv % _P
+        affine[i] = (x * z_inv2 % _P, y * z_inv2 * z_inv % _P)
+    return affine
+
+
+_g_table = None
+_g_table_lock = threading.Lock()
+
+
+def _get_g_table():
+    """Tabela de base fixa: linha j, coluna d-1 = d · 2^(janela·j) · G, em coordenadas afins."""
+    global _g_table
+    with _g_table_lock:
+        if _g_table is None:
+            window_bits = SECP256K1_BATCH_CONFIG["window_bits"]
+            base = (_GX, _GY)
+            table = []
+            for _ in range((256 + window_bits - 1) // window_bits):
+                row = [(base[0], base[1], 1)]
+                for _ in range((1 << window_bits) - 2):
+                    row.append(_jacobian_add_affine(row[-1], base))
+                row = _batch_to_affine(row)
+                table.append(row)
+                # Base da próxima janela: 2^janela · base = (2^janela - 1) · base + base
+                base = _batch_to_affine([_jacobian_add_affine((*row[-1], 1), base)])[0]
+            _g_table = table
+        return _g_table
+
+
+def _to_affine(public_key):
+    x = int.from_bytes(public_key[1:33], "big")
+    if len(public_key) == 65:
+        return (x, int.from_bytes(public_key[33:], "big"))
+    y = pow((x * x * x + 7) % _P, (_P + 1) // 4, _P)
+    if (y & 1) != (public_key[0] & 1):
+        y = _P - y
+    return (x, y)
+
+
+def _serialize(affine, compressed):
+    x, y = affine
+    if compressed:
+        return (b"\x03" if y & 1 else b"\x02") + x.to_bytes(32, "big")
+    return b"\x04" + x.to_bytes(32, "big") + y.to_bytes(32, "big")
+
+
+def _tweak_add_python(public_keys, tweaks, compressed):
+    table = _get_g_table()
+    window_bits = SECP256K1_BATCH_CONFIG["window_bits"]
+    mask = (1 << window_bits) - 1
+    parents = {}
+
+    points = []
+    for public_key, tweak in zip(public_keys, tweaks):
+        if tweak is None:
+            points.append((0, 1, 0))
+            continue
+        parent = parents.get(public_key)
+        if parent is None:
+            parent = parents[public_key] = _to_affine(public_key)
+        point = (parent[0], parent[1], 1)
+        for row in table:
+            digit = tweak & mask
+            if digit:
+                point = _jacobian_add_affine(point, row[digit - 1])
+            tweak >>= window_bits
+        points.append(point)
+
+    return [_serialize(affine, compressed) if affine is not None else None for affine in _batch_to_affine(points)]
+
+
+# --- Backend coincurve (libsecp256k1) ---
+
+def _tweak_add_coincurve(public_keys, tweaks, compressed):
+    parents = {}
+    results = []
+    for public_key, tweak in zip(public_keys, tweaks):
+        if tweak is None:
+            results.append(None)
+            continue
+        parent = parents.get(public_key)
+        if parent is None:
+            parent = parents[public_key] = coincurve.PublicKey(public_key)
+        try:
+            results.append(parent.add(tweak.to_bytes(32, "big")).format(compressed=compressed))
+        except ValueError:
+            results.append(None)  # P + t·G no infinito
+    return results
+
+
+def batch_backend():
+    """Backend em uso: "coincurve" ou "python"."""
+    backend = SECP256K1_BATCH_CONFIG["backend"]
+    if backend == "python" or coincurve is None:
+        return "python"
+    return "coincurve"
+
+
+def tweak_add_batch(public_keys, tweaks, compressed=True):
+    """
+    Calcula P + t·G para cada par (chave pública, t inteiro), na ordem dada. t None ou resultado no
+    infinito vêm como None. Saída comprimida (33 bytes) ou não (65 bytes, prefixo 04).
+    """
+    if batch_backend() == "coincurve":
+        return _tweak_add_coincurve(public_keys, tweaks, compressed)
+    return _tweak_add_python(public_keys, tweaks, compressed)
+
+
+def child_public_keys(parent_public_key, chain_code, indices, compressed=True):
+    """
+    Chaves públicas dos filhos não-hardened indices de um nó, na ordem pedida (ver tweak_add_batch).
+    Um índice inválido pelo BIP32 (probabilidade ~2^-127) vem como None; quem chama decide o que fazer.
+    """
+    tweaks = [child_tweak(parent_public_key, chain_code, index) for index in indices]
+    return tweak_add_batch([parent_public_key] * len(tweaks), tweaks, compressed)
+
+
+def compress_public_key(public_key):
+    """Chave pública comprimida (33 bytes) a partir da comprimida ou da não comprimida."""
+    if len(public_key) == 33:
+        return public_key
+    return (b"\x03" if public_key[64] & 1 else b"\x02") + public_key[1:33]
+
+
+def uncompressed_public_key(public_key):
+    """Chave pública não comprimida (65 bytes, prefixo 04) a partir da comprimida ou da não comprimida."""
+    if len(public_key) == 65:
+        return public_key
+    if batch_backend() == "coincurve":
+        return coincurve.PublicKey(public_key).format(compressed=False)
+    return _serialize(_to_affine(public_key), False)
+
+
+def lift_x_tweak_add(x_only_keys, tweaks):
+    """
+    Coordenada x (32 bytes) de lift_x(x) + t·G para cada par, como no tweak do Taproot (BIP341/BIP86),
+    em que lift_x é o ponto de y par. Resultado no infinito vem como None.
+    """
+    tweaked = tweak_add_batch([b"\x02" + x for x in x_only_keys], tweaks)
+    return [public_key[1:] if public_key is not None else None for public_key in tweaked]
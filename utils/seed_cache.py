@@ -0,0 +1,159 @@
+import os
+import hmac
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+from utils.logging_config import get_logger
+from utils.metrics import record_count, SEED_CACHE_TOTAL
+
+logger = get_logger("seed_cache")
+
+# --- Cache da Semente BIP39 em Memória ---
+# Bip39SeedGenerator roda 2048 rodadas de PBKDF2-HMAC-SHA512; quando a interface reenvia a mesma
+# seed (ex.: "varrer mais índices" ou outra rede), a semente e o nó mestre vêm deste cache.
+# Só em memória: nada é gravado em disco. A chave é um HMAC da seed e da passphrase com um sal
+# aleatório do processo (nunca a seed em si), e as entradas expiram e são apagadas após o TTL.
+# Opt-in: só as requisições com "cache_seed": true guardam ou leem a semente (ver app.py).
+# O apagamento é best-effort: zera o bytearray da entrada, mas o nó mestre (objeto do bip_utils),
+# as cópias em bytes entregues a get() e as da geração da semente ficam na memória do processo até
+# o coletor de lixo liberá-las, e o Python não sobrescreve memória liberada.
+SEED_CACHE_CONFIG = {
+    # FENIX_SEED_CACHE=off desativa o cache (toda requisição refaz o PBKDF2)
+    "enabled": os.environ.get("FENIX_SEED_CACHE", "on").lower() not in ("0", "off", "false", "no"),
+    # Tempo sem uso após o qual a entrada é apagada (cada acesso renova o prazo)
+    "ttl_seconds": int(os.environ.get("FENIX_SEED_CACHE_TTL", 5 * 60)),
+    # Seeds guardadas ao mesmo tempo; as usadas há mais tempo saem primeiro
+    "max_entries": int(os.environ.get("FENIX_SEED_CACHE_MAX_ENTRIES", 16)),
+    # Intervalo máximo da limpeza em segundo plano das entradas expiradas
+    "sweep_seconds": 30,
+}
+
+
+class _SeedEntry:
+    __slots__ = ("seed", "master_node", "expires_at")
+
+    def __init__(self, seed_bytes, master_node, expires_at):
+        # bytearray para que a semente possa ser sobrescrita ao expirar
+        self.seed = bytearray(seed_bytes)
+        self.master_node = master_node
+        self.expires_at = expires_at
+
+    def wipe(self):
+        # Best-effort: só a cópia desta entrada é zerada (ver o comentário do início do módulo)
+        for i in range(len(self.seed)):
+            self.seed[i] = 0
+        self.master_node = None
+
+
+class SeedCache:
+    """
+    Cache LRU com TTL de (semente BIP39, nó mestre BIP32) por (seed phrase, passphrase).
+    Apaga as entradas ao expirar, ao sair por tamanho e em clear()/forget(), zerando a semente
+    guardada; o nó mestre e as cópias já entregues (em varreduras em andamento) só saem da memória
+    quando o coletor de lixo as libera.
+    """
+
+    def __init__(self, ttl_seconds, max_entries, sweep_seconds=30):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self.sweep_seconds = max(1, min(sweep_seconds, ttl_seconds))
+        # Sal do processo: as chaves não servem para testar seeds fora deste processo
+        self._salt = os.urandom(32)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._sweeper = None
+        self._closed = threading.Event()
+
+    def _key(self, seed_phrase, passphrase):
+        message = seed_phrase.encode("utf-8") + b"\x00" + (passphrase or "").encode("utf-8")
+        return hmac.new(self._salt, message, hashlib.sha256).digest()
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            entry.wipe()
+
+    def _prune_expired(self, now):
+        for key in [key for key, entry in self._entries.items() if entry.expires_at <= now]:
+            self._remove(key)
+
+    def get(self, seed_phrase, passphrase):
+        """Retorna (semente, nó mestre) ou None; um acerto renova o prazo da entrada."""
+        key = self._key(seed_phrase, passphrase)
+        now = time.monotonic()
+        with self._lock:
+            self._prune_expired(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.expires_at = now + self.ttl_seconds
+                self._entries.move_to_end(key)
+                cached = bytes(entry.seed), entry.master_node
+            else:
+                cached = None
+        result = "hit" if cached is not None else "miss"
+        record_count(SEED_CACHE_TOTAL, f"seed_cache_{result}", result=result)
+        return cached
+
+    def put(self, seed_phrase, passphrase, seed_bytes, master_node):
+        key = self._key(seed_phrase, passphrase)
+        now = time.monotonic()
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = _SeedEntry(seed_bytes, master_node, now + self.ttl_seconds)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+            self._start_sweeper()
+
+    def forget(self, seed_phrase, passphrase):
+        """Apaga a entrada da seed, se houver (ex.: o usuário pediu para não guardar a seed)."""
+        with self._lock:
+            self._remove(self._key(seed_phrase, passphrase))
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def _start_sweeper(self):
+        # Sem a limpeza em segundo plano, uma seed expirada ficaria em memória até o próximo acesso
+        if self._sweeper is None or not self._sweeper.is_alive():
+            self._sweeper = threading.Thread(target=self._sweep, name="seed-cache-sweeper", daemon=True)
+            self._sweeper.start()
+
+    def _sweep(self):
+        while not self._closed.wait(self.sweep_seconds):
+            with self._lock:
+                self._prune_expired(time.monotonic())
+                if not self._entries:
+                    self._sweeper = None
+                    return
+
+    def close(self):
+        """Apaga todas as entradas e encerra a limpeza em segundo plano."""
+        self._closed.set()
+        self.clear()
+
+
+_seed_cache = None
+_seed_cache_lock = threading.Lock()
+
+
+def get_seed_cache():
+    """Retorna o cache de sementes do processo, ou None se estiver desativado."""
+    global _seed_cache
+    if not SEED_CACHE_CONFIG["enabled"] or SEED_CACHE_CONFIG["ttl_seconds"] <= 0:
+        return None
+    with _seed_cache_lock:
+        if _seed_cache is None:
+            _seed_cache = SeedCache(
+                SEED_CACHE_CONFIG["ttl_seconds"],
+                SEED_CACHE_CONFIG["max_entries"],
+                SEED_CACHE_CONFIG["sweep_seconds"]
+            )
+        return _seed_cache
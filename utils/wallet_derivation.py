@@ -1,11 +1,11 @@
+import os
+import threading
+from collections import OrderedDict
+
 from bip_utils import (
     Bip39MnemonicValidator, Bip39SeedGenerator,
-    Bip44, Bip44Coins, Bip44Changes,
-    Bip49, Bip49Coins,
-    Bip84, Bip84Coins,
-    Bip86, Bip86Coins,
-    Bip32Secp256k1, Bip32PathParser,
-    Bip32KeyIndex,
+    Bip44Coins, Bip49Coins, Bip84Coins, Bip86Coins,
+    Bip32Secp256k1, Bip32KeyIndex,
     WifEncoder,
     Secp256k1PrivateKey, Secp256k1PublicKey
 )
@@ -14,6 +14,14 @@ from bip_utils.addr import (
     P2PKHAddrEncoder, P2SHAddrEncoder, P2WPKHAddrEncoder, P2TRAddrEncoder
 )
 
+from utils.logging_config import get_logger
+from utils.metrics import timed, SEED_GENERATION_SECONDS, CHAIN_DERIVATION_SECONDS
+from utils.seed_cache import get_seed_cache
+from utils.secp256k1_batch import SECP256K1_BATCH_CONFIG, child_public_keys
+from utils.address_encoding import UNCOMPRESSED_ENCODINGS, has_batch_encoder, encode_addresses
+
+logger = get_logger("wallet_derivation")
+
 def parse_range_input(input_str):
     """Parse a range input string (e.g., '0-5' or '1,3,5') into a list of integers)."""
     if not input_str:
@@ -56,7 +64,7 @@ def derive_custom_network(seed_bytes, account_idx, addr_idx, config, change_type
             "private_key": private_key
         }
     except Exception as e:
-        print(f"Erro ao derivar endereço para rede personalizada: {str(e)}")
+        logger.error("Erro ao derivar endereço para rede personalizada: %s", e)
         return None
 
 # Mapeamento de redes
@@ -80,44 +88,361 @@ NETWORK_CONFIGS = {
     "ETH": {
         "coin_type": Bip44Coins.ETHEREUM,
         "private_key_format": "HEX",
+        "address_encoding": "EVM",
         "address_format": lambda pub_key: EthAddrEncoder.EncodeKey(pub_key.RawCompressed().ToBytes())
     },
     "BSC": {
         "coin_type": Bip44Coins.BINANCE_SMART_CHAIN,
         "private_key_format": "HEX",
+        "address_encoding": "EVM",
         "address_format": lambda pub_key: EthAddrEncoder.EncodeKey(pub_key.RawCompressed().ToBytes())
     },
     "MATIC": {
         "coin_type": Bip44Coins.POLYGON,
         "private_key_format": "HEX",
+        "address_encoding": "EVM",
         "address_format": lambda pub_key: EthAddrEncoder.EncodeKey(pub_key.RawCompressed().ToBytes())
     },
     "TRX": {
         "coin_type": Bip44Coins.TRON,
         "private_key_format": "HEX",
+        "address_encoding": "TRX",
         "address_format": lambda pub_key: TrxAddrEncoder.EncodeKey(pub_key.RawCompressed().ToBytes())
     },
     "BASE": {
         "coin_type": Bip44Coins.ETHEREUM,
         "private_key_format": "HEX",
+        "address_encoding": "EVM",
         "address_format": lambda pub_key: EthAddrEncoder.EncodeKey(pub_key.RawCompressed().ToBytes()),
     },
     "OPTIMISM": {
         "coin_type": Bip44Coins.ETHEREUM,
         "private_key_format": "HEX",
+        "address_encoding": "EVM",
         "address_format": lambda pub_key: EthAddrEncoder.EncodeKey(pub_key.RawCompressed().ToBytes()),
     },
     "ARBITRUM": {
         "coin_type": Bip44Coins.ETHEREUM,
         "private_key_format": "HEX",
+        "address_encoding": "EVM",
         "address_format": lambda pub_key: EthAddrEncoder.EncodeKey(pub_key.RawCompressed().ToBytes()),
     }
 }
 
-# INÍCIO DA ALTERAÇÃO
-def derive_addresses(seed_phrase, passphrase, selected_networks,
-                    account_indices_str, address_indices_str, bitcoin_address_types, change_types):
-# FIM DA ALTERAÇÃO
+# Coin type (BIP44) usado no caminho de derivação de cada rede.
+# Todas as redes EVM usam 60, por isso compartilham as mesmas chaves e endereços.
+COIN_TYPE_MAP = {
+    "BTC": 0,
+    "ETH": 60,
+    "BSC": 60,
+    "MATIC": 60,
+    "TRX": 195,
+    "BASE": 60,
+    "OPTIMISM": 60,
+    "ARBITRUM": 60
+}
+
+EVM_NETWORKS = ["ETH", "BSC", "MATIC", "BASE", "OPTIMISM", "ARBITRUM"]
+
+DERIVATION_CACHE_CONFIG = {
+    # Máximo de endereços guardados por DerivationCache, em blocos (uma chamada de addresses());
+    # os blocos usados há mais tempo saem primeiro. As redes EVM de uma mesma conta/change
+    # reaproveitam o bloco da rede anterior.
+    "address_memo_size": int(os.environ.get("FENIX_ADDRESS_MEMO_SIZE", 20000)),
+}
+
+
+class DerivationCache:
+    """
+    Cache dos nós BIP32 derivados de uma seed.
+    Os nós intermediários m/purpose'/coin'/account'/change são derivados uma única vez e
+    reaproveitados entre redes e tipos de endereço. Os últimos blocos de endereços com o mesmo
+    material de chave e a mesma codificação (ex.: o mesmo intervalo em todas as redes EVM) também
+    são reaproveitados, até DERIVATION_CACHE_CONFIG["address_memo_size"] endereços. Chaves privadas não
+    ficam em cache: são derivadas de novo a cada pedido (ver resolve_private_key).
+    """
+
+    def __init__(self, seed_bytes, master_node=None):
+        # Mantida para que o pool de derivação (utils.derivation_pool) recrie o cache em outros processos
+        self.seed_bytes = seed_bytes
+        # master_node: nó mestre já derivado desta semente (ver utils.seed_cache)
+        self.master_node = master_node if master_node is not None else Bip32Secp256k1.FromSeed(seed_bytes)
+        self._nodes = {(): self.master_node}
+        self._public_nodes = {}
+        # (purpose, coin_type, account, change, codificação, índices) -> endereços, em ordem de uso
+        self._address_blocks = OrderedDict()
+        self._memo_size = 0
+        # A varredura por gap limit usa o mesmo cache em várias threads (scan_engine.GAP_SCAN_PARALLEL_CHAINS)
+        self._memo_lock = threading.Lock()
+
+    def _node(self, path):
+        node = self._nodes.get(path)
+        if node is None:
+            parent = self._node(path[:-1])
+            node = parent.ChildKey(path[-1])
+            self._nodes[path] = node
+        return node
+
+    @staticmethod
+    def _change_path(purpose, coin_type, account, change):
+        return (
+            Bip32KeyIndex.HardenIndex(purpose),
+            Bip32KeyIndex.HardenIndex(coin_type),
+            Bip32KeyIndex.HardenIndex(account),
+            0 if change == 0 else 1  # change 0 = externa, 1 = interna
+        )
+
+    def change_node(self, purpose, coin_type, account, change):
+        """Retorna o nó privado m/purpose'/coin_type'/account'/change."""
+        return self._node(self._change_path(purpose, coin_type, account, change))
+
+    def public_change_node(self, purpose, coin_type, account, change):
+        """
+        Retorna o nó m/purpose'/coin_type'/account'/change apenas com a chave pública (xpub).
+        Os filhos não-hardened dele são derivados só com soma de pontos, sem chave privada.
+        """
+        path = self._change_path(purpose, coin_type, account, change)
+        node = self._public_nodes.get(path)
+        if node is None:
+            node = Bip32Secp256k1.FromExtendedKey(self._node(path).PublicKey().ToExtended())
+            self._public_nodes[path] = node
+        return node
+
+    def address(self, purpose, coin_type, account, change, addr_idx, encoding, address_format,
+                private_key_format, lazy_private_key=False):
+        """
+        Retorna (endereço, chave privada) do índice informado.
+        Com lazy_private_key=True o endereço vem da xpub e a chave privada retornada é None;
+        ela pode ser obtida depois com private_key().
+        """
+        if lazy_private_key:
+            public_node = self.public_change_node(purpose, coin_type, account, change).ChildKey(addr_idx)
+            return address_format(public_node.PublicKey()), None
+
+        address_node = self.change_node(purpose, coin_type, account, change).ChildKey(addr_idx)
+        return address_format(address_node.PublicKey()), _format_private_key(address_node, private_key_format)
+
+    def _cached_block(self, key):
+        with self._memo_lock:
+            addresses = self._address_blocks.get(key)
+            if addresses is not None:
+                self._address_blocks.move_to_end(key)
+            return addresses
+
+    def _store_block(self, key, addresses):
+        limit = DERIVATION_CACHE_CONFIG["address_memo_size"]
+        if len(addresses) > limit:
+            return
+        with self._memo_lock:
+            # Outra thread pode ter derivado o mesmo bloco ao mesmo tempo
+            previous = self._address_blocks.pop(key, None)
+            if previous is not None:
+                self._memo_size -= len(previous)
+            self._address_blocks[key] = addresses
+            self._memo_size += len(addresses)
+            while self._memo_size > limit:
+                _, evicted = self._address_blocks.popitem(last=False)
+                self._memo_size -= len(evicted)
+
+    def addresses(self, purpose, coin_type, account, change, address_indices, encoding, address_format,
+                  private_key_format, lazy_private_key=False):
+        """
+        Versão em lote de address(): retorna [(endereço, chave privada)] na ordem de address_indices.
+        Os endereços saem de uma só vez da chave pública do nó change (utils.secp256k1_batch) e são
+        codificados em lote (utils.address_encoding); o bloco fica guardado para a próxima rede com a
+        mesma cadeia e codificação. As chaves privadas (lazy_private_key=False) são derivadas índice
+        a índice, como em address().
+        """
+        block_key = (purpose, coin_type, account, change, encoding, tuple(address_indices))
+        addresses = self._cached_block(block_key)
+        if addresses is None:
+            addresses = self._derive_block(
+                purpose, coin_type, account, change, address_indices, encoding, address_format
+            )
+            self._store_block(block_key, addresses)
+
+        if lazy_private_key:
+            return [(address, None) for address in addresses]
+        change_node = self.change_node(purpose, coin_type, account, change)
+        return [
+            (address, _format_private_key(change_node.ChildKey(addr_idx), private_key_format))
+            for addr_idx, address in zip(address_indices, addresses)
+        ]
+
+    def _derive_block(self, purpose, coin_type, account, change, address_indices, encoding, address_format):
+        """Endereços dos índices, na ordem dada, pela derivação em lote (ou índice a índice, se desligada)."""
+        unique_indices = list(dict.fromkeys(address_indices))
+        by_index = {}
+        if SECP256K1_BATCH_CONFIG["enabled"]:
+            change_node = self.public_change_node(purpose, coin_type, account, change)
+            batch_encoding = has_batch_encoder(encoding)
+            public_keys = child_public_keys(
+                change_node.PublicKey().RawCompressed().ToBytes(), change_node.ChainCode().ToBytes(), unique_indices,
+                compressed=not (batch_encoding and encoding in UNCOMPRESSED_ENCODINGS)
+            )
+            # None: índice inválido pelo BIP32; address() abaixo trata como antes (erro do bip_utils)
+            derived = [(addr_idx, public_key) for addr_idx, public_key in zip(unique_indices, public_keys) if public_key]
+            if batch_encoding:
+                encoded = encode_addresses([public_key for _, public_key in derived], encoding)
+            else:
+                encoded = [address_format(Secp256k1PublicKey.FromBytes(public_key)) for _, public_key in derived]
+            for (addr_idx, _), address in zip(derived, encoded):
+                if address is not None:
+                    by_index[addr_idx] = address
+
+        for addr_idx in unique_indices:
+            if addr_idx not in by_index:
+                by_index[addr_idx] = self.address(
+                    purpose, coin_type, account, change, addr_idx, encoding, address_format, None, True
+                )[0]
+        return [by_index[addr_idx] for addr_idx in address_indices]
+
+    def private_key(self, purpose, coin_type, account, change, addr_idx, private_key_format):
+        """Retorna a chave privada do índice no formato da rede (HEX ou WIF), derivada agora (sem cache)."""
+        address_node = self.change_node(purpose, coin_type, account, change).ChildKey(addr_idx)
+        return _format_private_key(address_node, private_key_format)
+
+
+def _format_private_key(address_node, private_key_format):
+    if private_key_format == "WIF":
+        priv_key = Secp256k1PrivateKey.FromBytes(address_node.PrivateKey().Raw().ToBytes())
+        return WifEncoder.Encode(priv_key, net_ver=b"\x80")
+    return address_node.PrivateKey().Raw().ToHex()
+
+
+class WalletRecord:
+    """
+    Carteira derivada em formato compacto: __slots__ em vez de dict e caminho de derivação
+    montado sob demanda a partir dos índices. Aceita o acesso de dicionário usado no restante
+    do código (record['address'], record.get('private_key')) e vira dict com to_dict() (JSON).
+    """
+
+    __slots__ = ("network", "address", "purpose", "coin_type", "account", "change", "index",
+                 "private_key", "address_type")
+
+    FIELDS = ("network", "address", "derivation_path", "private_key", "address_type")
+
+    def __init__(self, network, address, purpose, coin_type, account, change, index,
+                 private_key=None, address_type="N/A"):
+        self.network = network
+        self.address = address
+        self.purpose = purpose
+        self.coin_type = coin_type
+        self.account = account
+        self.change = change
+        self.index = index
+        self.private_key = private_key
+        self.address_type = address_type
+
+    @property
+    def derivation_path(self):
+        return f"m/{self.purpose}'/{self.coin_type}'/{self.account}'/{self.change}/{self.index}"
+
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.FIELDS else default
+
+    def __contains__(self, key):
+        return key in self.FIELDS
+
+    def keys(self):
+        return self.FIELDS
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def __eq__(self, other):
+        if isinstance(other, WalletRecord):
+            other = other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"WalletRecord({self.network}, {self.address}, {self.derivation_path})"
+
+
+def parse_derivation_path(derivation_path):
+    """Converte "m/84'/0'/1'/0/7" em (purpose, coin_type, account, change, index)."""
+    parts = derivation_path.split("/")
+    if len(parts) != 6 or parts[0] != "m":
+        raise ValueError(f"Caminho de derivação inesperado: {derivation_path}")
+    return tuple(int(part.rstrip("'")) for part in parts[1:])
+
+
+def resolve_private_key(derivation_cache, wallet_info):
+    """
+    Retorna a chave privada da carteira, derivando-a agora se ela foi gerada no modo
+    lazy_private_keys (apenas endereços, a partir da xpub).
+    """
+    if wallet_info.get("private_key"):
+        return wallet_info["private_key"]
+    if isinstance(wallet_info, WalletRecord):
+        purpose, coin_type, account, change, addr_idx = (
+            wallet_info.purpose, wallet_info.coin_type, wallet_info.account, wallet_info.change, wallet_info.index
+        )
+    else:
+        purpose, coin_type, account, change, addr_idx = parse_derivation_path(wallet_info["derivation_path"])
+    private_key_format = NETWORK_CONFIGS[wallet_info["network"]]["private_key_format"]
+    return derivation_cache.private_key(purpose, coin_type, account, change, addr_idx, private_key_format)
+
+
+def derive_chain_addresses(derivation_cache, network, account_idx, change_type, address_indices,
+                           btc_addr_type=None, lazy_private_keys=False):
+    """
+    Deriva os endereços de uma cadeia (rede, tipo de endereço, conta, change) para os índices informados.
+    Retorna a lista de carteiras (WalletRecord) no formato usado por derive_addresses.
+    """
+    config = NETWORK_CONFIGS[network]
+    coin_type_num = COIN_TYPE_MAP.get(network, 60)
+
+    if network == "BTC":
+        purpose = config["derivation_paths"][btc_addr_type]["purpose"]
+        address_format = config["address_formats"][btc_addr_type]
+        encoding = btc_addr_type
+        address_type = btc_addr_type
+    else:
+        purpose = 44
+        address_format = config["address_format"]
+        encoding = config["address_encoding"]
+        address_type = "N/A"
+
+    wallets = []
+    with timed(CHAIN_DERIVATION_SECONDS, "derivation", network=network, lazy=lazy_private_keys):
+        derived = derivation_cache.addresses(
+            purpose, coin_type_num, account_idx, change_type, address_indices,
+            encoding, address_format, config["private_key_format"], lazy_private_keys
+        )
+        for addr_idx, (address, private_key) in zip(address_indices, derived):
+            wallets.append(WalletRecord(
+                network, address, purpose, coin_type_num, account_idx, change_type, addr_idx,
+                private_key, address_type
+            ))
+    return wallets
+
+
+def create_derivation_cache(seed_phrase, passphrase, use_seed_cache=False):
+    """
+    Valida a seed phrase, gera a semente BIP39 e retorna o DerivationCache correspondente.
+    Com use_seed_cache (opt-in), a semente e o nó mestre de uma seed já usada há pouco vêm do cache
+    em memória (utils.seed_cache), sem validação nem PBKDF2, e a semente nova é guardada nele; sem
+    ele, a entrada da seed é apagada.
+    """
+    seed_cache = get_seed_cache()
+    if seed_cache is not None and not use_seed_cache:
+        seed_cache.forget(seed_phrase, passphrase)
+        seed_cache = None
+    if seed_cache is not None:
+        cached = seed_cache.get(seed_phrase, passphrase)
+        if cached is not None:
+            return DerivationCache(*cached)
+
     validator = Bip39MnemonicValidator()
     if not validator.IsValid(seed_phrase):
         words = seed_phrase.split()
@@ -127,10 +452,29 @@ def derive_addresses(seed_phrase, passphrase, selected_networks,
 
     # INÍCIO DA ALTERAÇÃO
     # Gera a semente usando a passphrase. Se a passphrase for uma string vazia, o resultado é o mesmo que sem ela.
-    seed_bytes = Bip39SeedGenerator(seed_phrase).Generate(passphrase)
+    with timed(SEED_GENERATION_SECONDS, "seed_generation"):
+        seed_bytes = Bip39SeedGenerator(seed_phrase).Generate(passphrase)
     # FIM DA ALTERAÇÃO
-    
-    all_derived_wallets = []
+
+    derivation_cache = DerivationCache(seed_bytes)
+    if seed_cache is not None:
+        seed_cache.put(seed_phrase, passphrase, seed_bytes, derivation_cache.master_node)
+    return derivation_cache
+
+
+# INÍCIO DA ALTERAÇÃO
+def derive_addresses(seed_phrase, passphrase, selected_networks,
+                    account_indices_str, address_indices_str, bitcoin_address_types, change_types,
+                    derivation_cache=None, lazy_private_keys=False):
+# FIM DA ALTERAÇÃO
+    """
+    Deriva os endereços de todas as redes, contas, cadeias e índices selecionados.
+    Com lazy_private_keys=True os endereços são gerados a partir da xpub de cada cadeia e
+    'private_key' fica None; use resolve_private_key com o mesmo derivation_cache depois.
+    """
+    # Nós intermediários e endereços compartilhados entre redes são derivados uma única vez
+    if derivation_cache is None:
+        derivation_cache = create_derivation_cache(seed_phrase, passphrase)
 
     account_indices = parse_range_input(account_indices_str)
     address_indices = parse_range_input(address_indices_str)
@@ -139,117 +483,68 @@ def derive_addresses(seed_phrase, passphrase, selected_networks,
         account_indices = [0]
     if not address_indices:
         address_indices = [0] 
-    
-    COIN_TYPE_MAP = {
-        "BTC": 0,
-        "ETH": 60,
-        "BSC": 60,
-        "MATIC": 60,
-        "TRX": 195,
-        "BASE": 60,
-        "OPTIMISM": 60,
-        "ARBITRUM": 60
-    }
 
+    # Importado aqui porque utils.derivation_pool depende deste módulo
+    from utils.derivation_pool import iter_derived_wallets_parallel
+
+    chains = plan_chains(selected_networks, account_indices, bitcoin_address_types, change_types)
+    # Intervalos grandes são derivados em paralelo por vários processos, na mesma ordem
+    return list(iter_derived_wallets_parallel(derivation_cache, chains, address_indices, lazy_private_keys))
+
+
+def plan_chains(selected_networks, account_indices, bitcoin_address_types, change_types):
+    """
+    Lista as cadeias a derivar como tuplas (rede, conta, change, tipo de endereço BTC ou None),
+    na ordem usada por derive_addresses.
+    """
+    chains = []
     for network in selected_networks:
         config = NETWORK_CONFIGS.get(network)
         if not config:
-            print(f"Aviso: Configuração para rede {network} não encontrada. Pulando.")
+            logger.warning("Configuração para rede %s não encontrada. Pulando.", network)
             continue
 
-        print(f"Derivando para rede: {network}")
-        
-        coin_type_num = COIN_TYPE_MAP.get(network, 60)
+        logger.info("Derivando para rede: %s", network)
 
         for account_idx in account_indices:
             for change_type in change_types:
                 if network == "BTC":
                     if not bitcoin_address_types:
-                        print("Aviso: Nenhum tipo de endereço Bitcoin selecionado. Pulando BTC.")
+                        logger.warning("Nenhum tipo de endereço Bitcoin selecionado. Pulando BTC.")
                         continue
 
                     for btc_addr_type in bitcoin_address_types:
-                        btc_der_config = config["derivation_paths"].get(btc_addr_type)
-                        if not btc_der_config:
-                            print(f"Aviso: Tipo de endereço BTC {btc_addr_type} não configurado. Pulando.")
+                        if btc_addr_type not in config["derivation_paths"]:
+                            logger.warning("Tipo de endereço BTC %s não configurado. Pulando.", btc_addr_type)
                             continue
+                        chains.append((network, account_idx, change_type, btc_addr_type))
+
+                elif network in EVM_NETWORKS or network == "TRX":
+                    chains.append((network, account_idx, change_type, None))
+    return chains
 
-                        try:
-                            
-                            if btc_der_config["purpose"] == 44:
-                                bip_obj = Bip44.FromSeed(seed_bytes, btc_der_config["coin_type"])
-                                path_template = f"m/44'/{COIN_TYPE_MAP['BTC']}'/{account_idx}'/{change_type}/{{address}}"
-                            elif btc_der_config["purpose"] == 49:
-                                bip_obj = Bip49.FromSeed(seed_bytes, btc_der_config["coin_type"])
-                                path_template = f"m/49'/{COIN_TYPE_MAP['BTC']}'/{account_idx}'/{change_type}/{{address}}"
-                            elif btc_der_config["purpose"] == 84:
-                                bip_obj = Bip84.FromSeed(seed_bytes, btc_der_config["coin_type"])
-                                path_template = f"m/84'/{COIN_TYPE_MAP['BTC']}'/{account_idx}'/{change_type}/{{address}}"
-                            elif btc_der_config["purpose"] == 86:
-                                bip_obj = Bip86.FromSeed(seed_bytes, btc_der_config["coin_type"])
-                                path_template = f"m/86'/{COIN_TYPE_MAP['BTC']}'/{account_idx}'/{change_type}/{{address}}"
-                            else:
-                                continue
-
-                            account_node = bip_obj.Purpose().Coin().Account(account_idx)
-                            
-                            change_bip_enum = Bip44Changes.CHAIN_EXT if change_type == 0 else Bip44Changes.CHAIN_INT
-                            change_node = account_node.Change(change_bip_enum)
-
-
-                            for addr_idx in address_indices:
-                                
-                                address_node = change_node.AddressIndex(addr_idx)
-                                private_key = address_node.PrivateKey().Raw().ToHex()
-                                
-                                if config["private_key_format"] == "WIF":
-                                    priv_key_bytes = address_node.PrivateKey().Raw().ToBytes()
-                                    priv_key = Secp256k1PrivateKey.FromBytes(priv_key_bytes)
-                                    private_key = WifEncoder.Encode(priv_key, net_ver=b"\x80")
-
-                                pub_key = address_node.PublicKey()
-                                address = config["address_formats"][btc_addr_type](pub_key)
-                                
-                                derivation_path = path_template.format(address=addr_idx)
-
-                                all_derived_wallets.append({
-                                    "network": network,
-                                    "address": address,
-                                    "derivation_path": derivation_path,
-                                    "private_key": private_key,
-                                    "address_type": btc_addr_type
-                                })
-                            
-                        except Exception as e:
-                            print(f"Erro ao derivar endereço(s) para BTC {btc_addr_type} na conta {account_idx}, change {change_type}: {str(e)}")
-
-                elif network in ["ETH", "BSC", "MATIC", "BASE", "OPTIMISM", "ARBITRUM", "TRX"]:
-                    try:
-                        bip_obj = Bip44.FromSeed(seed_bytes, config["coin_type"])
-                        account_node = bip_obj.Purpose().Coin().Account(account_idx)
-                        
-                        change_bip_enum = Bip44Changes.CHAIN_EXT if change_type == 0 else Bip44Changes.CHAIN_INT
-                        change_node = account_node.Change(change_bip_enum)
-
-                        for addr_idx in address_indices:
-                            
-                            address_node = change_node.AddressIndex(addr_idx)
-                            private_key = address_node.PrivateKey().Raw().ToHex()
-                            
-                            pub_key = address_node.PublicKey()
-                            address = config["address_format"](pub_key)
-                            
-                            derivation_path = f"m/44'/{coin_type_num}'/{account_idx}'/{change_type}/{addr_idx}"
-
-                            all_derived_wallets.append({
-                                "network": network,
-                                "address": address,
-                                "derivation_path": derivation_path,
-                                "private_key": private_key,
-                                "address_type": "N/A"
-                            })
-
-                    except Exception as e:
-                        print(f"Erro ao derivar conta {account_idx} ou endereço para {network} na cadeia {change_type}: {str(e)}")
-
-    return all_derived_wallets
+
+def iter_derived_wallets(derivation_cache, chains, address_indices, lazy_private_keys=False):
+    """
+    Gera as carteiras derivadas cadeia a cadeia, sem montar a lista completa em memória.
+    Usado pela rota de streaming para começar as consultas antes do fim da derivação.
+    """
+    for network, account_idx, change_type, btc_addr_type in chains:
+        try:
+            wallets = derive_chain_addresses(
+                derivation_cache, network, account_idx, change_type, address_indices,
+                btc_addr_type, lazy_private_keys
+            )
+        except Exception as e:
+            if btc_addr_type:
+                logger.error(
+                    "Erro ao derivar endereço(s) para BTC %s na conta %s, change %s: %s",
+                    btc_addr_type, account_idx, change_type, e
+                )
+            else:
+                logger.error(
+                    "Erro ao derivar conta %s ou endereço para %s na cadeia %s: %s",
+                    account_idx, network, change_type, e
+                )
+            continue
+        yield from wallets